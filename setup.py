@@ -54,6 +54,9 @@ setuptools.setup(
         'ldap3',
         'aiosmtplib'
     ],
+    extras_require={
+        'tests': ['aiosmtpd']
+    },
     entry_points={
         'console_scripts': [
             'create-wefram-project = wefram.manage.routines.start_project:execute',
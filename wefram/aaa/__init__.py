@@ -1,6 +1,6 @@
 from .wrappers import *
 from .routines import *
 from .tools import *
-from . import permissions, auth
+from . import permissions, auth, throttling
 
 __version__ = 1
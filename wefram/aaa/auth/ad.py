@@ -3,9 +3,13 @@ Provides the Active Directory authentication backend, used by Wefram AAA.
 """
 
 from typing import *
+import asyncio
 import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
 import ldap3
-from ... import ds, logger, api
+from ldap3.core.exceptions import LDAPException
+from ... import config, ds, logger, api
 from ...models import User
 from ...private.const.aaa import PERMISSION_ADMINUSERSROLES
 
@@ -16,6 +20,81 @@ __all__ = [
 ]
 
 
+# The maximum number of LDAP binds running at the same time in the worker process,
+# and the maximum number of them running against the single domain.
+BIND_THREADS: int = 8
+BIND_PER_DOMAIN: int = 4
+
+# The timeouts (in seconds) for connecting to the AD server and for waiting for
+# the bind response.
+CONNECT_TIMEOUT: int = 5
+RECEIVE_TIMEOUT: int = 10
+
+# How long (in seconds) the resolved AD server address is cached for.
+DNS_CACHE_TTL: int = 300
+
+# The ldap3 client strategy used for binds (the ``MOCK_SYNC`` one is used by
+# tests, against the in-process directory).
+CLIENT_STRATEGY: str = ldap3.SYNC
+
+
+_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=BIND_THREADS, thread_name_prefix='aaa-ad')
+_resolved: Dict[str, Tuple[str, float]] = {}
+_servers: Dict[Tuple[str, int, bool], ldap3.Server] = {}
+_domain_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+async def resolve(host: str) -> str:
+    """ Resolves the given host name to the IP address without blocking the
+    event loop, caching the result for :py:data:`DNS_CACHE_TTL` seconds.
+
+    :raises socket.gaierror: if failed to resolve the name
+    """
+
+    cached: Optional[Tuple[str, float]] = _resolved.get(host, None)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    infos: list = await asyncio.get_running_loop().getaddrinfo(
+        host, None, family=socket.AF_INET, type=socket.SOCK_STREAM
+    )
+    ip: str = infos[0][4][0]
+    _resolved[host] = (ip, time.monotonic() + DNS_CACHE_TTL)
+    return ip
+
+
+def _get_server(ip: str, port: int, use_ssl: bool) -> ldap3.Server:
+    key: Tuple[str, int, bool] = (ip, port, use_ssl)
+    if key not in _servers:
+        _servers[key] = ldap3.Server(
+            host=ip,
+            port=port,
+            use_ssl=use_ssl,
+            get_info=ldap3.NONE,
+            mode=ldap3.IP_SYSTEM_DEFAULT,
+            connect_timeout=CONNECT_TIMEOUT
+        )
+    return _servers[key]
+
+
+def _bind(server: ldap3.Server, username: str, password: str) -> bool:
+    """ Makes the blocking LDAP bind, called in the thread pool. """
+
+    conn: ldap3.Connection = ldap3.Connection(
+        server,
+        user=username,
+        password=password,
+        receive_timeout=RECEIVE_TIMEOUT,
+        client_strategy=CLIENT_STRATEGY
+    )
+    try:
+        return bool(conn.bind())
+    except LDAPException as e:
+        logger.error(f"LDAP bind failed for '{username}': {e}", 'aaa backend [ad]')
+        return False
+    finally:
+        conn.unbind()
+
+
 class ActiveDirectoryDomain(ds.Model):
     """ The single Active Directory domain specification, describing how to connect
     and authenticate within the given domain.
@@ -57,12 +136,12 @@ class ActiveDirectoryDomain(ds.Model):
 
         host_to_resolve: str = self.server or self.domain
         try:
-            server_ip: str = socket.gethostbyname(host_to_resolve)
+            server_ip: str = await resolve(host_to_resolve)
             logger.debug(
                 f"resolved Active Directory server '{host_to_resolve}' to IP: {server_ip}",
                 'aaa backend [ad]'
             )
-        except socket.gaierror:
+        except (socket.gaierror, IndexError):
             logger.error(
                 f"failed to resolve Active Directory server name: {host_to_resolve}",
                 'aaa backend [ad]'
@@ -72,17 +151,12 @@ class ActiveDirectoryDomain(ds.Model):
             f"trying to authenticate: {username}",
             'aaa backend [ad]'
         )
-        server: ldap3.Server = ldap3.Server(
-            host=server_ip,
-            port=int(self.server_port),
-            use_ssl=bool(self.use_ssl),
-            get_info=ldap3.ALL,
-            mode=ldap3.IP_SYSTEM_DEFAULT
-        )
-        conn: ldap3.Connection = ldap3.Connection(server, user=username, password=password)
-        succeed: bool = conn.bind()
-        conn.unbind()
-        return succeed
+        server: ldap3.Server = _get_server(server_ip, int(self.server_port), bool(self.use_ssl))
+        slots: Optional[asyncio.Semaphore] = _domain_slots.get(self.domain, None)
+        if slots is None:
+            slots = _domain_slots[self.domain] = asyncio.Semaphore(BIND_PER_DOMAIN)
+        async with slots:
+            return await asyncio.get_running_loop().run_in_executor(_executor, _bind, server, username, password)
 
     async def authenticate(self, username: str, password: str) -> bool:
         """ Tries to authenticate within this Active Directory domain, resuling with system
@@ -140,6 +214,13 @@ async def authenticate(username: str, password: str) -> Optional[User]:
     :param password: (str) the plain password beign given by the user
 
     :returns: User object if succeed, None otherwise
+
+    Domains are tried one after another, so the password is sent (and the failed
+    bind is counted) only to domains really needed. If the
+    ``auth.adConcurrentDomains`` option is enabled, the first domain is still
+    tried alone, and all the rest are tried concurrently if it has failed (note
+    that the password is sent to all of them then, even if the higher-priority
+    one succeeds).
     """
 
     auth_username: str
@@ -161,17 +242,47 @@ async def authenticate(username: str, password: str) -> Optional[User]:
     if not conforming_users:
         return None
 
-    for domain in domains:
-        login: str = '@'.join([auth_username, domain.domain])
-        user: Optional[User] = conforming_users.get(login, None)
-        if user is None:
-            continue
-        if not await domain.authenticate(login, password):
-            continue
-        logger.debug(
-            f"successfully authenticated user with id='{user.id}'",
+    candidates: List[Tuple[ActiveDirectoryDomain, User]] = [
+        (d, conforming_users['@'.join([auth_username, d.domain])])
+        for d in domains
+        if '@'.join([auth_username, d.domain]) in conforming_users
+    ]
+    if not config.AUTH['ad_concurrent_domains']:
+        for domain, user in candidates:
+            if await _try_domain(domain, user, password):
+                return _succeeded(user)
+        return None
+
+    domain, user = candidates[0]
+    if await _try_domain(domain, user, password):
+        return _succeeded(user)
+
+    # Trying the rest of domains concurrently, but respecting their order: the
+    # succeeded domain wins only when all higher-priority ones have failed.
+    # Binds already running in the thread pool can't be cancelled, so all of
+    # them are waited for.
+    rest: List[Tuple[ActiveDirectoryDomain, User]] = candidates[1:]
+    results: List[bool] = await asyncio.gather(*[_try_domain(d, u, password) for d, u in rest])
+    for (domain, user), succeed in zip(rest, results):
+        if succeed:
+            return _succeeded(user)
+    return None
+
+
+async def _try_domain(domain: ActiveDirectoryDomain, user: User, password: str) -> bool:
+    try:
+        return await domain.authenticate(user.login, password)
+    except Exception as e:
+        logger.error(
+            f"failed to authenticate '{user.login}' within '{domain.domain}': {e}",
             'aaa backend [ad]'
         )
-        return user
-    return None
+        return False
+
 
+def _succeeded(user: User) -> User:
+    logger.debug(
+        f"successfully authenticated user with id='{user.id}'",
+        'aaa backend [ad]'
+    )
+    return user
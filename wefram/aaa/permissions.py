@@ -5,8 +5,9 @@ permissions and the registration and operational functionality.
 
 from typing import *
 from dataclasses import dataclass
+import hashlib
 from .. import logger, apps
-from ..tools import CSTYLE, get_calling_app
+from ..tools import CSTYLE, get_calling_app, all_in
 from ..types.l10n import L10nStr
 
 
@@ -16,8 +17,14 @@ __all__ = [
     'PermissionsItems',
     'PermissionsSet',
     'PermissionsSchema',
+    'Requirement',
     'registered',
     'register',
+    'freeze',
+    'is_frozen',
+    'version',
+    'mask_of',
+    'requirement',
     'get_permissions_set',
     'get_schema',
 ]
@@ -52,6 +59,132 @@ PermissionsSchema = List[dict]
 registered: Permissions = []
 
 
+# The permission scope -> bit mapping, made by :func:`freeze` at the startup. The
+# 'authenticated' pseudo-scope always has the lowest bit.
+_bits: Dict[str, int] = {}
+
+# The digest of the current bits mapping, used to validate masks stored
+# outside of the process (in the sessions, for example).
+_version: Optional[str] = None
+
+# The memo of compiled requirements by scopes tuples.
+_requirements: Dict[Tuple[str, ...], 'Requirement'] = {}
+
+
+class Requirement:
+    """ The precompiled set of required permission scopes. The scopes' mask is
+    computed once (on the first check after the registry has been frozen), so
+    every check is a single bitwise ``AND`` operation.
+
+    If any of required scopes is not registered in the project - the check
+    falls back to the plain scopes list search.
+    """
+
+    __slots__ = ('scopes', 'guest', '_mask', '_version')
+
+    def __init__(self, scopes: Sequence[str]):
+        self.scopes: Tuple[str, ...] = tuple(scopes)
+        self.guest: bool = bool(self.scopes) and self.scopes[0].lower() == 'guest'
+        self._mask: Optional[int] = None
+        self._version: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"Requirement{list(self.scopes)}"
+
+    @property
+    def mask(self) -> Optional[int]:
+        """ Returns the required scopes mask, or ``None`` if it cannot be made
+        (the registry is not frozen yet or some scope is not registered). """
+
+        if self._version != _version or _version is None:
+            self._mask = mask_of(self.scopes, strict=True) if _version is not None else None
+            self._version = _version
+        return self._mask
+
+    def test(self, mask: int, scopes: Sequence[str]) -> bool:
+        """ Returns ``True`` if all required scopes are present in the given
+        permissions, given both as the bitset mask and as the scopes list. """
+
+        required: Optional[int] = self.mask
+        if required is None:
+            return all_in(self.scopes, scopes)
+        return (mask & required) == required
+
+
+def _assign_bit(key: str) -> None:
+    if key in _bits:
+        return
+    _bits[key] = 1 << len(_bits)
+
+
+def freeze() -> None:
+    """ Freezes the registered permissions into the permission scope -> bit
+    mapping. Called once at the project startup, after all apps have been
+    loaded. The bits are assigned in the sorted order of scopes, so all
+    processes of the project have the same mapping. Permissions registered
+    after the freezing get next bits. """
+
+    _bits.clear()
+    _assign_bit('authenticated')
+    [_assign_bit(key) for key in sorted(set([p.key for p in registered]))]
+    _update_version()
+
+
+def _update_version() -> None:
+    global _version
+
+    _version = hashlib.md5('|'.join(_bits.keys()).encode('utf-8')).hexdigest()
+    _requirements.clear()
+
+
+def is_frozen() -> bool:
+    """ Returns ``True`` if the permissions registry has been frozen. """
+
+    return _version is not None
+
+
+def version() -> Optional[str]:
+    """ Returns the digest of the current scope -> bit mapping, or ``None``
+    if the registry is not frozen yet. """
+
+    return _version
+
+
+def mask_of(scopes: Iterable[str], strict: bool = False) -> Optional[int]:
+    """ Returns the bitset mask for the given permission scopes.
+
+    :param scopes:
+        The list of permission scopes.
+    :param strict:
+        If set to ``True`` - returns ``None`` if any of given scopes is not
+        registered; otherwise unregistered scopes are ignored.
+    :return:
+        The integer bitset mask.
+    """
+
+    mask: int = 0
+    for scope in scopes:
+        bit: Optional[int] = _bits.get(scope)
+        if bit is None:
+            if strict:
+                return None
+            continue
+        mask |= bit
+    return mask
+
+
+def requirement(scopes: Union[str, Sequence[str], Requirement]) -> Requirement:
+    """ Returns the (memoized) compiled requirement for the given scopes. """
+
+    if isinstance(scopes, Requirement):
+        return scopes
+    key: Tuple[str, ...] = (scopes, ) if isinstance(scopes, str) else tuple(scopes)
+    compiled: Optional[Requirement] = _requirements.get(key)
+    if compiled is None:
+        compiled = _requirements[key] = Requirement(key)
+    return compiled
+
+
 def register(
         name: str,
         caption: Union[str, L10nStr],
@@ -105,6 +238,9 @@ def register(
         caption=caption
     )
     registered.append(p)
+    if _version is not None and p.key not in _bits:
+        _assign_bit(p.key)
+        _update_version()
     logger.debug(f"registered permission {CSTYLE['red']}{p}{CSTYLE['clear']}")
     return p
 
@@ -4,16 +4,23 @@ functionality of the project.
 """
 
 import importlib
+import asyncio
 from typing import *
 import jwt
 import datetime
+from sqlalchemy import event
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.orm import Session as OrmSession, ORMExecuteState, object_session
+from sqlalchemy.util.concurrency import await_only
 from ..exceptions import AuthenticationFailed
 from ..runtime import context
-from ..tools import all_in, get_calling_module
-from ..models import User, Session, RefreshToken, SessionUser, SettingsCatalog
+from ..tools import get_calling_module
+from ..models import User, Role, Session, RefreshToken, SessionUser, SettingsCatalog
+from ..models.aaa import UsersRoles
 from ..private.const.aaa import SETTINGS_JWT_EXPIRE
-from .. import config, logger, settings
+from .. import config, ds, logger, settings
 from .tools import *
+from .permissions import Requirement, requirement
 
 
 __all__ = [
@@ -22,6 +29,8 @@ __all__ = [
     'refresh_with_token',
     'drop_user_sessions_by_id',
     'drop_user_sessions_by_login',
+    'permissions_for_user',
+    'roles_version',
     'permitted',
     'get_current_user',
     'get_current_user_id',
@@ -188,8 +197,7 @@ async def drop_user_sessions_by_id(user_id: str) -> None:
     :type user_id: str
     """
 
-    sessions: List[Session] = await Session.fetch_all_for_user(user_id)
-    [await sess.drop() for sess in sessions]
+    await Session.drop_all_for_user(str(user_id))
 
 
 async def drop_user_sessions_by_login(login: str) -> None:
@@ -206,11 +214,147 @@ async def drop_user_sessions_by_login(login: str) -> None:
     await drop_user_sessions_by_id(user.id)
 
 
-def permitted(scopes: Union[str, Sequence[str]]) -> bool:
+# The Redis key holding the roles version number. The number is incremented every
+# time any role (or the set of user's roles) is changed and committed, invalidating
+# the per-worker roles cache below and (optionally) the permissions of live sessions.
+ROLES_VERSION_KEY: str = 'aaa:roles:version'
+
+# The per-worker materialized map of role id -> role's permissions, valid
+# for the 'version' of roles only.
+_roles_cache: Dict[str, Any] = {
+    'version': None,
+    'roles': {}
+}
+
+
+async def roles_version() -> str:
+    """ Returns the current version of roles (the value which changes every time
+    any role or any user's set of roles is changed). """
+
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    version: Optional[Union[str, bytes]] = await cn.get(ROLES_VERSION_KEY)
+    if isinstance(version, bytes):
+        version = version.decode('utf-8')
+    return version or '0'
+
+
+async def _load_roles(version: str) -> Dict[str, FrozenSet[str]]:
+    """ (Re)loads all roles' permissions to the per-worker cache. """
+
+    rows = (await ds.execute(ds.select(Role.id, Role.permissions))).all()
+    roles: Dict[str, FrozenSet[str]] = {
+        str(role_id): frozenset(permissions or ()) for role_id, permissions in rows
+    }
+    _roles_cache['version'] = version
+    _roles_cache['roles'] = roles
+    return roles
+
+
+async def permissions_for_user(user_id: str) -> List[str]:
+    """ Returns a list of all permission scopes the given user (by his/her ID)
+    is accessible to. The roles' permissions are taken from the per-worker
+    cache which is invalidated on any role change, so the only database query
+    made is the fetch of the user's roles IDs.
+
+    Example of the result:
+    ['app1.permission1', 'app1.permission2', 'app2.some_permission']
+
+    :param user_id: the ID of the user for which return permissions for
+    :type user_id: str
+
+    :return: list of permissions
+    :rtype: List[str]
+    """
+
+    version: str = await roles_version()
+    roles: Dict[str, FrozenSet[str]] = _roles_cache['roles']
+    if _roles_cache['version'] != version:
+        roles = await _load_roles(version)
+
+    role_ids: List[str] = [
+        str(role_id) for role_id in await ds.all(ds.select(UsersRoles.role_id).where(UsersRoles.user_id == user_id))
+    ]
+    if any((role_id not in roles) for role_id in role_ids):
+        # The role has been created after the cache has been loaded
+        roles = await _load_roles(version)
+
+    permissions: Set[str] = set()
+    for role_id in role_ids:
+        permissions.update(roles.get(role_id, ()))
+    return list(permissions)
+
+
+def _mark_roles_changed(session: Optional[OrmSession]) -> None:
+    if session is None:
+        return
+    session.info['aaa_roles_changed'] = True
+
+
+def _on_role_written(mapper, connection, target) -> None:
+    _mark_roles_changed(object_session(target))
+
+
+def _on_user_roles_changed(target, value, initiator) -> None:
+    _mark_roles_changed(object_session(target))
+
+
+def _on_orm_execute(state: ORMExecuteState) -> None:
+    # Bulk (Core-level) updates and deletes do not emit mapper events
+    if not (state.is_update or state.is_delete):
+        return
+    table: Any = getattr(state.statement, 'table', None)
+    if table is Role.__table__ or table is UsersRoles.__table__:
+        _mark_roles_changed(state.session)
+
+
+async def _bump_roles_version() -> None:
+    # The transaction is committed already, so the failure is only logged: the
+    # write has succeeded, and sessions get the changes on the next bump.
+    try:
+        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+        await cn.incr(ROLES_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"failed to bump the roles version after roles change: {e}")
+
+
+def _on_commit(session: OrmSession) -> None:
+    if not session.info.pop('aaa_roles_changed', False):
+        return
+    bump: Coroutine = _bump_roles_version()
+    try:
+        await_only(bump)
+    except MissingGreenlet:
+        # Committed not within the greenlet-backed async session, so bumping
+        # on the loop right after the commit
+        try:
+            asyncio.get_running_loop().create_task(bump)
+        except RuntimeError:
+            bump.close()
+            logger.error("failed to bump the roles version after roles change: no event loop running")
+
+
+def _on_rollback(session: OrmSession) -> None:
+    session.info.pop('aaa_roles_changed', None)
+
+
+event.listen(Role, 'after_insert', _on_role_written)
+event.listen(Role, 'after_update', _on_role_written)
+event.listen(Role, 'after_delete', _on_role_written)
+event.listen(User.roles, 'append', _on_user_roles_changed)
+event.listen(User.roles, 'remove', _on_user_roles_changed)
+event.listen(OrmSession, 'do_orm_execute', _on_orm_execute)
+event.listen(OrmSession, 'after_commit', _on_commit)
+event.listen(OrmSession, 'after_rollback', _on_rollback)
+
+
+def permitted(scopes: Union[str, Sequence[str], Requirement]) -> bool:
     """ Checks the current user has given permission scopes in his/her session.
+    The check is made using the session's permissions bitset, so is a single
+    bitwise operation for the registered permissions.
 
-    :param scopes: the scope (or scopes) required to be permitted for the user
-    :type scopes: str, List(str)
+    :param scopes: the scope (or scopes) required to be permitted for the user,
+        or the precompiled :class:`~wefram.aaa.permissions.Requirement`
+    :type scopes: str, List(str), Requirement
 
     :return: True if the user has all permissions, False otherwise
     :rtype: bool
@@ -219,8 +363,7 @@ def permitted(scopes: Union[str, Sequence[str]]) -> bool:
     permissions: List[str] = context['permissions']
     if not permissions:
         return False
-    scopes: List[str] = list(scopes) if isinstance(scopes, (list, tuple)) else [scopes, ]
-    return all_in(scopes, permissions)
+    return requirement(scopes).test(context.get('permissions_mask', 0), permissions)
 
 
 def get_current_user() -> Optional[SessionUser]:
@@ -0,0 +1,129 @@
+"""
+Provides the brute-force protection of the log-in procedure: the Redis-backed
+sliding window limiter of failed authentication attempts, counted both by the
+login and by the client IP address.
+
+The limiter never delays the request itself: when the limit is reached, the
+caller gets the number of seconds the client have to wait, so no worker and no
+database connection is held by the blocked client. The limits are read from
+the settings cached in Redis (or from the project configuration, if the
+settings are not cached), so the limiter never queries the database.
+"""
+
+from typing import *
+import time
+import uuid
+from .. import ds, config
+from ..tools import json_decode
+from ..models import SettingsCatalog
+from ..private.const.aaa import SETTINGS_LOGIN_ATTEMPTS, SETTINGS_LOGIN_ATTEMPTS_IP, SETTINGS_LOGIN_WINDOW
+
+
+__all__ = [
+    'retry_after',
+    'failed',
+    'succeed'
+]
+
+
+def _login_key(login: str) -> str:
+    return f"aaa:throttle:login:{login.strip().lower()}"
+
+
+def _ip_key(ip: str) -> str:
+    return f"aaa:throttle:ip:{ip}"
+
+
+async def _limits() -> Tuple[int, int, int]:
+    """ Returns the (attempts per login, attempts per IP, window in seconds) triple.
+
+    The limits are taken from the settings catalog cached in Redis. The catalog
+    is not loaded from the database here, even if it is not cached: the login
+    storm must not take database connections, so the configured defaults are
+    used until the settings are loaded (and cached) by the one or another
+    request.
+    """
+
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    cached: Optional[str] = await cn.get(SettingsCatalog.redis_key_for('system.aaa'))
+    values: Dict[str, Any] = (json_decode(cached) if cached else None) or {}
+
+    def _value(name: str) -> int:
+        value: Any = values.get(name, None)
+        return int((value if value is not None else config.AUTH[name]) or 0)
+
+    return (
+        _value(SETTINGS_LOGIN_ATTEMPTS),
+        _value(SETTINGS_LOGIN_ATTEMPTS_IP),
+        _value(SETTINGS_LOGIN_WINDOW) * 60
+    )
+
+
+async def retry_after(login: str, ip: Optional[str]) -> int:
+    """ Checks the failed attempts of the given login and from the given IP address
+    within the sliding window. Returns 0 if the next attempt is allowed, or
+    the number of seconds after which it will be.
+
+    :param login: the login (username) being tried
+    :param ip: the client IP address, if known
+    :return: the number of seconds to wait, or 0 if the attempt is permitted
+    """
+
+    per_login: int
+    per_ip: int
+    window: int
+    per_login, per_ip, window = await _limits()
+    if not window:
+        return 0
+
+    now: float = time.time()
+    checks: List[Tuple[str, int]] = [(_login_key(login), per_login)]
+    if ip:
+        checks.append((_ip_key(ip), per_ip))
+    checks = [(key, limit) for key, limit in checks if limit > 0]
+    if not checks:
+        return 0
+
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    pipe = cn.pipeline(transaction=False)
+    for key, limit in checks:
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zcard(key)
+        pipe.zrange(key, -limit, -limit, withscores=True)
+    results: list = await pipe.execute()
+
+    wait: float = 0
+    for i, (key, limit) in enumerate(checks):
+        count: int = results[i * 3 + 1]
+        if count < limit:
+            continue
+        # The oldest of the last `limit` attempts leaves the window first
+        oldest: float = results[i * 3 + 2][0][1] if results[i * 3 + 2] else now
+        wait = max(wait, oldest + window - now)
+    return int(wait) + 1 if wait > 0 else 0
+
+
+async def failed(login: str, ip: Optional[str]) -> None:
+    """ Registers the failed authentication attempt for the given login and IP. """
+
+    window: int = (await _limits())[2]
+    if not window:
+        return
+
+    now: float = time.time()
+    keys: List[str] = [_login_key(login)] + ([_ip_key(ip)] if ip else [])
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    pipe = cn.pipeline(transaction=False)
+    for key in keys:
+        pipe.zadd(key, {uuid.uuid4().hex: now})
+        pipe.expire(key, window)
+    await pipe.execute()
+
+
+async def succeed(login: str) -> None:
+    """ Resets the failed attempts counter for the given login after the
+    successful authentication. The per-IP counter is kept intact to not let
+    the one valid account to be used for resetting the IP limit. """
+
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    await cn.unlink(_login_key(login))
@@ -13,6 +13,7 @@ from starlette.websockets import WebSocket
 from starlette.exceptions import HTTPException
 from starlette.responses import RedirectResponse
 from ..tools import get_calling_app
+from .permissions import Requirement
 
 
 __all__ = [
@@ -30,7 +31,7 @@ GUEST: str = 'guest'
 
 def test_request_scope(
         conn: HTTPConnection,
-        scopes: Sequence[str],
+        scopes: Union[Sequence[str], Requirement],
         status_code: int = 403,
         redirect: str = None
 ) -> Optional[str]:
@@ -48,7 +49,7 @@ def test_request_scope(
         The ASGI connection for which context to test the access;
     :param scopes:
         The requested scoped to be accessible by the current (based on the connection
-        session) user;
+        session) user, or the precompiled :class:`~wefram.aaa.permissions.Requirement`;
     :param status_code:
         Which status code to raise if the user has no access (but IS logged-in);
     :param redirect:
@@ -56,19 +57,18 @@ def test_request_scope(
         the calling client to the given URL; optional argument;
     """
 
-    if scopes and scopes[0].lower() == 'guest' and not isinstance(conn.user, UnauthenticatedUser) and conn.user is not None:
+    required: Requirement = scopes if isinstance(scopes, Requirement) else Requirement(scopes)
+    if required.guest and not isinstance(conn.user, UnauthenticatedUser) and conn.user is not None:
         if redirect is not None:
             return redirect
         raise HTTPException(403)
-    if scopes and scopes[0].lower() == 'guest':
+    if required.guest:
         return
     if isinstance(conn.user, UnauthenticatedUser) or conn.user is None:
         if redirect is not None:
             return redirect
         raise HTTPException(401)
-    for scope in scopes:
-        if scope in conn.auth.scopes:
-            continue
+    if not required.test(getattr(conn.user, 'permissions_mask', 0), conn.auth.scopes):
         raise HTTPException(status_code)
 
 
@@ -114,10 +114,10 @@ def requires(
         return f"{app}.{scope}"
 
     app: str = get_calling_app()
-    scopes_list = [
+    scopes_list = Requirement([
         _ensure_app_prefix(scope)
         for scope in ([scopes] if isinstance(scopes, str) else list(scopes))
-    ]
+    ])
 
     def decorator(func: Callable) -> Callable:
         # This part of code is just a copy from upper 'requires' Starlette default
@@ -13,6 +13,7 @@ from sqlalchemy.sql.elements import (
     ClauseList,
     ClauseElement)
 from sqlalchemy import sql, and_, or_, Column, INT, BIGINT, Integer, BigInteger
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.orm.attributes import QueryableAttribute
 from sqlalchemy.exc import IntegrityError
 from .. import ds, logger, exceptions
@@ -91,6 +92,19 @@ class ModelAPI(EntityAPI):
     Default is ``False``.
     """
 
+    load_options: Optional[List[Any]] = None
+    """ Optional list of SQLAlchemy loader options (``selectinload``, ``joinedload``,
+    ``load_only``, etc) used on read operations. By default (when is ``None``) the
+    loading plan is derived automatically from the requested ``deep`` behaviour and
+    the ``set_name`` (see :meth:`~wefram.ds.orm.model.Meta.loader_options`), which
+    prevents per-object lazy loading of the related objects on JSONify.
+    
+    Set to an empty list to disable eager loading at all, or override the
+    :meth:`loader_options` method for the more complex cases.
+    
+    Default is ``None``.
+    """
+
     @classmethod
     def path_base(cls) -> str:
         """ Overrides the default entity-API path base to the model original name
@@ -254,6 +268,54 @@ class ModelAPI(EntityAPI):
 
         return and_(*conditions)
 
+    def loader_options(self, deep: bool = None, load: Optional[Sequence[str]] = None) -> List[Any]:
+        """ Returns the list of SQLAlchemy loader options used on the read operations.
+
+        :param deep:
+            Do the deep JSONify or not. If omitted - the :py:attr:`default_deep` will be used.
+
+        :param load:
+            The list of relationships names explicitly requested to be loaded (and
+            returned) with objects, see :meth:`requested_load`.
+
+        :return:
+            The list of loader options ready to be passed to the statement ``options()``.
+        """
+
+        if self.load_options is not None:
+            return list(self.load_options) + (
+                self.model.Meta.loader_options(load=load, use_default=False) if load else []
+            )
+        return self.model.Meta.loader_options(
+            deep=(deep if isinstance(deep, bool) else self.default_deep),
+            set_name=self.set_name,
+            load=load
+        )
+
+    def requested_load(self, load: Optional[Union[str, Sequence[str]]]) -> Optional[List[str]]:
+        """ Parses the ``load`` read request argument: the comma-separated list (or
+        the list) of relationships names whose must be loaded and returned with
+        the read objects, even if they are not loaded by default (for example,
+        large members lists).
+
+        :raises ApiError: if there is no such relationship of the model, or it
+            is hidden one.
+        """
+
+        if not load:
+            return None
+        names: List[str] = [
+            camelcase_to_snakecase(n.strip())
+            for n in (load.split(',') if isinstance(load, str) else load)
+            if n and n.strip()
+        ]
+        relationships: Any = sa_inspect(self.model).relationships
+        hidden: List[str] = list(self.model.Meta.hidden or [])
+        for name in names:
+            if name not in relationships or name in hidden:
+                raise exceptions.ApiError(400, f"There is no relationship '{name}' to load")
+        return names or None
+
     async def item_as_json(self, instance: Model, deep: bool = None) -> dict:
         """ Returns the given instance JSONified.
 
@@ -315,8 +377,13 @@ class ModelAPI(EntityAPI):
             })
         return ready_items
 
-    async def read_single(self, key: Union[str, int], deep: bool = None) -> Dict[str, Any]:
-        instance: Optional[Model] = await self.model.get(key)
+    async def read_single(
+            self,
+            key: Union[str, int],
+            deep: bool = None,
+            load: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        instance: Optional[Model] = await self.model.get(key, options=self.loader_options(deep, load))
 
         # If the entity object has not been found - raise 404
         if instance is None:
@@ -338,7 +405,8 @@ class ModelAPI(EntityAPI):
             deep: bool = None,
             like: Optional[str] = None,
             ilike: Optional[str] = None,
-            filters: Optional[Dict[str, Union[str, int, None, Sequence]]] = None
+            filters: Optional[Dict[str, Union[str, int, None, Sequence]]] = None,
+            load: Optional[List[str]] = None
     ) -> [dict, List[dict]]:
         keys: List[str, int]
         keys_clause: Optional[Union[ClauseList, ClauseElement]] = \
@@ -393,6 +461,10 @@ class ModelAPI(EntityAPI):
         if order_clause:
             stmt = stmt.order_by(*order_clause)
 
+        load_options: List[Any] = self.loader_options(deep, load)
+        if load_options:
+            stmt = stmt.options(*load_options)
+
         instances: List[Any] = await db.all(stmt)
         items: List[dict] = await self.items_as_json(instances, deep=deep)
 
@@ -413,9 +485,11 @@ class ModelAPI(EntityAPI):
             ilike: Optional[str] = None,
             **filters: Any
     ) -> Union[Model, dict, List[dict]]:
+        load: Optional[List[str]] = self.requested_load(filters.pop('load', None))
+
         # If requested the single entity object to be fetched
         if self.key:
-            return await self.read_single(self.key, deep=deep)
+            return await self.read_single(self.key, deep=deep, load=load)
 
         # If has been requested a list of entity objects
         return await self.read_many(
@@ -427,7 +501,8 @@ class ModelAPI(EntityAPI):
             deep=deep,
             like=like,
             ilike=ilike,
-            filters=filters
+            filters=filters,
+            load=load
         )
 
     async def options(
@@ -71,7 +71,7 @@ class FilesModelAPI(SortedModelMixin, ModelAPI):
                 if not form_name.startswith('file_upload_data_'):
                     continue
                 file: UploadFile = form_value
-                file_id: str = ds.storages.upload_file_content(
+                file_id: str = await ds.storages.store_file_object(
                     cls.storage_entity,
                     file.file,
                     file.filename,
@@ -88,7 +88,7 @@ class FilesModelAPI(SortedModelMixin, ModelAPI):
         # Else, handles single file upload.
         elif 'file_upload_data' in with_values and isinstance(with_values['file_upload_data'], UploadFile):
             file: UploadFile = with_values['file_upload_data']
-            file_id: str = ds.storages.upload_file_content(
+            file_id: str = await ds.storages.store_file_object(
                 cls.storage_entity,
                 file.file,
                 file.filename,
@@ -114,7 +114,7 @@ class FilesModelAPI(SortedModelMixin, ModelAPI):
             )
         file: UploadFile = values.get('file', None)
         if file is not None:
-            file_id: str = ds.storages.upload_file_content(
+            file_id: str = await ds.storages.store_file_object(
                 self.storage_entity,
                 file.file,
                 file.filename,
@@ -4,7 +4,7 @@ The Wefram, like any of its based app, has general entities about to be register
 handled like any other entity of any app.
 """
 
-from . import config, ds, aaa, settings
+from . import config, ds, aaa, settings, mail
 from .settings.props import NumberProp, NumberMMProp, BooleanProp
 from .private import const
 from .l10n import lazy_gettext
@@ -34,14 +34,16 @@ settings.register(
         (const.aaa.SETTINGS_REMEMBER_USERNAME, BooleanProp(const.aaa.MSG_SETTINGS_REMEMBER_USERNAME, inline=True)),
         (const.aaa.SETTINGS_SESSION_LIFETIME, NumberProp(const.aaa.MSG_SETTINGS_SESSION_LIFETIME)),
         (const.aaa.SETTINGS_JWT_EXPIRE, NumberProp(const.aaa.MSG_SETTINGS_JWT_LIFETIME)),
-        (const.aaa.SETTINGS_FAILEDAUTH_DELAY, NumberMMProp(const.aaa.MSG_SETTINGS_FAILEDAUTH_DELAY, 0, 5, 1)),
-        (const.aaa.SETTINGS_SUCCEEDAUTH_DELAY, NumberMMProp(const.aaa.MSG_SETTINGS_SUCCEEDAUTH_DELAY, 0, 5, 1)),
+        (const.aaa.SETTINGS_LOGIN_ATTEMPTS, NumberMMProp(const.aaa.MSG_SETTINGS_LOGIN_ATTEMPTS, 0, 100, 1)),
+        (const.aaa.SETTINGS_LOGIN_ATTEMPTS_IP, NumberMMProp(const.aaa.MSG_SETTINGS_LOGIN_ATTEMPTS_IP, 0, 10000, 1)),
+        (const.aaa.SETTINGS_LOGIN_WINDOW, NumberProp(const.aaa.MSG_SETTINGS_LOGIN_WINDOW)),
     ],
     defaults={
         const.aaa.SETTINGS_REMEMBER_USERNAME: config.AUTH[const.aaa.SETTINGS_REMEMBER_USERNAME],
         const.aaa.SETTINGS_SESSION_LIFETIME: config.AUTH[const.aaa.SETTINGS_SESSION_LIFETIME],
         const.aaa.SETTINGS_JWT_EXPIRE: config.AUTH[const.aaa.SETTINGS_JWT_EXPIRE],
-        const.aaa.SETTINGS_FAILEDAUTH_DELAY: config.AUTH[const.aaa.SETTINGS_FAILEDAUTH_DELAY],
-        const.aaa.SETTINGS_SUCCEEDAUTH_DELAY: config.AUTH[const.aaa.SETTINGS_SUCCEEDAUTH_DELAY],
+        const.aaa.SETTINGS_LOGIN_ATTEMPTS: config.AUTH[const.aaa.SETTINGS_LOGIN_ATTEMPTS],
+        const.aaa.SETTINGS_LOGIN_ATTEMPTS_IP: config.AUTH[const.aaa.SETTINGS_LOGIN_ATTEMPTS_IP],
+        const.aaa.SETTINGS_LOGIN_WINDOW: config.AUTH[const.aaa.SETTINGS_LOGIN_WINDOW],
     },
 )
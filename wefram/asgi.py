@@ -7,11 +7,10 @@ from typing import *
 import asyncio
 from starlette.applications import Starlette
 from starlette.routing import Mount
-from starlette.staticfiles import StaticFiles
 from starlette.middleware import Middleware
 from starlette.exceptions import ExceptionMiddleware
 
-from . import defaults, run, config, requests, logger, ds, runtime, middlewares, ui
+from . import defaults, run, config, requests, logger, ds, runtime, middlewares, ui, tasks
 from .requests import Route
 
 
@@ -20,7 +19,8 @@ __all__ = [
     'get_default_path',
     'default_route',
     'root_route',
-    'start'
+    'start',
+    'shutdown'
 ]
 
 
@@ -40,7 +40,7 @@ async def default_route(request: requests.Request) -> requests.Response:
 
     rop: str = request.path_params['rest_of_path'].replace('..', '')
     if requests.is_static_path(rop):
-        return requests.PrebuiltFile(rop)
+        return await _statics.get_response(rop.lstrip('/'), request.scope)
 
     return requests.RedirectResponse(get_default_path(), 307)
 
@@ -65,6 +65,14 @@ async def start():
         (await _start()) if asyncio.iscoroutinefunction(_start) else _start()
 
     await ds.history.start()
+    await tasks.start()
+
+
+async def shutdown():
+    """ Called on the process shutdown. """
+
+    await tasks.stop()
+    await ds.storages.close_backends()
 
 
 # The place where ASGI about to be prepared to start
@@ -78,16 +86,18 @@ logger.debug(
 )
 
 
+_statics: requests.PrecompressedStaticFiles = requests.PrecompressedStaticFiles(directory=config.STATICS_ROOT)
 _routes: List[Union[requests.Route, Mount]] = requests.routing.registered
 _routes.insert(0, Route('/', root_route, methods=['GET']))
 _routes.append(Route(config.URL['login_screen'], ui.screens.Screen.endpoint, methods=['GET']))
-_routes.append(Mount(defaults.URL_STATICS, app=StaticFiles(directory=config.STATICS_ROOT), name='static'))
+_routes.append(Mount(defaults.URL_STATICS, app=_statics, name='static'))
 _routes.append(Route('/{rest_of_path:path}', default_route, methods=['GET']))
 
 
 # Creating the ASGI actual instance
 asgi = Starlette(
     on_startup=[start],
+    on_shutdown=[shutdown],
     middleware=_middlewares,
     routes=_routes,
     debug=False
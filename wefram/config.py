@@ -160,10 +160,14 @@ AUTH: dict = {
     'audience': read('auth.audience', defaults.AUTH_AUDIENCE, 'str'),
     'jwt_expire_mins': read('auth.jwtExpireMins', defaults.AUTH_JWT_EXPIRE_MINS, 'int'),
     'session_timeout_mins': read('auth.sessionTimeoutMins', defaults.AUTH_SESSION_TIMEOUT_MINS, 'int'),
-    'failed_auth_delay': read('auth.failedAuthDelay', defaults.AUTH_FAILED_AUTH_DELAY, 'int'),
-    'succeed_auth_delay': read('auth.succeedAuthDelay', defaults.AUTH_SUCCEED_AUTH_DELAY, 'int'),
+    'login_attempts': read('auth.loginAttempts', defaults.AUTH_LOGIN_ATTEMPTS, 'int'),
+    'login_attempts_ip': read('auth.loginAttemptsIp', defaults.AUTH_LOGIN_ATTEMPTS_IP, 'int'),
+    'login_window_mins': read('auth.loginWindowMins', defaults.AUTH_LOGIN_WINDOW_MINS, 'int'),
     'remember_username': read('auth.rememberUsername', defaults.AUTH_REMEMBER_USERNAME, 'bool'),
-    'backends': read('auth.backends') or defaults.AUTH_BACKENDS
+    'push_permissions': read('auth.pushPermissions', defaults.AUTH_PUSH_PERMISSIONS, 'bool'),
+    'session_log_keep_days': read('auth.sessionLogKeepDays', defaults.AUTH_SESSION_LOG_KEEP_DAYS, 'int'),
+    'backends': read('auth.backends') or defaults.AUTH_BACKENDS,
+    'ad_concurrent_domains': read('auth.adConcurrentDomains', defaults.AUTH_AD_CONCURRENT_DOMAINS, 'bool')
 }
 DATABASE: dict = {
     'user': read('db.user', defaults.DATABASE_USER, 'str'),
@@ -180,6 +184,43 @@ REDIS: dict = {
     'uri': read('redis.uri', defaults.REDIS_URI, 'str'),
     'password': read('redis.password', defaults.REDIS_PASSWORD) or None
 }
+MAIL: dict = {
+    'pool_size': read('mail.poolSize', defaults.MAIL_POOL_SIZE, 'int'),
+    'host_concurrency': read('mail.hostConcurrency', defaults.MAIL_HOST_CONCURRENCY, 'int'),
+    'idle_timeout': read('mail.idleTimeout', defaults.MAIL_IDLE_TIMEOUT, 'int'),
+    'timeout': read('mail.timeout', defaults.MAIL_TIMEOUT, 'int'),
+    'retries': read('mail.retries', defaults.MAIL_RETRIES, 'int'),
+    'backoff': read('mail.backoff', defaults.MAIL_BACKOFF, 'int'),
+    'batch_size': read('mail.batchSize', defaults.MAIL_BATCH_SIZE, 'int')
+}
+JOBS: dict = {
+    'concurrency': read('jobs.concurrency', defaults.JOBS_CONCURRENCY, 'int'),
+    'visibility_timeout': read('jobs.visibilityTimeout', defaults.JOBS_VISIBILITY_TIMEOUT, 'int')
+}
+STORAGE: dict = {
+    'dedup': read('storage.dedup', defaults.STORAGE_DEDUP, 'bool'),
+    'upload_expire': read('storage.uploadExpire', defaults.STORAGE_UPLOAD_EXPIRE, 'int'),
+    'meta_cache_size': read('storage.metaCacheSize', defaults.STORAGE_META_CACHE_SIZE, 'int'),
+    'meta_revalidate': read('storage.metaRevalidate', defaults.STORAGE_META_REVALIDATE, 'int'),
+    'offload': (read('storage.offload', defaults.STORAGE_OFFLOAD, 'str') or '').lower(),
+    'offload_files_prefix': read('storage.offloadFilesPrefix', defaults.STORAGE_OFFLOAD_FILES_PREFIX, 'str'),
+    'offload_assets_prefix': read('storage.offloadAssetsPrefix', defaults.STORAGE_OFFLOAD_ASSETS_PREFIX, 'str'),
+    'image_workers': read('storage.imageWorkers', defaults.STORAGE_IMAGE_WORKERS, 'int'),
+    'image_max_size': read('storage.imageMaxSize', defaults.STORAGE_IMAGE_MAX_SIZE, 'int'),
+    'image_quality': read('storage.imageQuality', defaults.STORAGE_IMAGE_QUALITY, 'int'),
+    'image_max_age': read('storage.imageMaxAge', defaults.STORAGE_IMAGE_MAX_AGE, 'int'),
+    'gc_schedule': read('storage.gcSchedule', defaults.STORAGE_GC_SCHEDULE, 'str') or None,
+    'gc_grace_hours': read('storage.gcGraceHours', defaults.STORAGE_GC_GRACE_HOURS, 'float'),
+    'gc_batch_size': read('storage.gcBatchSize', defaults.STORAGE_GC_BATCH_SIZE, 'int'),
+    'gc_batch_pause': read('storage.gcBatchPause', defaults.STORAGE_GC_BATCH_PAUSE, 'float'),
+    'backends': read('storage.backends') or {},
+    'default_backend': read('storage.defaultBackend', defaults.STORAGE_DEFAULT_BACKEND, 'str') or 'local'
+}
+STATICS: dict = {
+    'precompress': read('statics.precompress', defaults.STATICS_PRECOMPRESS, 'bool'),
+    'immutable_max_age': read('statics.immutableMaxAge', defaults.STATICS_IMMUTABLE_MAX_AGE, 'int'),
+    'stat_revalidate': read('statics.statRevalidate', defaults.STATICS_STAT_REVALIDATE, 'int')
+}
 SETTINGS_ALWAYS_LOADED: list = read('settings.alwaysLoaded') or []
 DEFAULT_LOCALE: str = read('locale.default', defaults.DEFAULT_LOCALE, 'str')
 DESKTOP: dict = {
@@ -66,9 +66,13 @@ CONFIG_JSON = {
         "jwtExpireMins": defaults.AUTH_JWT_EXPIRE_MINS,
         "sessionTimeoutMins": defaults.AUTH_SESSION_TIMEOUT_MINS,
         "rememberUsername": defaults.AUTH_REMEMBER_USERNAME,
-        "failedAuthDelay": defaults.AUTH_FAILED_AUTH_DELAY,
-        "succeed_auth_delay": defaults.AUTH_SUCCEED_AUTH_DELAY,
+        "pushPermissions": defaults.AUTH_PUSH_PERMISSIONS,
+        "sessionLogKeepDays": defaults.AUTH_SESSION_LOG_KEEP_DAYS,
+        "loginAttempts": defaults.AUTH_LOGIN_ATTEMPTS,
+        "loginAttemptsIp": defaults.AUTH_LOGIN_ATTEMPTS_IP,
+        "loginWindowMins": defaults.AUTH_LOGIN_WINDOW_MINS,
         "backends": defaults.AUTH_BACKENDS,
+        "adConcurrentDomains": defaults.AUTH_AD_CONCURRENT_DOMAINS,
     },
     "url": {
         "default": defaults.URL_DEFAULT,
@@ -90,6 +94,43 @@ CONFIG_JSON = {
         "uri": defaults.REDIS_URI,
         "password": defaults.REDIS_PASSWORD
     },
+    "mail": {
+        "poolSize": defaults.MAIL_POOL_SIZE,
+        "hostConcurrency": defaults.MAIL_HOST_CONCURRENCY,
+        "idleTimeout": defaults.MAIL_IDLE_TIMEOUT,
+        "timeout": defaults.MAIL_TIMEOUT,
+        "retries": defaults.MAIL_RETRIES,
+        "backoff": defaults.MAIL_BACKOFF,
+        "batchSize": defaults.MAIL_BATCH_SIZE
+    },
+    "jobs": {
+        "concurrency": defaults.JOBS_CONCURRENCY,
+        "visibilityTimeout": defaults.JOBS_VISIBILITY_TIMEOUT
+    },
+    "storage": {
+        "dedup": defaults.STORAGE_DEDUP,
+        "uploadExpire": defaults.STORAGE_UPLOAD_EXPIRE,
+        "metaCacheSize": defaults.STORAGE_META_CACHE_SIZE,
+        "metaRevalidate": defaults.STORAGE_META_REVALIDATE,
+        "offload": defaults.STORAGE_OFFLOAD,
+        "offloadFilesPrefix": defaults.STORAGE_OFFLOAD_FILES_PREFIX,
+        "offloadAssetsPrefix": defaults.STORAGE_OFFLOAD_ASSETS_PREFIX,
+        "imageWorkers": defaults.STORAGE_IMAGE_WORKERS,
+        "imageMaxSize": defaults.STORAGE_IMAGE_MAX_SIZE,
+        "imageQuality": defaults.STORAGE_IMAGE_QUALITY,
+        "imageMaxAge": defaults.STORAGE_IMAGE_MAX_AGE,
+        "gcSchedule": defaults.STORAGE_GC_SCHEDULE,
+        "gcGraceHours": defaults.STORAGE_GC_GRACE_HOURS,
+        "gcBatchSize": defaults.STORAGE_GC_BATCH_SIZE,
+        "gcBatchPause": defaults.STORAGE_GC_BATCH_PAUSE,
+        "backends": {},
+        "defaultBackend": defaults.STORAGE_DEFAULT_BACKEND
+    },
+    "statics": {
+        "precompress": defaults.STATICS_PRECOMPRESS,
+        "immutableMaxAge": defaults.STATICS_IMMUTABLE_MAX_AGE,
+        "statRevalidate": defaults.STATICS_STAT_REVALIDATE
+    },
     "uvicorn": {
         "loop": defaults.UVICORN_LOOP,
         "bind": defaults.UVICORN_BIND,
@@ -27,10 +27,14 @@ URL_LOGIN_SCREEN: str = '/workspace/login'
 AUTH_AUDIENCE: str = 'localhost'
 AUTH_JWT_EXPIRE_MINS: int = 0
 AUTH_SESSION_TIMEOUT_MINS: int = 720
-AUTH_FAILED_AUTH_DELAY: int = 2
-AUTH_SUCCEED_AUTH_DELAY: int = 2
+AUTH_LOGIN_ATTEMPTS: int = 5
+AUTH_LOGIN_ATTEMPTS_IP: int = 50
+AUTH_LOGIN_WINDOW_MINS: int = 15
 AUTH_REMEMBER_USERNAME: bool = True
+AUTH_PUSH_PERMISSIONS: bool = False
+AUTH_SESSION_LOG_KEEP_DAYS: int = 365
 AUTH_BACKENDS: list = ['local']
+AUTH_AD_CONCURRENT_DOMAINS: bool = False
 
 DATABASE_USER: str = 'projectdba'
 DATABASE_PASS: str = 'project'
@@ -47,6 +51,38 @@ VOLUME_STATICS: str = 'statics'
 REDIS_URI: str = 'redis://localhost/0'
 REDIS_PASSWORD: Union[str, None] = None
 
+MAIL_POOL_SIZE: int = 4
+MAIL_HOST_CONCURRENCY: int = 8
+MAIL_IDLE_TIMEOUT: int = 60
+MAIL_TIMEOUT: int = 30
+MAIL_RETRIES: int = 3
+MAIL_BACKOFF: int = 5
+MAIL_BATCH_SIZE: int = 100
+
+JOBS_CONCURRENCY: int = 4
+JOBS_VISIBILITY_TIMEOUT: int = 300
+
+STORAGE_DEDUP: bool = False
+STORAGE_UPLOAD_EXPIRE: int = 24 * 60 * 60
+STORAGE_META_CACHE_SIZE: int = 4096
+STORAGE_META_REVALIDATE: int = 5
+STORAGE_OFFLOAD: str = ''  # '', 'x-accel' (nginx) or 'x-sendfile' (Apache, lighttpd)
+STORAGE_OFFLOAD_FILES_PREFIX: str = '/_offload/files'
+STORAGE_OFFLOAD_ASSETS_PREFIX: str = '/_offload/assets'
+STORAGE_IMAGE_WORKERS: int = 2
+STORAGE_IMAGE_MAX_SIZE: int = 4096
+STORAGE_IMAGE_QUALITY: int = 85
+STORAGE_IMAGE_MAX_AGE: int = 365 * 24 * 60 * 60
+STORAGE_GC_SCHEDULE: str = ''  # the cron-like schedule of the automatic GC, disabled by default
+STORAGE_GC_GRACE_HOURS: float = 24
+STORAGE_GC_BATCH_SIZE: int = 100
+STORAGE_GC_BATCH_PAUSE: float = 0.5
+STORAGE_DEFAULT_BACKEND: str = 'local'
+
+STATICS_PRECOMPRESS: bool = True
+STATICS_IMMUTABLE_MAX_AGE: int = 365 * 24 * 60 * 60
+STATICS_STAT_REVALIDATE: int = 5
+
 DEFAULT_LOCALE: str = 'en_US'
 
 BUILD_DIR: str = '.build'
@@ -16,10 +16,11 @@ from sqlalchemy import Column, Table, select, delete, and_, or_, cast, text
 from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.engine.result import ScalarResult
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, selectinload, joinedload, lazyload, load_only
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.orm.collections import InstrumentedDict, InstrumentedList, InstrumentedSet
 from sqlalchemy.orm.decl_api import DeclarativeMeta
+from sqlalchemy.orm.interfaces import LoaderOption
 from sqlalchemy.orm.relationships import RelationshipProperty
 from sqlalchemy.sql import Select, Delete, sqltypes
 from sqlalchemy.sql.elements import ClauseList, BinaryExpression, UnaryExpression
@@ -263,6 +264,7 @@ class Model:
         c: Optional[Column] = getattr(self.__class__, key, None)
         if not isinstance(value, (list, tuple)):
             raise ValueError("relationship attribute must be set using array value!")
+        await self.load_related(key)
         session: AsyncSession = context['db']
         value: [list, tuple]
         related_table: Table = c.prop.target
@@ -299,6 +301,30 @@ class Model:
             return
         setattr(self, key, self.Meta.casted_value(c, value))
 
+    async def load_related(self, *names: str) -> None:
+        """ Loads the given relationships of this object instance if they have not
+        been loaded yet (for example, because are not eager-loading ones, or been
+        excluded from the loading using ``noload`` argument of the :py:meth:`~select`
+        method). Relationships which are already loaded are left as is.
+
+        .. highlight:: python
+        .. code-block:: python
+
+            role = await Role.get('...')
+            await role.load_related('users')
+            print(role.users)
+
+        :param names:
+            The names of the relationships to load.
+        """
+
+        unloaded: Set[str] = sa_inspect(self).unloaded
+        names: List[str] = [n for n in names if n in unloaded]
+        if not names:
+            return
+        session: AsyncSession = context['db']
+        await session.run_sync(lambda _: [getattr(self, n) for n in names])
+
     @classmethod
     async def all(
             cls,
@@ -307,12 +333,31 @@ class Model:
             offset: Optional[int] = None,
             order: Optional[Union[Any, List[Any]]] = None,
             update: bool = False,
+            deep: Optional[Union[bool, List[str]]] = False,
+            set_name: Optional[str] = None,
+            attributes: Optional[List[str]] = None,
+            options: Optional[Sequence[LoaderOption]] = None,
+            load: Optional[Sequence[str]] = None,
+            noload: Optional[Sequence[str]] = None,
             **filters
     ):
         """ Returns a list of fetched from the database model objects by given criteria.
         The method params have been described in the :py:meth:`~select` method.
         """
-        return (await cls.select(*clause, limit=limit, offset=offset, order=order, update=update, **filters)).all()
+        return (await cls.select(
+            *clause,
+            limit=limit,
+            offset=offset,
+            order=order,
+            update=update,
+            deep=deep,
+            set_name=set_name,
+            attributes=attributes,
+            options=options,
+            load=load,
+            noload=noload,
+            **filters
+        )).all()
 
     @classmethod
     async def create(cls, **initials):
@@ -645,15 +690,44 @@ class Model:
             offset: Optional[int] = None,
             order: Optional[Union[Any, List[Any]]] = None,
             update: bool = False,
+            deep: Optional[Union[bool, List[str]]] = False,
+            set_name: Optional[str] = None,
+            attributes: Optional[List[str]] = None,
+            options: Optional[Sequence[LoaderOption]] = None,
+            load: Optional[Sequence[str]] = None,
+            noload: Optional[Sequence[str]] = None,
             **filters
     ) -> 'Model':
         """ Returns a single model object by given criteria, or ``None`` if there is no object.
         The method params have been described in the :py:meth:`~select` method.
         """
-        return (await cls.select(*clause, limit=1, offset=offset, order=order, update=update, **filters)).first()
+        return (await cls.select(
+            *clause,
+            limit=1,
+            offset=offset,
+            order=order,
+            update=update,
+            deep=deep,
+            set_name=set_name,
+            attributes=attributes,
+            options=options,
+            load=load,
+            noload=noload,
+            **filters
+        )).first()
 
     @classmethod
-    async def get(cls, *pk, update: bool = False):
+    async def get(
+            cls,
+            *pk,
+            update: bool = False,
+            deep: Optional[Union[bool, List[str]]] = False,
+            set_name: Optional[str] = None,
+            attributes: Optional[List[str]] = None,
+            options: Optional[Sequence[LoaderOption]] = None,
+            load: Optional[Sequence[str]] = None,
+            noload: Optional[Sequence[str]] = None
+    ):
         """ Returns a single object identified by the given primary key value.
 
         :param pk:
@@ -666,6 +740,9 @@ class Model:
         :type update:
             bool
 
+        :param deep, set_name, attributes, options, load, noload:
+            The relationships loading plan, see :py:meth:`~select` method.
+
         :return:
             a single model object or ``None`` if there is no object with given primary key.
         :rtype:
@@ -680,7 +757,7 @@ class Model:
         return await cls.first(*[
             (c == cls.Meta.casted_value(c, pk[i]))
             for i, c in enumerate(cls_pk)
-        ], update=update)
+        ], update=update, deep=deep, set_name=set_name, attributes=attributes, options=options, load=load, noload=noload)
 
     @classmethod
     def ilike(cls, term: str) -> Optional[List[Union[BinaryExpression, UnaryExpression]]]:
@@ -766,6 +843,12 @@ class Model:
             offset: Optional[int] = None,
             order: Optional[Union[Any, List[Any]]] = None,
             update: bool = False,
+            deep: Optional[Union[bool, List[str]]] = False,
+            set_name: Optional[str] = None,
+            attributes: Optional[List[str]] = None,
+            options: Optional[Sequence[LoaderOption]] = None,
+            load: Optional[Sequence[str]] = None,
+            noload: Optional[Sequence[str]] = None,
             **filters
     ) -> ScalarResult:
         """ Executes the ``SELECT`` request to fetch data from the database and returns scalars results.
@@ -817,6 +900,36 @@ class Model:
             current process to finish. Transforms to the SQL "``FOR UPDATE``" modifier.
         :type update: bool
 
+        :param deep:
+            The same as for the :py:meth:`~dict` method. Used to plan the relationships
+            loading (eager loading of the related objects) for the fetched objects will
+            be serialized with corresponding ``deep`` argument later. See
+            :py:meth:`Meta.loader_options` for details.
+
+        :param set_name:
+            The name of the attributes set which about to be used on the fetched objects
+            serialization. Used to plan the relationships loading and the loaded columns.
+
+        :param attributes:
+            The list of attributes which about to be used on the fetched objects
+            serialization. Used to plan the relationships loading and the loaded columns.
+
+        :param options:
+            Explicit list of SQLAlchemy loader options (``selectinload``, ``joinedload``,
+            ``load_only``, etc). If given - the automatic loading plan based on ``deep``,
+            ``set_name`` and ``attributes`` will not be used at all.
+
+        :param load:
+            The list of relationships names which must be loaded with the fetched objects,
+            in addition to the :py:attr:`Meta.default_load` ones.
+
+        :param noload:
+            The list of relationships names which must not be loaded with the fetched
+            objects, even if declared as eager-loading ones (for example, with
+            ``lazy='selectin'``) or listed in the :py:attr:`Meta.default_load`. Those
+            relationships may be loaded later, when needed, using the
+            :py:meth:`~load_related` method.
+
         :param filters:
             For the simplier case, when filtering with ``AND`` clause only, you may use
             named arguments to indicate whose objects/rows to fetch. For example:
@@ -855,6 +968,25 @@ class Model:
         if update:
             statement = statement.with_for_update()
 
+        if options is None:
+            options = cls.Meta.loader_options(
+                attributes=attributes,
+                deep=deep,
+                set_name=set_name,
+                load=load,
+                noload=noload,
+                joined=not update
+            )
+        elif load or noload:
+            options = list(options) + cls.Meta.loader_options(
+                load=load,
+                noload=noload,
+                joined=not update,
+                use_default=False
+            )
+        if options:
+            statement = statement.options(*options)
+
         return (await session.execute(statement)).scalars()
 
 
@@ -1008,6 +1140,23 @@ class Meta:
     history: History
     """ The history defition, describing journaling of instances of this model. """
 
+    default_load: Optional[List[str]]
+    """ the list of relationships names whose are loaded (eagerly, with the
+    fetching query) by default on every :py:meth:`~wefram.ds.orm.model.Model.select`
+    (and corresponding ``all``, ``first``, ``get`` methods) and ``ModelAPI``
+    read; the caller may avoid loading of them using ``noload`` argument
+
+    .. highlight:: python
+    .. code-block:: python
+
+        class MyModel(ds.Model):
+            ...
+            phones = ds.relationship(ds.TheModel('Phone'))
+
+            class Meta:
+                default_load = ['phones']
+    """
+
     def __init__(self, cls: _ModelMetaclass, app_name: str, module_name: str):
         self.model: ClassVar = cls
         self.module_name: str = module_name
@@ -1024,6 +1173,7 @@ class Meta:
         self.findable: Optional[List[str]] = None
         self.order: Optional[Union[str, List[str], Column, List[Column]]] = None
         self.history: History = History()
+        self.default_load: Optional[List[str]] = None
 
         meta: Optional[dict, ClassVar] = getattr(cls, 'Meta', None)
         if meta:
@@ -1042,6 +1192,12 @@ class Meta:
                 f" of str, {type(self.findable)} given instead"
             )
 
+        if self.default_load and not isinstance(self.default_load, (list, tuple)):
+            raise TypeError(
+                f"Model.Meta.default_load must be type of (list|tuple)"
+                f" of str, {type(self.default_load)} given instead"
+            )
+
     def _instantiate_attribute(self, key: str, value: Any) -> None:
         if key == 'history':
             if value is True:
@@ -1149,6 +1305,109 @@ class Meta:
                 res.append(c)
         return res
 
+    def loader_options(
+            self,
+            attributes: Optional[List[str]] = None,
+            deep: Optional[Union[bool, List[str]]] = False,
+            set_name: Optional[str] = None,
+            load: Optional[Sequence[str]] = None,
+            noload: Optional[Sequence[str]] = None,
+            joined: bool = True,
+            use_default: bool = True
+    ) -> List[LoaderOption]:
+        """ Returns a list of SQLAlchemy loader options (the loading plan) for the
+        fetching statement, basing on how the fetched objects will be serialized
+        later using :py:meth:`Model.dict` or :py:meth:`Model.json` methods. This
+        avoids per-instance lazy loads of relationships (N+1 queries) on the deep
+        serialization.
+
+        *   Relationships which will be serialized are loaded eagerly: collections
+            with ``selectinload`` and scalar (many-to-one) ones with ``joinedload``
+            (or ``selectinload`` too, if ``joined`` is ``False``, for example
+            for the ``FOR UPDATE`` statements);
+        *   Relationships listed in the :py:attr:`default_load` and in the ``load``
+            argument are loaded eagerly too;
+        *   Relationships listed in the ``noload`` argument are not loaded at all,
+            whatever the relationship declares or the other arguments require;
+        *   If the serialized attributes are explicitly known (by ``attributes`` or
+            ``set_name``) and all of them are plain columns or relationships - only
+            those columns (plus primary key ones) will be loaded with ``load_only``.
+
+        :param attributes:
+            The list of attributes which will be serialized.
+        :param deep:
+            Either ``bool`` or the list of relationships names whose will be serialized
+            deeply.
+        :param set_name:
+            The name of the attributes set, see :py:attr:`attributes_sets`.
+        :param load:
+            The list of relationships names to load in addition.
+        :param noload:
+            The list of relationships names to not load.
+        :param joined:
+            Use ``joinedload`` for scalar relationships. Default is ``True``.
+        :param use_default:
+            Include the :py:attr:`default_load` relationships. Default is ``True``.
+        :return:
+            The list of loader options ready to be passed to the statement ``options()``.
+        """
+
+        mapper: Any = sa_inspect(self.model)
+        relationships: Any = mapper.relationships
+        column_attrs: Any = mapper.column_attrs
+        hidden: List[str] = list(self.hidden or [])
+
+        names: Optional[List[str]] = None
+        if attributes:
+            names = list(attributes)
+        elif set_name:
+            attributes_sets: Dict[str, Sequence[str]] = self.attributes_sets or {}
+            if set_name not in attributes_sets:
+                raise KeyError(f"set_name {set_name} has not defined in the Model.Meta")
+            names = list(attributes_sets[set_name])
+
+        eager: List[str]
+        if isinstance(deep, (list, tuple, set)):
+            eager = [n for n in deep if n in relationships]
+        elif deep:
+            eager = [n for n in (names if names is not None else relationships.keys()) if n in relationships]
+        else:
+            eager = [n for n in (names or []) if n in relationships]
+        eager = [n for n in eager if n not in hidden]
+        if use_default and self.default_load:
+            eager.extend([n for n in self.default_load if n not in eager])
+        if load:
+            eager.extend([n for n in load if n not in eager])
+        for name in list(eager) + list(noload or []):
+            if name not in relationships:
+                raise KeyError(f"Model {self.model.__name__} has no relationship '{name}'")
+        if noload:
+            eager = [n for n in eager if n not in noload]
+
+        options: List[LoaderOption] = [lazyload(getattr(self.model, n)) for n in (noload or [])]
+        local_columns: Set[Column] = set()
+        for name in eager:
+            prop: RelationshipProperty = relationships[name]
+            attr: InstrumentedAttribute = getattr(self.model, name)
+            if prop.uselist or not joined:
+                options.append(selectinload(attr))
+            else:
+                options.append(joinedload(attr))
+            if not prop.uselist:
+                local_columns.update(prop.local_columns)
+
+        if names and all((n in column_attrs or n in relationships) for n in names):
+            loaded: List[str] = [n for n in names if n in column_attrs]
+            loaded.extend([
+                p.key for p in column_attrs
+                if p.key not in loaded and any(
+                    (c.primary_key or c in local_columns) for c in p.columns
+                )
+            ])
+            options.append(load_only(*[getattr(self.model, n) for n in loaded]))
+
+        return options
+
     def get_columns_list(self) -> List[Column]:
         return list(sa_inspect(self.model).columns)
 
@@ -49,7 +49,24 @@ class StoredImage(StoredFile):
     The VALUE class which will be used to represent the column' value
     of the stored image.
     """
-    pass
+
+    def variant_url(
+            self,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+            fit: Optional[str] = None,
+            fmt: Optional[str] = None
+    ) -> str:
+        """ Returns the URL of the resized and/or converted variant of the stored
+        image (see :py:mod:`wefram.ds.storages.images`). For example,
+        ``avatar.variant_url(64, 64, 'cover')``.
+        """
+
+        if self.file_id.startswith('/'):
+            return self.url
+        args: Dict[str, Any] = {'w': width, 'h': height, 'fit': fit, 'fmt': fmt}
+        query: str = '&'.join(f"{name}={value}" for name, value in args.items() if value)
+        return f"{self.url}?{query}" if query else self.url
 
 
 class File(types.TypeDecorator):
@@ -1,3 +1,9 @@
 from .routines import *
 from .entities import *
-from . import routines, entities
+from .backends import *
+from .uploads import *
+from .resumable import *
+from .blobs import *
+from .images import *
+from .collector import *
+from . import routines, entities, backends, uploads, resumable, blobs, images, collector
@@ -0,0 +1,211 @@
+"""
+Provides the storage backends: the places where contents of stored files are
+kept. The storage entity uses the backend given at its registration (see
+:py:func:`~wefram.ds.storages.register`), or the default one
+(``storage.defaultBackend``).
+
+There are two kinds of backends out of the box:
+
+* ``local`` -- the local (or mounted) file system under the ``FILES_ROOT``, the
+    default one; all storage features (image variants, deduplication, the front
+    proxy offload, the garbage collector) are available with it;
+* ``s3`` -- the S3-compatible object storage (AWS S3, MinIO, etc), see
+    :py:mod:`wefram.ds.storages.s3`. Files are uploaded with the streaming
+    multipart upload and downloaded by clients directly from the storage, using
+    presigned URLs.
+
+Backends are declared in the ``storage.backends`` configuration section:
+
+.. highlight:: json
+.. code-block:: json
+
+    "storage": {
+        "backends": {
+            "shared": {
+                "type": "s3",
+                "endpoint": "http://minio:9000",
+                "region": "us-east-1",
+                "bucket": "files",
+                "accessKey": "...",
+                "secretKey": "..."
+            }
+        }
+    }
+
+and used like ``ds.storages.register('photos', backend='shared')``.
+"""
+
+from typing import *
+import os
+import json
+import anyio
+from ... import config
+from ...requests import Request, Response
+
+
+__all__ = [
+    'BlobSink',
+    'StorageBackend',
+    'LocalBackend',
+    'register_backend',
+    'get_backend'
+]
+
+
+class BlobSink:
+    """ Receives the content of the single file being stored, chunk by chunk. """
+
+    async def write(self, chunk: bytes) -> None:
+        raise NotImplementedError()
+
+    async def commit(self, sha256: str) -> None:
+        """ Completes the storing, the content becomes available. """
+        raise NotImplementedError()
+
+    async def abort(self) -> None:
+        """ Cancels the storing, dropping the already received content. """
+        raise NotImplementedError()
+
+
+class StorageBackend:
+    """ The base class of storage backends. """
+
+    local: bool = False
+    """ Whether the backend keeps files in the local file system, so they may be
+    accessed by the filename. """
+
+    async def open_sink(self, entity: str, file_id: str, filename: str, content_type: str) -> BlobSink:
+        """ Starts storing the new file content. """
+        raise NotImplementedError()
+
+    async def write_info(self, entity: str, file_id: str, info: dict) -> None:
+        """ Writes the info struct of the stored file. """
+        raise NotImplementedError()
+
+    async def read_info(self, entity: str, file_id: str) -> dict:
+        """ Returns the info struct of the stored file, raises ``FileNotFoundError``
+        if there is no such file. """
+        raise NotImplementedError()
+
+    async def remove(self, entity: str, files_ids: List[str]) -> None:
+        """ Removes given stored files. """
+        raise NotImplementedError()
+
+    async def file_response(self, entity: str, file_id: str, request: Optional[Request]) -> Response:
+        """ Returns the response with the stored file's content (or the one making
+        the client to download it from elsewhere). """
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        """ Releases resources (connections, etc) held by the backend. Called on
+        the server shutdown. """
+        pass
+
+
+class _LocalSink(BlobSink):
+    def __init__(self, blobfn: str):
+        self.blobfn: str = blobfn
+        self.tmpfn: str = f"{blobfn}.tmp"
+        self.file: Optional[anyio.AsyncFile] = None
+
+    async def open(self) -> '_LocalSink':
+        await anyio.to_thread.run_sync(lambda: os.makedirs(os.path.dirname(self.blobfn), exist_ok=True))
+        # The content is written under the temporary name and is put in place on
+        # commit, so the (possibly shared, see `blobs`) stored content is never
+        # rewritten in place.
+        self.file = await anyio.open_file(self.tmpfn, 'wb')
+        return self
+
+    async def write(self, chunk: bytes) -> None:
+        await self.file.write(chunk)
+
+    async def commit(self, sha256: str) -> None:
+        from .blobs import commit_blob
+
+        await self.file.aclose()
+        self.file = None
+        await anyio.to_thread.run_sync(commit_blob, self.tmpfn, self.blobfn, sha256)
+
+    async def abort(self) -> None:
+        from .blobs import remove_file_tree
+
+        if self.file is not None:
+            await self.file.aclose()
+            self.file = None
+        await anyio.to_thread.run_sync(remove_file_tree, os.path.dirname(self.blobfn))
+
+
+class LocalBackend(StorageBackend):
+    """ Keeps files in the local (or mounted) file system, under the ``FILES_ROOT``. """
+
+    local = True
+
+    async def open_sink(self, entity: str, file_id: str, filename: str, content_type: str) -> BlobSink:
+        from .routines import get_file_blobfn
+
+        return await _LocalSink(get_file_blobfn(entity, file_id, filename)).open()
+
+    async def write_info(self, entity: str, file_id: str, info: dict) -> None:
+        from .routines import get_file_infofn
+
+        async with await anyio.open_file(get_file_infofn(entity, file_id), 'w') as f:
+            await f.write(json.dumps(info, ensure_ascii=False))
+
+    async def read_info(self, entity: str, file_id: str) -> dict:
+        from .routines import get_file_meta
+
+        return (await get_file_meta(entity, file_id)).info
+
+    async def remove(self, entity: str, files_ids: List[str]) -> None:
+        from .blobs import remove_file_tree
+        from .routines import get_file_root
+
+        roots: List[str] = [get_file_root(entity, file_id) for file_id in files_ids]
+        await anyio.to_thread.run_sync(lambda: [remove_file_tree(root) for root in roots])
+
+    async def file_response(self, entity: str, file_id: str, request: Optional[Request]) -> Response:
+        from .routines import get_local_file_response
+
+        return await get_local_file_response(entity, file_id, request)
+
+
+backends: Dict[str, StorageBackend] = {
+    'local': LocalBackend()
+}
+
+
+def register_backend(name: str, backend: StorageBackend) -> None:
+    """ Registers the storage backend instance under the given name. """
+
+    backends[name] = backend
+
+
+def _configure() -> None:
+    for name, params in (config.STORAGE['backends'] or {}).items():
+        kind: str = str((params or {}).get('type', 'local')).lower()
+        if kind == 'local':
+            register_backend(name, LocalBackend())
+        elif kind == 's3':
+            from .s3 import S3Backend
+
+            register_backend(name, S3Backend.from_config(params))
+        else:
+            raise ValueError(f"unsupported storage backend type '{kind}' of the backend '{name}'")
+
+
+_configured: bool = False
+
+
+def get_backend(entity: str) -> StorageBackend:
+    """ Returns the backend used by the storage entity. """
+
+    from .entities import registered
+
+    global _configured
+    if not _configured:
+        _configure()
+        _configured = True
+    name: str = getattr(registered.get(entity, None), 'backend', None) or config.STORAGE['default_backend']
+    if name not in backends:
+        raise KeyError(f"storage backend '{name}' of the entity '{entity}' is not configured")
+    return backends[name]
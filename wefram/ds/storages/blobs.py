@@ -0,0 +1,218 @@
+"""
+Provides the optional content-addressed, deduplicating layout of the stored files
+(enabled by the ``storage.dedup`` configuration option).
+
+The content of every stored file is kept once, as the blob named by its SHA-256
+hash under the ``FILES_ROOT/.blobs`` directory, shared across files ids and
+storage entities. The file's own location (``<entity>/<shard>/.../<filename>``)
+is the hard link to that blob, so everything reading stored files works with
+the deduplicated storage unchanged. The number of the hard links of the blob is
+its reference count, maintained by the file system atomically: removing the
+stored file unlinks its location, and the blob itself is removed when it is not
+referenced by any file anymore.
+
+Note that stored files must never be rewritten in place; writers create the
+content under the temporary name and put it to the place with
+:py:func:`commit_blob`.
+"""
+
+from typing import *
+import os
+import json
+import shutil
+import hashlib
+from ... import config
+
+
+__all__ = [
+    'get_blob_filename',
+    'commit_blob',
+    'release_blob',
+    'remove_file_tree',
+    'dedup_existing',
+    'storage_report'
+]
+
+
+BLOBS_DIR: str = '.blobs'
+INFO_FILENAME: str = '.fileinfo.json'
+
+
+def get_blob_filename(sha256: str) -> str:
+    """ Returns the absolute path to the content-addressed blob. """
+
+    return os.path.join(config.FILES_ROOT, BLOBS_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def _link_blob(blobfn: str, target: str) -> bool:
+    """ Puts the hard link to the existing blob to the target location, returns
+    ``False`` if the blob does not exist (anymore). """
+
+    tmpfn: str = f"{target}.link"
+    try:
+        os.link(blobfn, tmpfn)
+    except FileNotFoundError:
+        return False
+    os.replace(tmpfn, target)
+    return True
+
+
+def commit_blob(tmpfn: str, target: str, sha256: str) -> None:
+    """ Moves the completely written content from the temporary file to the
+    stored file location. Within the deduplicating layout, the content becomes
+    the new blob or, if the same content is stored already, the target becomes
+    the link to the existing blob and the temporary file is dropped.
+
+    Does the blocking file I/O, so must be called in the worker thread from
+    async code.
+    """
+
+    if not config.STORAGE['dedup']:
+        os.replace(tmpfn, target)
+        return
+
+    blobfn: str = get_blob_filename(sha256)
+    os.makedirs(os.path.dirname(blobfn), exist_ok=True)
+    for _ in range(3):
+        try:
+            os.link(tmpfn, blobfn)
+        except FileExistsError:
+            if _link_blob(blobfn, target):
+                os.remove(tmpfn)
+                return
+            # The blob has been released just now; publishing ours again
+            continue
+        os.replace(tmpfn, target)
+        return
+
+    # Giving up the deduplication of this file rather than failing the upload
+    os.replace(tmpfn, target)
+
+
+def release_blob(sha256: Optional[str]) -> int:
+    """ Removes the blob if it is not referenced by any stored file anymore,
+    returning the number of freed bytes. """
+
+    if not sha256:
+        return 0
+    blobfn: str = get_blob_filename(sha256)
+    try:
+        stat_result: os.stat_result = os.stat(blobfn)
+        if stat_result.st_nlink > 1:
+            return 0
+        os.remove(blobfn)
+    except FileNotFoundError:
+        return 0
+    return stat_result.st_size
+
+
+def remove_file_tree(root: str) -> None:
+    """ Removes the stored file directory (the content and the info struct),
+    releasing the shared blob of the content if the file was the last one
+    referencing it. """
+
+    sha256: Optional[str] = None
+    try:
+        with open(os.path.join(root, INFO_FILENAME), 'r') as f:
+            sha256 = json.load(f).get('sha256', None)
+    except (FileNotFoundError, NotADirectoryError, ValueError):
+        pass
+    shutil.rmtree(root, ignore_errors=True)
+    release_blob(sha256)
+
+
+def _walk_stored_files() -> Iterator[Tuple[str, str, dict]]:
+    """ Yields (entity, file directory, info) for every stored file. """
+
+    if not os.path.isdir(config.FILES_ROOT):
+        return
+    for entity in sorted(os.listdir(config.FILES_ROOT)):
+        entity_root: str = os.path.join(config.FILES_ROOT, entity)
+        if entity.startswith('.') or not os.path.isdir(entity_root):
+            continue
+        for dirpath, dirnames, filenames in os.walk(entity_root):
+            if INFO_FILENAME not in filenames:
+                continue
+            try:
+                with open(os.path.join(dirpath, INFO_FILENAME), 'r') as f:
+                    info: dict = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield entity, dirpath, info
+
+
+def _hash_file(filename: str) -> str:
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        while True:
+            chunk: bytes = f.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dedup_existing(verbose: bool = False) -> Dict[str, int]:
+    """ Converts the existing storage tree to the deduplicating layout: hashes
+    files stored without the recorded hash, and replaces every file's content
+    with the link to the shared blob. May be run on the live storage and may
+    be run repeatedly. Returns the counters: ``files`` processed, ``linked``
+    to the already existing blob and ``reclaimed`` bytes.
+    """
+
+    stats: Dict[str, int] = {'files': 0, 'linked': 0, 'reclaimed': 0}
+    for entity, dirpath, info in _walk_stored_files():
+        filename: str = os.path.join(dirpath, info.get('filename', ''))
+        if not os.path.isfile(filename):
+            continue
+        stats['files'] += 1
+
+        sha256: Optional[str] = info.get('sha256', None)
+        if not sha256:
+            sha256 = info['sha256'] = _hash_file(filename)
+            with open(os.path.join(dirpath, INFO_FILENAME), 'w') as f:
+                json.dump(info, f, ensure_ascii=False)
+
+        blobfn: str = get_blob_filename(sha256)
+        if os.path.exists(blobfn) and os.path.samefile(blobfn, filename):
+            continue
+        os.makedirs(os.path.dirname(blobfn), exist_ok=True)
+        try:
+            os.link(filename, blobfn)
+        except FileExistsError:
+            size: int = os.path.getsize(filename)
+            if not _link_blob(blobfn, filename):
+                continue
+            stats['linked'] += 1
+            # The replaced content is freed if it has not been linked elsewhere
+            stats['reclaimed'] += size
+        if verbose:
+            print(f"{entity}: {os.path.relpath(filename, config.FILES_ROOT)} -> {sha256}")
+    return stats
+
+
+def storage_report() -> Dict[str, Dict[str, int]]:
+    """ Returns the storage usage report per storage entity: the number of
+    ``files``, the ``logical`` size (the sum of files' sizes) and the ``physical``
+    size (the space really occupied by unique contents, taking into account the
+    content shared with the previously counted entities). The ``total`` key
+    summarizes all entities. """
+
+    report: Dict[str, Dict[str, int]] = {}
+    seen: Set[Tuple[int, int]] = set()
+    total: Dict[str, int] = {'files': 0, 'logical': 0, 'physical': 0}
+    for entity, dirpath, info in _walk_stored_files():
+        try:
+            stat_result: os.stat_result = os.stat(os.path.join(dirpath, info.get('filename', '')))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        counters: Dict[str, int] = report.setdefault(entity, {'files': 0, 'logical': 0, 'physical': 0})
+        inode: Tuple[int, int] = (stat_result.st_dev, stat_result.st_ino)
+        for c in (counters, total):
+            c['files'] += 1
+            c['logical'] += stat_result.st_size
+            if inode not in seen:
+                c['physical'] += stat_result.st_size
+        seen.add(inode)
+    report['total'] = total
+    return report
@@ -0,0 +1,233 @@
+"""
+Provides the garbage collector of stored files: removes files which are not
+referenced anymore (by rows deleted, files replaced, transactions rolled back
+after the upload, etc).
+
+The live set of files is built from every ORM model column of the
+:py:class:`~wefram.ds.File` and :py:class:`~wefram.ds.Image` types, and from
+values of :py:class:`~wefram.settings.props.FileProp` and
+:py:class:`~wefram.settings.props.ImageProp` settings properties. Only storage
+entities referenced by at least one of those are collected, because files of
+others may be referenced by the application's code in some other way. Entities
+kept by non-local backends are not collected.
+
+Files younger than the grace period (``storage.gcGraceHours``) are never removed,
+so files uploaded but not yet saved to the database survive. Files are removed
+in throttled batches, in worker threads.
+"""
+
+from typing import *
+import os
+import time
+import asyncio
+from dataclasses import dataclass, field
+import anyio
+from ... import config, logger
+from .blobs import BLOBS_DIR, INFO_FILENAME, remove_file_tree, release_blob
+from .backends import get_backend
+from .routines import invalidate_file_meta
+
+
+__all__ = [
+    'CollectedEntity',
+    'CollectReport',
+    'live_files',
+    'collect_garbage'
+]
+
+
+@dataclass
+class CollectedEntity:
+    referenced: int = 0
+    stored: int = 0
+    orphaned: List[str] = field(default_factory=list)
+    size: int = 0
+
+
+@dataclass
+class CollectReport:
+    """ The result of the garbage collection: orphaned (removed, if not in the
+    dry-run mode) files per storage entity and unreferenced blobs of the
+    deduplicating layout. """
+
+    dry_run: bool
+    entities: Dict[str, CollectedEntity] = field(default_factory=dict)
+    blobs: int = 0
+    blobs_size: int = 0
+
+    @property
+    def orphaned(self) -> int:
+        return sum(len(e.orphaned) for e in self.entities.values())
+
+    @property
+    def size(self) -> int:
+        return sum(e.size for e in self.entities.values()) + self.blobs_size
+
+
+def _file_id_of(value: Any) -> Optional[str]:
+    file_id: Optional[str] = getattr(value, 'file_id', value)
+    if not file_id or not isinstance(file_id, str) or file_id.startswith('/'):
+        return None
+    return file_id.replace('-', '')
+
+
+async def live_files() -> Dict[str, Set[str]]:
+    """ Returns the set of referenced ``file_id`` per storage entity. Must be
+    called within the database context (the request, the CLI or the background
+    task one). """
+
+    from ..orm import reg
+    from ..orm.storage import File, Image
+    from ..orm.db import execute
+    from sqlalchemy import select
+    from ...settings import entities as settings_entities, props
+    from ...models import StoredSettings
+
+    live: Dict[str, Set[str]] = {}
+
+    for model in list(reg.models_by_tablename.values()):
+        table = getattr(model, '__table__', None)
+        if table is None:
+            continue
+        for column in table.columns:
+            if not isinstance(column.type, (File, Image)):
+                continue
+            referenced: Set[str] = live.setdefault(column.type.entity, set())
+            result = await execute(select(column).where(column.isnot(None)).distinct())
+            referenced.update(filter(None, (_file_id_of(value) for value in result.scalars())))
+
+    settings_props: Dict[str, List[Tuple[str, str]]] = {}
+    for entity_name, entity in settings_entities.registered.items():
+        for key, prop in entity.properties.items():
+            if not isinstance(prop, (props.FileProp, props.ImageProp)):
+                continue
+            settings_props.setdefault(entity_name, []).append((key, prop.entity))
+            file_id: Optional[str] = _file_id_of((entity.defaults or {}).get(key, None))
+            live.setdefault(prop.entity, set())
+            if file_id:
+                live[prop.entity].add(file_id)
+    if settings_props:
+        result = await execute(
+            select(StoredSettings.entity, StoredSettings.data).where(
+                StoredSettings.entity.in_(list(settings_props.keys()))
+            )
+        )
+        for entity_name, data in result:
+            for key, storage_entity in settings_props[entity_name]:
+                file_id: Optional[str] = _file_id_of((data or {}).get(key, None))
+                if file_id:
+                    live[storage_entity].add(file_id)
+
+    return live
+
+
+def _scan_entity(entity: str, grace: float) -> List[Tuple[str, str, int]]:
+    """ Returns (file_id, directory, size) of every stored file of the entity
+    older than the grace period. Blocking, executed in the worker thread. """
+
+    found: List[Tuple[str, str, int]] = []
+    entity_root: str = os.path.join(config.FILES_ROOT, entity)
+    if not os.path.isdir(entity_root):
+        return found
+    deadline: float = time.time() - grace
+    for dir1 in os.scandir(entity_root):
+        if not dir1.is_dir():
+            continue
+        for dir2 in os.scandir(dir1.path):
+            if not dir2.is_dir():
+                continue
+            for dir3 in os.scandir(dir2.path):
+                if not dir3.is_dir():
+                    continue
+                try:
+                    mtime: float = dir3.stat().st_mtime
+                    size: int = 0
+                    for entry in os.scandir(dir3.path):
+                        if entry.is_file():
+                            stat_result: os.stat_result = entry.stat()
+                            mtime = max(mtime, stat_result.st_mtime)
+                            if entry.name != INFO_FILENAME:
+                                size += stat_result.st_size
+                except FileNotFoundError:
+                    continue
+                if mtime > deadline:
+                    continue
+                found.append((dir1.name + dir2.name + dir3.name, dir3.path, size))
+    return found
+
+
+def _scan_blobs(grace: float) -> List[Tuple[str, int]]:
+    """ Returns (sha256, size) of blobs not referenced by any stored file. """
+
+    found: List[Tuple[str, int]] = []
+    root: str = os.path.join(config.FILES_ROOT, BLOBS_DIR)
+    if not os.path.isdir(root):
+        return found
+    deadline: float = time.time() - grace
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            try:
+                stat_result: os.stat_result = os.stat(os.path.join(dirpath, filename))
+            except FileNotFoundError:
+                continue
+            if stat_result.st_nlink == 1 and stat_result.st_mtime <= deadline:
+                found.append((filename, stat_result.st_size))
+    return found
+
+
+async def collect_garbage(
+        dry_run: bool = False,
+        grace_hours: Optional[float] = None,
+        verbose: bool = False
+) -> CollectReport:
+    """ Finds and (unless the ``dry_run`` is set) removes orphaned stored files,
+    returning the report. Must be called within the database context.
+
+    :param dry_run: only report the orphaned files, not removing them
+    :param grace_hours: the grace period, overriding the ``storage.gcGraceHours``
+    :param verbose: print every orphaned file
+    """
+
+    grace: float = (config.STORAGE['gc_grace_hours'] if grace_hours is None else grace_hours) * 3600
+    batch: int = max(1, config.STORAGE['gc_batch_size'])
+    pause: float = config.STORAGE['gc_batch_pause']
+    report: CollectReport = CollectReport(dry_run=dry_run)
+
+    live: Dict[str, Set[str]] = await live_files()
+    for entity, referenced in sorted(live.items()):
+        if not get_backend(entity).local:
+            continue
+        stored: List[Tuple[str, str, int]] = await anyio.to_thread.run_sync(_scan_entity, entity, grace)
+        collected: CollectedEntity = CollectedEntity(referenced=len(referenced), stored=len(stored))
+        orphaned: List[Tuple[str, str, int]] = [f for f in stored if f[0] not in referenced]
+        collected.orphaned = [file_id for file_id, _, _ in orphaned]
+        collected.size = sum(size for _, _, size in orphaned)
+        report.entities[entity] = collected
+        if verbose:
+            [print(f"{entity}: {file_id} ({size} bytes)") for file_id, _, size in orphaned]
+        if dry_run:
+            continue
+        for i in range(0, len(orphaned), batch):
+            chunk: List[Tuple[str, str, int]] = orphaned[i:i + batch]
+            for file_id, _, _ in chunk:
+                invalidate_file_meta(entity, file_id)
+            await anyio.to_thread.run_sync(lambda: [remove_file_tree(root) for _, root, _ in chunk])
+            if pause:
+                await asyncio.sleep(pause)
+
+    blobs: List[Tuple[str, int]] = await anyio.to_thread.run_sync(_scan_blobs, grace)
+    report.blobs = len(blobs)
+    report.blobs_size = sum(size for _, size in blobs)
+    if not dry_run:
+        for i in range(0, len(blobs), batch):
+            chunk: List[Tuple[str, int]] = blobs[i:i + batch]
+            await anyio.to_thread.run_sync(lambda: [release_blob(sha256) for sha256, _ in chunk])
+            if pause:
+                await asyncio.sleep(pause)
+
+    logger.info(
+        f"storage GC{' (dry run)' if dry_run else ''}: {report.orphaned} orphaned file(s),"
+        f" {report.blobs} unreferenced blob(s), {report.size} bytes",
+        'storages'
+    )
+    return report
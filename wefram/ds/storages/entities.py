@@ -90,6 +90,8 @@ class StorageEntity:
     name: str
     requires: Optional[List[str]]
     readable: Optional[List[str]]
+    max_size: Optional[int] = None
+    backend: Optional[str] = None
 
 
 # The registry of all project declared storage entities. The format
@@ -105,7 +107,9 @@ def register(
         name: str,
         requires: Optional[List[str]] = None,
         readable: Optional[List[str]] = None,
-        app: Optional[str] = None
+        app: Optional[str] = None,
+        max_size: Optional[int] = None,
+        backend: Optional[str] = None
 ) -> None:
     """ Used to register the storage entity in the project for the application.
 
@@ -129,6 +133,16 @@ def register(
     :param app:
         Optional name of the parent application of this entity. If omitted - the current
         calling application will be used as the parent one.
+
+    :param max_size:
+        Optional maximum size (in bytes) of the single file stored in this entity.
+        Uploads exceeding the size are rejected as soon as the limit is exceeded.
+
+    :param backend:
+        Optional name of the storage backend keeping files of this entity (one of
+        declared in the ``storage.backends`` configuration section). If omitted - the
+        default one (``storage.defaultBackend``) is used. See
+        :py:mod:`~wefram.ds.storages.backends`.
     """
 
     app_name: str
@@ -138,11 +152,24 @@ def register(
         app_name, name = name.split('.', 2)
     else:
         app_name = get_calling_app()
+
+    # Normalizing required scopes once, at the registration time, to avoid doing
+    # this on every permissions check.
+    if requires:
+        requires = [
+            (r if '.' in r else '.'.join([app_name, r]))
+            for r in (list(requires) if isinstance(requires, (list, tuple)) else [requires])
+        ]
+    if readable:
+        readable = list(readable) if isinstance(readable, (list, tuple)) else [readable]
+
     entity = StorageEntity(
         app=app_name,
         name=name,
-        requires=requires,
-        readable=readable
+        requires=requires or None,
+        readable=readable or None,
+        max_size=max_size or None,
+        backend=backend or None
     )
     entity_name: str = '.'.join([app_name, name])
     registered[entity_name] = entity
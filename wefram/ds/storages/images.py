@@ -0,0 +1,269 @@
+"""
+Provides the on-the-fly image variants (derivatives) of stored images: resized
+and/or converted to another format versions of the original, requested by the
+URL query arguments:
+
+* ``w`` -- the maximum width in pixels;
+* ``h`` -- the maximum height in pixels;
+* ``fit`` -- how the image is fitted into the ``w`` x ``h`` box: ``contain``
+    (default, keeps the whole image), ``cover`` (fills the box, cropping the
+    excess) or ``fill`` (stretches the image to the box exactly);
+* ``fmt`` -- the format of the variant: ``jpeg``, ``png`` or ``webp`` (the
+    original's format by default).
+
+For example: ``/files/myapp.photos/<file_id>?w=128&h=128&fit=cover&fmt=webp``
+
+Variants are rendered by the pool of worker processes (``storage.imageWorkers``),
+so the resizing never blocks the server, and are cached on the disk next to the
+original (and so are removed along with it). Concurrent requests for the same
+variant are coalesced, so only one rendering of it is running at a time.
+"""
+
+from typing import *
+import os
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import anyio
+from starlette.datastructures import Headers
+from ...requests import FileResponse, Request, NotModifiedResponse, Response, etag_matches
+from ... import config, exceptions, logger
+from .backends import get_backend
+from .routines import (
+    FileMeta,
+    get_file_meta,
+    get_file_response,
+    test_readable,
+    offload_response,
+    uuid_from
+)
+
+
+__all__ = [
+    'ImageVariant',
+    'image_size',
+    'get_image_response'
+]
+
+
+VARIANTS_DIR: str = '.variants'
+FITS: Tuple[str, ...] = ('contain', 'cover', 'fill')
+FORMATS: Dict[str, str] = {
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'webp': 'image/webp'
+}
+VARIANT_QUERY_ARGS: Tuple[str, ...] = ('w', 'h', 'fit', 'fmt')
+# The raster images the variants are rendered of; other images (SVG, etc) are
+# always returned as is
+RASTER_TYPES: Set[str] = {
+    'image/jpeg',
+    'image/png',
+    'image/webp',
+    'image/gif',
+    'image/bmp',
+    'image/tiff'
+}
+
+
+class ImageVariant:
+    """ The requested variant of the image. """
+
+    def __init__(
+            self,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+            fit: str = 'contain',
+            fmt: Optional[str] = None
+    ):
+        max_size: int = config.STORAGE['image_max_size']
+        for value in (width, height):
+            if value is not None and not 0 < value <= max_size:
+                raise exceptions.ApiError(400, f"The image variant size must be in range 1..{max_size}")
+        if fit not in FITS:
+            raise exceptions.ApiError(400, f"The image fit must be one of: {', '.join(FITS)}")
+        if fmt is not None and fmt not in FORMATS:
+            raise exceptions.ApiError(400, f"The image format must be one of: {', '.join(FORMATS)}")
+        self.width: Optional[int] = width
+        self.height: Optional[int] = height
+        self.fit: str = fit
+        self.fmt: Optional[str] = fmt
+
+    @classmethod
+    def from_query(cls, query_params: Mapping[str, str]) -> Optional['ImageVariant']:
+        """ Returns the variant requested by the URL query, or ``None`` if the
+        original image is requested. """
+
+        if not any(query_params.get(name, None) for name in VARIANT_QUERY_ARGS):
+            return None
+        try:
+            width: Optional[int] = int(query_params['w']) if query_params.get('w', None) else None
+            height: Optional[int] = int(query_params['h']) if query_params.get('h', None) else None
+        except ValueError:
+            raise exceptions.ApiError(400, "The image variant size must be an integer")
+        return cls(width, height, query_params.get('fit', None) or 'contain', query_params.get('fmt', None) or None)
+
+    def filename(self, meta: FileMeta) -> str:
+        """ Returns the absolute filename of the cached variant of the given image.
+        The name includes the original's hash, so the cached variant never outlives
+        the content it has been made of. """
+
+        fmt: str = self.fmt or _original_format(meta)
+        source: str = meta.info.get('sha256', None) or str(meta.stat_result.st_mtime)
+        return os.path.join(
+            os.path.dirname(meta.blobfn),
+            VARIANTS_DIR,
+            f"{source[:16]}-{self.width or 0}x{self.height or 0}-{self.fit}.{fmt}"
+        )
+
+
+def _original_format(meta: FileMeta) -> str:
+    for fmt, content_type in FORMATS.items():
+        if meta.content_type == content_type:
+            return fmt
+    return 'jpeg'
+
+
+def image_size(filename: str) -> Optional[Tuple[int, int]]:
+    """ Returns the (width, height) of the image file, reading its header only,
+    or ``None`` if the file is not an image. Does the blocking file I/O. """
+
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(filename) as image:
+            return image.size
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+
+def _render(
+        source: str,
+        target: str,
+        width: Optional[int],
+        height: Optional[int],
+        fit: str,
+        fmt: str,
+        quality: int
+) -> None:
+    """ Renders the image variant, executed in the worker process. """
+
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        box: Tuple[int, int] = (width or image.width, height or image.height)
+        if fit == 'cover' and width and height:
+            image = ImageOps.fit(image, box, Image.LANCZOS)
+        elif fit == 'fill' and width and height:
+            image = image.resize(box, Image.LANCZOS)
+        else:
+            image.thumbnail(box, Image.LANCZOS)
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmpfn: str = f"{target}.{os.getpid()}.tmp"
+        save_options: dict = {'quality': quality, 'optimize': True} if fmt in ('jpeg', 'webp') else {'optimize': True}
+        try:
+            image.save(tmpfn, format=fmt.upper(), **save_options)
+            os.replace(tmpfn, target)
+        finally:
+            # Not leaving the partially written file behind if the saving has failed
+            if os.path.exists(tmpfn):
+                os.remove(tmpfn)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_rendering: Dict[str, asyncio.Future] = {}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=config.STORAGE['image_workers'])
+    return _pool
+
+
+async def _ensure_variant(meta: FileMeta, variant: ImageVariant) -> Optional[Tuple[str, os.stat_result]]:
+    """ Returns the filename and the stat of the cached variant, rendering it if
+    it is not cached yet, or ``None`` if the stored file cannot be rendered. The
+    rendering of the same variant is shared between concurrent requests. """
+
+    target: str = variant.filename(meta)
+    try:
+        return target, await anyio.to_thread.run_sync(os.stat, target)
+    except FileNotFoundError:
+        pass
+
+    future: Optional[asyncio.Future] = _rendering.get(target, None)
+    if future is None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            _get_pool(),
+            _render,
+            meta.blobfn,
+            target,
+            variant.width,
+            variant.height,
+            variant.fit,
+            variant.fmt or _original_format(meta),
+            config.STORAGE['image_quality']
+        )
+        _rendering[target] = future
+        future.add_done_callback(lambda _: _rendering.pop(target, None))
+    try:
+        await asyncio.shield(future)
+    except Exception as e:
+        # Whatever the rendering failure is (not an image, the decompression bomb,
+        # the broken worker pool), the original file is served instead
+        logger.error(f"failed to render the image variant {target}: {e!r}", 'storages')
+        return None
+    return target, await anyio.to_thread.run_sync(os.stat, target)
+
+
+async def get_image_response(
+        entity: str,
+        file_id: str,
+        request: Optional[Request] = None,
+        variant: Optional[ImageVariant] = None
+) -> Union[FileResponse, NotModifiedResponse, Response]:
+    """ The same as :py:func:`~wefram.ds.storages.get_file_response`, but returns
+    the requested variant of the stored image (the one given or the one requested
+    by the ``request`` URL query). Variants are served with long-lived cache
+    headers. Non-image files, non-raster images (like SVG) and files which cannot
+    be rendered, as well as files kept by non-local backends, are always returned
+    as is.
+    """
+
+    if variant is None and request is not None:
+        variant = ImageVariant.from_query(request.query_params)
+    if variant is None or file_id.startswith('/') or not get_backend(entity).local:
+        return await get_file_response(entity, file_id, request)
+
+    if not test_readable(entity):
+        raise exceptions.AccessDenied()
+
+    meta: FileMeta = await get_file_meta(entity, uuid_from(file_id))
+    if meta.content_type.split(';', 1)[0].strip().lower() not in RASTER_TYPES:
+        return await get_file_response(entity, file_id, request)
+
+    filename: str = variant.filename(meta)
+    etag: str = f'"{hashlib.md5(os.path.basename(filename).encode()).hexdigest()}"'
+    fmt: str = variant.fmt or _original_format(meta)
+    headers: Dict[str, str] = {
+        'Content-Type': FORMATS[fmt],
+        'ETag': etag,
+        'Cache-Control': f"public, max-age={config.STORAGE['image_max_age']}"
+    }
+    if request is not None and 'if-none-match' in request.headers:
+        if etag_matches(request.headers['if-none-match'], etag):
+            return NotModifiedResponse(Headers(headers))
+
+    rendered: Optional[Tuple[str, os.stat_result]] = await _ensure_variant(meta, variant)
+    if rendered is None:
+        return await get_file_response(entity, file_id, request)
+    filename, stat_result = rendered
+    if config.STORAGE['offload']:
+        return offload_response(filename, config.FILES_ROOT, config.STORAGE['offload_files_prefix'], headers)
+    return FileResponse(filename, headers=headers, stat_result=stat_result)
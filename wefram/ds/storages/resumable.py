@@ -0,0 +1,379 @@
+"""
+Provides the resumable, chunked uploading of large files to storage entities.
+
+The client creates the upload session first, declaring the file name and the
+total size, then sends the file content by chunks, every chunk at the given
+offset, and may query the current offset at any time. When the connection drops,
+the already received part is kept and the client resumes from the last offset
+instead of the byte zero. When the last chunk is received, the upload is
+finalized into the ordinary stored file with its ``file_id``.
+
+Sessions are kept in the Redis (so any worker may proceed any chunk), the
+partial content is kept under the ``.uploads`` directory of the files storage.
+Sessions expire after ``storage.uploadExpire`` seconds of inactivity; orphaned
+partial files are removed by the :py:func:`purge_stale_uploads` periodic task.
+"""
+
+from typing import *
+import os
+import time
+import hashlib
+from uuid import uuid4
+import anyio
+from ... import config, exceptions, logger
+from .. import redis
+from . import entities
+from .blobs import commit_blob
+from .backends import BlobSink, StorageBackend, get_backend
+from .routines import test_required, get_file_blobfn
+from .uploads import CHUNK_SIZE, FileTooLarge, write_file_info
+
+
+__all__ = [
+    'UploadSession',
+    'UploadNotFound',
+    'UploadConflict',
+    'create_upload',
+    'get_upload',
+    'append_upload',
+    'abort_upload',
+    'purge_stale_uploads'
+]
+
+
+# Releases the lock only if it is still held by the given owner.
+_RELEASE_LUA: str = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Prolongs the lock only if it is still held by the given owner.
+_REFRESH_LUA: str = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Records the upload offset (and prolongs the lock) only if the lock is still
+# held by the given owner, so the stalled request whose lock has been expired
+# never overwrites the offset written by the request which has taken it over.
+_ADVANCE_LUA: str = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'offset', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+LOCK_TIMEOUT: int = 60
+
+
+class UploadNotFound(exceptions.ApiError):
+    """ Raised when there is no such upload session (or it has been expired). """
+
+    def __init__(self):
+        super().__init__(404, "The upload session does not exist or has been expired")
+
+
+class UploadConflict(exceptions.ApiError):
+    """ Raised when the chunk offset does not match the upload session's one, or
+    when the upload is being written by another request right now. """
+
+    def __init__(self, details: str):
+        super().__init__(409, details)
+
+
+class UploadSession:
+    """ The state of the resumable upload session. """
+
+    def __init__(self, upload_id: str, data: Dict[bytes, bytes]):
+        values: Dict[str, str] = {k.decode(): v.decode() for k, v in data.items()}
+        self.upload_id: str = upload_id
+        self.entity: str = values['entity']
+        self.filename: str = values['filename']
+        self.content_type: str = values.get('content_type', '') or 'application/octet-stream'
+        self.size: int = int(values['size'])
+        self.offset: int = int(values.get('offset', 0))
+        self.user_id: Optional[str] = values.get('user', '') or None
+        self.file_id: Optional[str] = values.get('file_id', '') or None
+
+    @property
+    def completed(self) -> bool:
+        return self.file_id is not None
+
+    def json(self) -> dict:
+        return {
+            'id': self.upload_id,
+            'entity': self.entity,
+            'filename': self.filename,
+            'size': self.size,
+            'offset': self.offset,
+            'fileId': self.file_id
+        }
+
+
+def _key(upload_id: str) -> str:
+    return f"storage:upload:{upload_id}"
+
+
+def _uploads_root() -> str:
+    return os.path.join(config.FILES_ROOT, '.uploads')
+
+
+def _part_filename(upload_id: str) -> str:
+    return os.path.join(_uploads_root(), f"{upload_id}.part")
+
+
+def _current_user_id() -> Optional[str]:
+    from ...aaa import get_current_user
+
+    current_user: Optional[Any] = get_current_user()
+    return None if current_user is None else current_user.user_id
+
+
+async def create_upload(
+        entity: str,
+        filename: str,
+        size: int,
+        content_type: Optional[str] = None
+) -> UploadSession:
+    """ Creates the new upload session for the file of the given total size to
+    the given storage entity. The storage entity's permissions and the size limit
+    are checked at this point, so the client does not send the content which will
+    be rejected anyway.
+    """
+
+    if not test_required(entity):
+        raise exceptions.AccessDenied()
+    if size < 0:
+        raise exceptions.ApiError(400, "The upload size must not be negative")
+    max_size: Optional[int] = getattr(entities.registered.get(entity, None), 'max_size', None)
+    if max_size and size > max_size:
+        raise FileTooLarge(max_size)
+
+    upload_id: str = uuid4().hex
+    await anyio.to_thread.run_sync(lambda: os.makedirs(_uploads_root(), exist_ok=True))
+    async with await anyio.open_file(_part_filename(upload_id), 'wb'):
+        pass
+
+    mapping: Dict[str, str] = {
+        'entity': entity,
+        'filename': os.path.basename(filename or '') or 'file',
+        'content_type': content_type or '',
+        'size': str(size),
+        'offset': '0',
+        'user': _current_user_id() or ''
+    }
+    cn: redis.RedisConnection = await redis.get_connection()
+    pipe = cn.pipeline(transaction=True)
+    pipe.hset(_key(upload_id), mapping=mapping)
+    pipe.expire(_key(upload_id), config.STORAGE['upload_expire'])
+    await pipe.execute()
+
+    session: UploadSession = UploadSession(upload_id, {k.encode(): v.encode() for k, v in mapping.items()})
+    if size == 0:
+        return await append_upload(session, 0, _empty())
+    return session
+
+
+async def _empty() -> AsyncIterator[bytes]:
+    return
+    yield
+
+
+async def get_upload(upload_id: str, entity: Optional[str] = None) -> UploadSession:
+    """ Returns the upload session by its id. Only the user which has created the
+    upload may access it. """
+
+    cn: redis.RedisConnection = await redis.get_connection()
+    data: Dict[bytes, bytes] = await cn.hgetall(_key(upload_id))
+    if not data:
+        raise UploadNotFound()
+    session: UploadSession = UploadSession(upload_id, data)
+    if entity is not None and session.entity != entity:
+        raise UploadNotFound()
+    if session.user_id and session.user_id != _current_user_id():
+        raise exceptions.AccessDenied()
+    return session
+
+
+async def append_upload(session: UploadSession, offset: int, chunks: AsyncIterable[bytes]) -> UploadSession:
+    """ Appends the content coming as the async iterable of chunks to the upload
+    at the given offset, which must be equal to the current upload's offset. The
+    content received before the failure (the connection drop, for example) is
+    kept, so the client may resume from the new offset. When the whole declared
+    size is received, the upload is finalized into the stored file and the session
+    gets the ``file_id``.
+    """
+
+    if session.completed:
+        raise UploadConflict("The upload has been already completed")
+    if offset != session.offset:
+        raise UploadConflict(f"The upload offset is {session.offset}, not {offset}")
+
+    key: str = _key(session.upload_id)
+    lock: str = f"{key}:lock"
+    owner: str = uuid4().hex
+    cn: redis.RedisConnection = await redis.get_connection()
+    if not await cn.set(lock, owner, nx=True, ex=LOCK_TIMEOUT):
+        raise UploadConflict("The upload is being written by another request")
+
+    written: int = 0
+    try:
+        # Re-reading the offset under the lock, the session might be advanced by
+        # the concurrent request which has just released the lock.
+        current: Optional[bytes] = await cn.hget(key, 'offset')
+        if current is None:
+            raise UploadNotFound()
+        if int(current) != offset:
+            raise UploadConflict(f"The upload offset is {int(current)}, not {offset}")
+
+        advanced: bool = True
+        async with await anyio.open_file(_part_filename(session.upload_id), 'r+b') as f:
+            # Dropping the tail written after the last recorded offset, if any
+            await f.truncate(offset)
+            await f.seek(offset)
+            try:
+                async for chunk in chunks:
+                    if offset + written + len(chunk) > session.size:
+                        raise exceptions.ApiError(400, "The content exceeds the declared upload size")
+                    # The lock expires while the connection stalls and may be taken
+                    # by the resuming request, so the write is made under the held
+                    # (and prolonged) lock only
+                    if not await cn.eval(_REFRESH_LUA, 1, lock, owner, LOCK_TIMEOUT):
+                        raise UploadConflict("The upload is being written by another request")
+                    await f.write(chunk)
+                    written += len(chunk)
+            finally:
+                await f.flush()
+                if written:
+                    advanced = bool(await cn.eval(
+                        _ADVANCE_LUA, 2, key, lock, owner, offset + written,
+                        config.STORAGE['upload_expire'], LOCK_TIMEOUT
+                    ))
+        if not advanced:
+            raise UploadConflict("The upload is being written by another request")
+
+        session.offset = offset + written
+        if session.offset == session.size:
+            session.file_id = await _finalize(session)
+            await cn.hset(key, 'file_id', session.file_id)
+    finally:
+        await cn.eval(_RELEASE_LUA, 1, lock, owner)
+    return session
+
+
+async def _finalize(session: UploadSession) -> str:
+    """ Moves the completely received content to the storage entity, writing the
+    file info struct next to it. """
+
+    partfn: str = _part_filename(session.upload_id)
+    file_id: str = uuid4().hex
+    backend: StorageBackend = get_backend(session.entity)
+    if not backend.local:
+        sha256: str = await _transfer(backend, session, partfn, file_id)
+        await write_file_info(session.entity, file_id, session.filename, session.size, sha256, {
+            'content_type': session.content_type,
+            'user': session.user_id
+        })
+        return file_id
+
+    blobfn: str = get_file_blobfn(session.entity, file_id, session.filename)
+
+    def _move() -> str:
+        digest = hashlib.sha256()
+        with open(partfn, 'rb') as f:
+            while True:
+                chunk: bytes = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        os.makedirs(os.path.dirname(blobfn), exist_ok=True)
+        commit_blob(partfn, blobfn, digest.hexdigest())
+        return digest.hexdigest()
+
+    sha256: str = await anyio.to_thread.run_sync(_move)
+    await write_file_info(session.entity, file_id, session.filename, session.size, sha256, {
+        'content_type': session.content_type,
+        'user': session.user_id
+    })
+    return file_id
+
+
+async def _transfer(backend: StorageBackend, session: UploadSession, partfn: str, file_id: str) -> str:
+    """ Sends the received content to the non-local backend, removing the part
+    file after. Returns the SHA-256 hash of the content. """
+
+    digest = hashlib.sha256()
+    sink: BlobSink = await backend.open_sink(session.entity, file_id, session.filename, session.content_type)
+    try:
+        async with await anyio.open_file(partfn, 'rb') as f:
+            while True:
+                chunk: bytes = await f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                await sink.write(chunk)
+        await sink.commit(digest.hexdigest())
+    except BaseException:
+        await sink.abort()
+        raise
+    await anyio.to_thread.run_sync(os.remove, partfn)
+    return digest.hexdigest()
+
+
+async def abort_upload(session: UploadSession) -> None:
+    """ Cancels the upload, removing the partially received content. """
+
+    cn: redis.RedisConnection = await redis.get_connection()
+    await cn.unlink(_key(session.upload_id))
+    partfn: str = _part_filename(session.upload_id)
+    await anyio.to_thread.run_sync(lambda: os.path.isfile(partfn) and os.remove(partfn))
+
+
+async def purge_stale_uploads() -> int:
+    """ Removes partial upload files whose sessions have been expired. Returns
+    the number of removed files. """
+
+    root: str = _uploads_root()
+    expire: int = config.STORAGE['upload_expire']
+
+    def _list() -> List[Tuple[str, float]]:
+        if not os.path.isdir(root):
+            return []
+        now: float = time.time()
+        return [
+            (entry.name[:-5], now - entry.stat().st_mtime)
+            for entry in os.scandir(root)
+            if entry.is_file() and entry.name.endswith('.part')
+        ]
+
+    candidates: List[str] = [
+        upload_id for upload_id, age in await anyio.to_thread.run_sync(_list) if age > expire
+    ]
+    if not candidates:
+        return 0
+
+    cn: redis.RedisConnection = await redis.get_connection()
+    pipe = cn.pipeline(transaction=False)
+    for upload_id in candidates:
+        pipe.exists(_key(upload_id))
+    alive: List[int] = await pipe.execute()
+    stale: List[str] = [upload_id for upload_id, exists in zip(candidates, alive) if not exists]
+
+    def _remove() -> None:
+        for upload_id in stale:
+            try:
+                os.remove(_part_filename(upload_id))
+            except FileNotFoundError:
+                pass
+
+    await anyio.to_thread.run_sync(_remove)
+    if stale:
+        logger.info(f"removed {len(stale)} stale partial upload(s)", 'storages')
+    return len(stale)
@@ -6,15 +6,23 @@ Provides general purpose functions for working with storage entities and stored
 from typing import *
 from uuid import uuid4
 import os
+import stat
 import json
-import shutil
+import hashlib
+import time
+import asyncio
 import datetime
+import mimetypes
+from collections import OrderedDict
+from urllib.parse import quote
 import anyio
 from starlette.datastructures import URL, Headers
 from email.utils import parsedate
-from ...requests import FileResponse, Request, NotModifiedResponse
-from ... import config, exceptions
+from ...requests import FileResponse, Request, NotModifiedResponse, Response, etag_matches
+from ... import config, exceptions, logger
 from . import entities
+from .blobs import commit_blob, remove_file_tree
+from .backends import StorageBackend, get_backend, backends
 
 
 __all__ = [
@@ -23,7 +31,14 @@ __all__ = [
     'remove_file',
     'remove_files',
     'get_file_response',
-    'get_abs_filename'
+    'get_local_file_response',
+    'get_abs_filename',
+    'FileMeta',
+    'get_file_meta',
+    'invalidate_file_meta',
+    'content_disposition',
+    'offload_response',
+    'close_backends'
 ]
 
 
@@ -79,11 +94,7 @@ def test_required(entity_name: str) -> bool:
     entity: entities.StorageEntity = entities.registered[entity_name]
     if not entity.requires:
         return True
-    requires: List[str] = list(entity.requires) if isinstance(entity.requires, (list, tuple)) else [entity.requires]
-    requires = [(
-        r if '.' in r else '.'.join([entity.app, r])
-    ) for r in requires]
-    return permitted(requires)
+    return permitted(entity.requires)
 
 
 def test_readable(entity_name: str) -> bool:
@@ -109,7 +120,8 @@ def get_file_root(entity: str, file_id: str) -> str:
     corresponding filename.
     """
 
-    return os.path.join(config.FILES_ROOT, entity, file_id[:2])
+    dir1, dir2, dir3 = get_file_subpath(file_id)
+    return os.path.join(config.FILES_ROOT, entity, dir1, dir2, dir3)
 
 
 def get_file_blobfn(entity: str, file_id: str, filename: str) -> str:
@@ -132,6 +144,94 @@ def get_file_infofn(entity: str, file_id: str) -> str:
     return os.path.join(config.FILES_ROOT, entity, dir1, dir2, dir3, '.fileinfo.json')
 
 
+class FileMeta:
+    """ The cached metadata of the stored file: its info struct and the state of
+    the content file on the disk. """
+
+    def __init__(self, entity: str, file_id: str, info: dict, info_mtime: float, stat_result: os.stat_result):
+        self.entity: str = entity
+        self.file_id: str = file_id
+        self.info: dict = info
+        self.info_mtime: float = info_mtime
+        self.stat_result: os.stat_result = stat_result
+        self.filename: str = info.get('filename', file_id)
+        self.content_type: str = info.get('content_type', 'attachment')
+        self.blobfn: str = get_file_blobfn(entity, file_id, self.filename)
+        self.checked: float = time.monotonic()
+
+        sha256: Optional[str] = info.get('sha256', None)
+        # The strong ETag is the content hash recorded at the upload time; the files
+        # stored before hashes have been introduced fall back to the stat-based one.
+        self.etag: str = f'"{sha256}"' if sha256 else \
+            f'"{hashlib.md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode()).hexdigest()}"'
+
+
+_meta_cache: 'OrderedDict[Tuple[str, str], FileMeta]' = OrderedDict()
+
+
+def _load_file_meta(entity: str, file_id: str, cached: Optional[FileMeta]) -> FileMeta:
+    """ Loads (or revalidates the given cached) file metadata. Does the blocking
+    I/O, so is called in the worker thread from async code. """
+
+    infofn: str = get_file_infofn(entity, file_id)
+    info_mtime: float = os.stat(infofn).st_mtime
+    if cached is not None and cached.info_mtime == info_mtime:
+        cached.checked = time.monotonic()
+        return cached
+    with open(infofn, 'r') as f:
+        info: dict = json.load(f)
+    blobfn: str = get_file_blobfn(entity, file_id, info.get('filename', file_id))
+    return FileMeta(entity, file_id, info, info_mtime, os.stat(blobfn))
+
+
+def _lookup_file_meta(entity: str, file_id: str) -> Tuple[Optional[FileMeta], bool]:
+    """ Returns the cached metadata (if any) and whether it is fresh enough to be
+    used without the revalidation. """
+
+    meta: Optional[FileMeta] = _meta_cache.get((entity, file_id), None)
+    if meta is None:
+        return None, False
+    _meta_cache.move_to_end((entity, file_id))
+    return meta, time.monotonic() - meta.checked < config.STORAGE['meta_revalidate']
+
+
+def _store_file_meta(meta: FileMeta) -> FileMeta:
+    _meta_cache[(meta.entity, meta.file_id)] = meta
+    _meta_cache.move_to_end((meta.entity, meta.file_id))
+    while len(_meta_cache) > config.STORAGE['meta_cache_size']:
+        _meta_cache.popitem(last=False)
+    return meta
+
+
+async def get_file_meta(entity: str, file_id: str) -> FileMeta:
+    """ Returns the metadata of the stored file. The metadata is cached by the
+    worker (LRU, ``storage.metaCacheSize`` entries) and is revalidated against
+    the info struct modification time at most once per ``storage.metaRevalidate``
+    seconds. The file system is never accessed from the event loop.
+
+    :raises:
+        ``FileNotFoundError`` if there is no such file.
+    """
+
+    file_id = uuid_from(file_id)
+    meta, fresh = _lookup_file_meta(entity, file_id)
+    if fresh:
+        return meta
+    try:
+        meta = await anyio.to_thread.run_sync(_load_file_meta, entity, file_id, meta)
+    except (FileNotFoundError, NotADirectoryError):
+        invalidate_file_meta(entity, file_id)
+        raise FileNotFoundError()
+    return _store_file_meta(meta)
+
+
+def invalidate_file_meta(entity: str, file_id: str) -> None:
+    """ Drops the cached metadata of the file, called when the file is removed
+    or replaced. """
+
+    _meta_cache.pop((entity, uuid_from(file_id)), None)
+
+
 def upload_file_content(
         entity: str,
         file: Any,
@@ -168,6 +268,11 @@ def upload_file_content(
 
     :raises:
         The `AccessDenied` if the current user has no access.
+
+    Note that this function does the blocking file I/O; use the
+    :py:func:`~wefram.ds.storages.store_file_object` or
+    :py:func:`~wefram.ds.storages.store_stream` within async code instead. It is
+    available for entities kept by the local backend only.
     """
 
     from ...aaa import get_current_user
@@ -175,17 +280,30 @@ def upload_file_content(
     if not test_required(entity):
         raise exceptions.AccessDenied()
 
+    if not get_backend(entity).local:
+        raise RuntimeError(
+            f"the storage entity '{entity}' is not kept locally, use store_file_object() or store_stream()"
+        )
+
     new_file_id: str = uuid_from(uuid4().hex if not force_id else force_id)
     dir1: str
     dir2: str
     subn: str
     dir1, dir2, dir3 = get_file_subpath(new_file_id)
-    os.makedirs(os.path.join(config.FILES_ROOT, entity, dir1, dir2, dir3))
+    os.makedirs(os.path.join(config.FILES_ROOT, entity, dir1, dir2, dir3), exist_ok=True)
     blobfn: str = get_file_blobfn(entity, new_file_id, filename)
     infofn: str = get_file_infofn(entity, new_file_id)
 
-    with open(blobfn, 'wb') as f:
-        shutil.copyfileobj(file, f)
+    tmpfn: str = f"{blobfn}.tmp"
+    digest = hashlib.sha256()
+    with open(tmpfn, 'wb') as f:
+        while True:
+            chunk: bytes = file.read(64 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    commit_blob(tmpfn, blobfn, digest.hexdigest())
 
     current_user: Optional[Any] = get_current_user()
     user_id: Optional[str] = None if current_user is None else current_user.user_id
@@ -195,15 +313,93 @@ def upload_file_content(
     info.setdefault('filesize', os.path.getsize(blobfn))
     info.setdefault('timestamp', datetime.datetime.now().isoformat(timespec='seconds'))
     info.setdefault('user', user_id)
+    info['sha256'] = digest.hexdigest()
+    if str(info.get('content_type', None) or '').startswith('image/') and 'width' not in info:
+        from .images import image_size
+
+        dimensions: Optional[Tuple[int, int]] = image_size(blobfn)
+        if dimensions is not None:
+            info['width'], info['height'] = dimensions
 
     with open(infofn, 'w') as f:
         json.dump(info, f, ensure_ascii=False)
+    invalidate_file_meta(entity, new_file_id)
 
     return new_file_id
 
 
+_removals: Set[asyncio.Future] = set()
+
+
+def _removal_done(future: asyncio.Future) -> None:
+    """ Forgets the finished background removal, logging its failure (nobody
+    awaits it, so the exception would be lost otherwise). """
+
+    _removals.discard(future)
+    if future.cancelled():
+        return
+    error: Optional[BaseException] = future.exception()
+    if error is not None:
+        logger.error(f"failed to remove stored files: {error!r}", 'storages')
+
+
+def _remove_remote(backend: StorageBackend, entity: str, files_ids: List[str]) -> None:
+    """ Removes files kept by the non-local backend, in the background task if
+    the event loop is running, or right away otherwise. """
+
+    if not files_ids:
+        return
+    try:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(backend.remove(entity, files_ids))
+        return
+    future: asyncio.Future = loop.create_task(backend.remove(entity, files_ids))
+    _removals.add(future)
+    future.add_done_callback(_removal_done)
+
+
+async def close_backends() -> None:
+    """ Waits for the background removals to finish and closes storage backends
+    (their connections to the object storage, etc). Called on the server
+    shutdown. """
+
+    if _removals:
+        await asyncio.gather(*list(_removals), return_exceptions=True)
+    for backend in backends.values():
+        await backend.close()
+
+
+def _remove_trees(roots: List[str]) -> None:
+    """ Removes the given stored files' directories in the worker thread, not
+    blocking the event loop (if it is running), or right away otherwise. """
+
+    def _remove() -> None:
+        # The one failed directory must not leave the rest ones in place
+        failed: List[str] = []
+        for root in roots:
+            try:
+                remove_file_tree(root)
+            except Exception:
+                failed.append(root)
+        if failed:
+            raise OSError(f"stored files directories have not been removed: {', '.join(failed)}")
+
+    if not roots:
+        return
+    try:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    except RuntimeError:
+        _remove()
+        return
+    future: asyncio.Future = loop.run_in_executor(None, _remove)
+    _removals.add(future)
+    future.add_done_callback(_removal_done)
+
+
 def remove_file(entity: str, file_id: str) -> None:
-    """ Removes the file from the file system of the server.
+    """ Removes the file from the file system of the server. The removal itself
+    is done in the background worker thread when called from async code.
 
     :param entity:
         The corresponding storage entity. The full entity name must be used, including
@@ -224,14 +420,17 @@ def remove_file(entity: str, file_id: str) -> None:
         return
 
     file_id = uuid_from(file_id)
-    root: str = get_file_root(entity, file_id)
-    if not os.path.exists(root):
+    backend: StorageBackend = get_backend(entity)
+    if not backend.local:
+        _remove_remote(backend, entity, [file_id])
         return
-    shutil.rmtree(root, ignore_errors=True)
+    invalidate_file_meta(entity, file_id)
+    _remove_trees([get_file_root(entity, file_id)])
 
 
 def remove_files(entity: str, files_ids: List[str]) -> None:
-    """ Removes files from the file system of the server.
+    """ Removes files from the file system of the server, in the background worker
+    thread when called from async code.
 
     :param entity:
         The corresponding storage entity. The full entity name must be used, including
@@ -247,15 +446,54 @@ def remove_files(entity: str, files_ids: List[str]) -> None:
     if not test_required(entity):
         raise exceptions.AccessDenied()
 
+    files_ids = [uuid_from(file_id) for file_id in files_ids]
+    # Not removing statically embedded files
+    files_ids = [file_id for file_id in files_ids if not file_id.startswith('/')]
+    backend: StorageBackend = get_backend(entity)
+    if not backend.local:
+        _remove_remote(backend, entity, files_ids)
+        return
+
+    roots: List[str] = []
     for file_id in files_ids:
-        file_id = uuid_from(file_id)
-        if file_id.startswith('/'):
-            # Not removing statically embedded files
-            continue
-        root: str = get_file_root(entity, file_id)
-        if not os.path.exists(root):
-            continue
-        shutil.rmtree(root, ignore_errors=True)
+        invalidate_file_meta(entity, file_id)
+        roots.append(get_file_root(entity, file_id))
+    _remove_trees(roots)
+
+
+OFFLOAD_X_ACCEL: str = 'x-accel'
+OFFLOAD_X_SENDFILE: str = 'x-sendfile'
+
+
+def content_disposition(filename: str, disposition: str = 'inline') -> str:
+    """ Returns the ``Content-Disposition`` header value for the given filename,
+    with the RFC-5987 encoded name for non-ASCII filenames. """
+
+    ascii_name: str = filename.encode('ascii', 'replace').decode('ascii').replace('"', '')
+    if ascii_name == filename:
+        return f'{disposition}; filename="{filename}"'
+    return f'{disposition}; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(filename)}'
+
+
+def offload_response(
+        filepath: str,
+        root: str,
+        prefix: str,
+        headers: Dict[str, str]
+) -> Response:
+    """ Returns the empty response which makes the front proxy to send the given
+    file itself, instead of streaming it through the worker, by the internal
+    redirect: ``X-Accel-Redirect`` (nginx) to the ``prefix`` joined with the file
+    path relative to the ``root``, or ``X-Sendfile`` (Apache, lighttpd) with the
+    absolute file path, depending on the ``storage.offload`` configuration.
+    """
+
+    if config.STORAGE['offload'] == OFFLOAD_X_SENDFILE:
+        headers['X-Sendfile'] = filepath
+    else:
+        relpath: str = os.path.relpath(filepath, root).replace(os.sep, '/')
+        headers['X-Accel-Redirect'] = quote(f"{prefix.rstrip('/')}/{relpath}")
+    return Response(status_code=200, headers=headers)
 
 
 async def get_embedded_file_response(
@@ -292,23 +530,30 @@ async def get_embedded_file_response(
     """
 
     filepath: str = os.path.join(config.STATICS_ROOT, 'assets', file_id.replace('..', ''))
-    if not os.path.isfile(filepath):
+    try:
+        stat_result: os.stat_result = await anyio.to_thread.run_sync(os.stat, filepath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise FileNotFoundError()
+    if not stat.S_ISREG(stat_result.st_mode):
         raise FileNotFoundError()
 
     filename: str = os.path.basename(filepath)
-    # RFC-6266 is required here, but the corresponding package is BROKEN
-    # TODO!
-    # disposition_raw: Union[str, bytes] = rfc6266.build_header(filename)
-    # disposition: str = disposition_raw.decode('latin-1') \
-    #     if isinstance(disposition_raw, bytes) \
-    #     else disposition_raw
-    stat_result = await anyio.to_thread.run_sync(os.stat, filepath)
+    if config.STORAGE['offload']:
+        return offload_response(
+            filepath,
+            os.path.join(config.STATICS_ROOT, 'assets'),
+            config.STORAGE['offload_assets_prefix'],
+            {
+                'Content-Type': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                'Content-Disposition': content_disposition(filename)
+            }
+        )
 
     response: FileResponse = FileResponse(
         filepath,
         headers={
             'Connection': 'keep-alive',
-            # 'Content-Disposition': disposition,  # TODO
+            'Content-Disposition': content_disposition(filename)
         },
         stat_result=stat_result
     )
@@ -319,11 +564,55 @@ async def get_embedded_file_response(
     return response
 
 
+async def get_local_file_response(
+        entity: str,
+        file_id: str,
+        request: Optional[Request] = None
+) -> Union[FileResponse, NotModifiedResponse, Response]:
+    """ Returns the response with the content of the file kept by the local
+    backend. Used by :py:func:`get_file_response`, which checks the access. """
+
+    meta: FileMeta = await get_file_meta(entity, file_id)
+    headers: Dict[str, str] = {
+        'Connection': 'keep-alive',
+        'Content-Type': meta.content_type,
+        'ETag': meta.etag
+    }
+
+    # Answering the conditional request by the cached metadata, not touching
+    # the file content at all.
+    if request is not None and 'if-none-match' in request.headers:
+        if etag_matches(request.headers['if-none-match'], meta.etag):
+            return NotModifiedResponse(Headers(headers))
+
+    if config.STORAGE['offload']:
+        headers.pop('Connection')
+        headers['Content-Disposition'] = content_disposition(meta.filename)
+        return offload_response(
+            meta.blobfn,
+            config.FILES_ROOT,
+            config.STORAGE['offload_files_prefix'],
+            headers
+        )
+
+    headers['Content-Disposition'] = content_disposition(meta.filename)
+    response: FileResponse = FileResponse(
+        meta.blobfn,
+        headers=headers,
+        stat_result=meta.stat_result
+    )
+
+    if request is not None and file_not_modified(response.headers, request.headers):
+        return NotModifiedResponse(response.headers)
+
+    return response
+
+
 async def get_file_response(
         entity: str,
         file_id: str,
         request: Optional[Request] = None
-) -> Union[FileResponse, NotModifiedResponse]:
+) -> Union[FileResponse, NotModifiedResponse, Response]:
     """
     Generates the file response for the given storage ``entity`` and corresponding ``file_id``,
     and with usage of the given ``request``. If the requesting client (usually web browser)
@@ -346,7 +635,8 @@ async def get_file_response(
 
     :return:
         ``NotModifiedResponse`` if, basing on the request, the requested file
-        was not modified, or the ``FileResponse`` instead.
+        was not modified, or the ``FileResponse`` instead. For entities kept by the
+        non-local backend, the response may redirect the client to the storage.
 
     :raises:
         ``FileNotFound`` exception if the given file is not exists.
@@ -364,40 +654,7 @@ async def get_file_response(
         # starts with leading slash.
         return await get_embedded_file_response(file_id, request)
 
-    file_id = uuid_from(file_id)
-    infofn: str = get_file_infofn(entity, file_id)
-
-    with open(infofn, 'r') as f:
-        info: dict = json.load(f)
-
-    filename: str = info.get('filename', file_id)
-    content_type: str = info.get('content_type', 'attachment')
-    blobfn: str = get_file_blobfn(entity, file_id, filename)
-    if not os.path.isfile(blobfn):
-        raise FileNotFoundError()
-
-    # TODO
-    # disposition_raw: Union[str, bytes] = rfc6266.build_header(filename)
-    # disposition: str = disposition_raw.decode('latin-1') \
-    #     if isinstance(disposition_raw, bytes) \
-    #     else disposition_raw
-
-    stat_result = await anyio.to_thread.run_sync(os.stat, blobfn)
-
-    response: FileResponse = FileResponse(
-        blobfn,
-        headers={
-            'Connection': 'keep-alive',
-            # 'Content-Disposition': disposition,  # TODO
-            'Content-Type': content_type
-        },
-        stat_result=stat_result
-    )
-
-    if request is not None and file_not_modified(response.headers, request.headers):
-        return NotModifiedResponse(response.headers)
-
-    return response
+    return await get_backend(entity).file_response(entity, uuid_from(file_id), request)
 
 
 def get_abs_filename(entity: str, file_id: str) -> Optional[str]:
@@ -409,6 +666,8 @@ def get_abs_filename(entity: str, file_id: str) -> Optional[str]:
     in the 'assets' folder. This makes possible to statically place files and specify their
     file_ids in the database (for example, default files whose about to be used if there are
     not uploaded ones).
+
+    Files kept by non-local backends have no filename, so ``None`` is returned for them.
     """
 
     if file_id.startswith('/'):
@@ -417,16 +676,17 @@ def get_abs_filename(entity: str, file_id: str) -> Optional[str]:
             return None
         return filepath
 
-    file_id = uuid_from(file_id)
-    infofn: str = get_file_infofn(entity, file_id)
-
-    with open(infofn, 'r') as f:
-        info: dict = json.load(f)
-
-    filename: str = info.get('filename', file_id)
-    blobfn: str = get_file_blobfn(entity, file_id, filename)
-    if not os.path.isfile(blobfn):
+    if not get_backend(entity).local:
         return None
 
-    return blobfn
+    file_id = uuid_from(file_id)
+    meta, fresh = _lookup_file_meta(entity, file_id)
+    if not fresh:
+        try:
+            meta = _store_file_meta(_load_file_meta(entity, file_id, meta))
+        except (FileNotFoundError, NotADirectoryError):
+            invalidate_file_meta(entity, file_id)
+            return None
+
+    return meta.blobfn
 
@@ -0,0 +1,367 @@
+"""
+Provides the S3-compatible object storage backend (AWS S3, MinIO, Ceph RGW, etc).
+
+Objects are named ``<prefix><entity>/<file_id>/<filename>``, with the info struct
+of the file kept in the ``<prefix><entity>/<file_id>/.fileinfo.json`` object next
+to the content. Contents are uploaded as they come, using the multipart upload
+for files larger than the part size, so the file is never buffered entirely. The
+download responds with the redirect to the presigned URL, so the content is
+transferred by the object storage itself.
+
+Requests are signed with the AWS Signature Version 4.
+"""
+
+from typing import *
+import time
+import json
+import hmac
+import hashlib
+import asyncio
+import datetime
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+import aiohttp
+from yarl import URL as YarlURL
+from starlette.datastructures import Headers
+from ...requests import Request, Response, RedirectResponse, NotModifiedResponse, etag_matches
+from ... import config
+from .backends import BlobSink, StorageBackend
+
+
+__all__ = [
+    'S3Backend',
+    'S3Error'
+]
+
+
+UNSIGNED_PAYLOAD: str = 'UNSIGNED-PAYLOAD'
+MIN_PART_SIZE: int = 5 * 1024 * 1024
+
+
+class S3Error(OSError):
+    """ Raised when the object storage responds with the error. """
+
+    def __init__(self, method: str, key: str, status: int, details: str):
+        super().__init__(f"S3 {method} '{key}' failed with {status}: {details[:512]}")
+        self.status: int = status
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _quote(value: str) -> str:
+    return quote(value, safe='-_.~')
+
+
+def _canonical_query(query: Dict[str, str]) -> str:
+    return '&'.join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(query.items()))
+
+
+class Signer:
+    """ The AWS Signature Version 4 signer for the S3 service. """
+
+    def __init__(self, access_key: str, secret_key: str, region: str):
+        self.access_key: str = access_key
+        self.secret_key: str = secret_key
+        self.region: str = region
+
+    def _scope(self, date: str) -> str:
+        return f"{date}/{self.region}/s3/aws4_request"
+
+    def _signature(self, amz_date: str, canonical_request: str) -> str:
+        date: str = amz_date[:8]
+        string_to_sign: str = '\n'.join([
+            'AWS4-HMAC-SHA256',
+            amz_date,
+            self._scope(date),
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+        key: bytes = _hmac(('AWS4' + self.secret_key).encode('utf-8'), date)
+        for part in (self.region, 's3', 'aws4_request'):
+            key = _hmac(key, part)
+        return hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def sign_headers(
+            self,
+            method: str,
+            host: str,
+            path: str,
+            query: Dict[str, str],
+            payload_hash: str,
+            amz_date: str
+    ) -> Dict[str, str]:
+        """ Returns the headers authorizing the request. """
+
+        headers: Dict[str, str] = {
+            'host': host,
+            'x-amz-content-sha256': payload_hash,
+            'x-amz-date': amz_date
+        }
+        signed_headers: str = ';'.join(sorted(headers))
+        canonical_request: str = '\n'.join([
+            method,
+            quote(path, safe='/-_.~'),
+            _canonical_query(query),
+            ''.join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+            signed_headers,
+            payload_hash
+        ])
+        signature: str = self._signature(amz_date, canonical_request)
+        headers['authorization'] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{self._scope(amz_date[:8])},"
+            f" SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        del headers['host']
+        return headers
+
+    def presign(
+            self,
+            method: str,
+            host: str,
+            path: str,
+            query: Dict[str, str],
+            expires: int,
+            amz_date: str
+    ) -> Dict[str, str]:
+        """ Returns the query arguments of the presigned URL. """
+
+        query = dict(query)
+        query.update({
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f"{self.access_key}/{self._scope(amz_date[:8])}",
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires),
+            'X-Amz-SignedHeaders': 'host'
+        })
+        canonical_request: str = '\n'.join([
+            method,
+            quote(path, safe='/-_.~'),
+            _canonical_query(query),
+            f"host:{host}\n",
+            'host',
+            UNSIGNED_PAYLOAD
+        ])
+        query['X-Amz-Signature'] = self._signature(amz_date, canonical_request)
+        return query
+
+
+def _amz_date() -> str:
+    return datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+
+
+class _S3Sink(BlobSink):
+    """ Uploads the content as it comes: the single PUT for small files, and the
+    multipart upload for files larger than the part size. """
+
+    def __init__(self, backend: 'S3Backend', key: str, content_type: str):
+        self.backend: S3Backend = backend
+        self.key: str = key
+        self.content_type: str = content_type
+        self.buffer: bytearray = bytearray()
+        self.upload_id: Optional[str] = None
+        self.parts: List[str] = []
+
+    async def _flush_part(self) -> None:
+        if self.upload_id is None:
+            body: bytes = await self.backend.request(
+                'POST', self.key, {'uploads': ''}, headers={'content-type': self.content_type}
+            )
+            self.upload_id = ElementTree.fromstring(body).findtext('{*}UploadId')
+        part: bytes = bytes(self.buffer)
+        self.buffer.clear()
+        headers: Dict[str, str] = {}
+        await self.backend.request(
+            'PUT',
+            self.key,
+            {'partNumber': str(len(self.parts) + 1), 'uploadId': self.upload_id},
+            part,
+            response_headers=headers
+        )
+        self.parts.append(headers.get('etag', ''))
+
+    async def write(self, chunk: bytes) -> None:
+        self.buffer.extend(chunk)
+        if len(self.buffer) >= self.backend.part_size:
+            await self._flush_part()
+
+    async def commit(self, sha256: str) -> None:
+        if self.upload_id is None:
+            await self.backend.request(
+                'PUT', self.key, body=bytes(self.buffer), headers={'content-type': self.content_type}
+            )
+            self.buffer.clear()
+            return
+        if self.buffer:
+            await self._flush_part()
+        manifest: str = ''.join(
+            f"<Part><PartNumber>{i}</PartNumber><ETag>{etag}</ETag></Part>"
+            for i, etag in enumerate(self.parts, 1)
+        )
+        await self.backend.request(
+            'POST',
+            self.key,
+            {'uploadId': self.upload_id},
+            f"<CompleteMultipartUpload>{manifest}</CompleteMultipartUpload>".encode('utf-8')
+        )
+
+    async def abort(self) -> None:
+        self.buffer.clear()
+        if self.upload_id is not None:
+            await self.backend.request('DELETE', self.key, {'uploadId': self.upload_id})
+
+
+class S3Backend(StorageBackend):
+    """ The S3-compatible object storage backend. """
+
+    local = False
+
+    def __init__(
+            self,
+            endpoint: str,
+            bucket: str,
+            access_key: str,
+            secret_key: str,
+            region: str = 'us-east-1',
+            prefix: str = '',
+            path_style: bool = True,
+            presign_expire: int = 300,
+            part_size: int = 8 * 1024 * 1024
+    ):
+        endpoint_url = urlsplit(endpoint if '://' in endpoint else f"https://{endpoint}")
+        self.scheme: str = endpoint_url.scheme
+        self.host: str = endpoint_url.netloc if path_style else f"{bucket}.{endpoint_url.netloc}"
+        self.base_path: str = f"/{bucket}/" if path_style else '/'
+        self.bucket: str = bucket
+        self.prefix: str = prefix
+        self.presign_expire: int = presign_expire
+        self.part_size: int = max(part_size, MIN_PART_SIZE)
+        self.signer: Signer = Signer(access_key, secret_key, region)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._infos: Dict[Tuple[str, str], Tuple[float, dict]] = {}
+
+    @classmethod
+    def from_config(cls, params: dict) -> 'S3Backend':
+        return cls(
+            endpoint=params['endpoint'],
+            bucket=params['bucket'],
+            access_key=params.get('accessKey', ''),
+            secret_key=params.get('secretKey', ''),
+            region=params.get('region', 'us-east-1'),
+            prefix=params.get('prefix', ''),
+            path_style=bool(params.get('pathStyle', True)),
+            presign_expire=int(params.get('presignExpire', 300)),
+            part_size=int(params.get('partSize', 8 * 1024 * 1024))
+        )
+
+    def key_of(self, entity: str, file_id: str, filename: str) -> str:
+        return f"{self.prefix}{entity}/{file_id}/{filename}"
+
+    def _session_of(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_read=60))
+        return self._session
+
+    async def request(
+            self,
+            method: str,
+            key: str,
+            query: Optional[Dict[str, str]] = None,
+            body: Optional[bytes] = None,
+            headers: Optional[Dict[str, str]] = None,
+            response_headers: Optional[Dict[str, str]] = None
+    ) -> bytes:
+        """ Executes the signed request to the object storage, returning the
+        response body. Raises ``FileNotFoundError`` on 404 and :py:class:`S3Error`
+        on other failures. """
+
+        query = query or {}
+        path: str = self.base_path + key
+        payload_hash: str = hashlib.sha256(body or b'').hexdigest() if body is None or len(body) < 65536 \
+            else UNSIGNED_PAYLOAD
+        request_headers: Dict[str, str] = dict(headers or {})
+        request_headers.update(self.signer.sign_headers(method, self.host, path, query, payload_hash, _amz_date()))
+        url: str = f"{self.scheme}://{self.host}{quote(path, safe='/-_.~')}"
+        if query:
+            url += '?' + _canonical_query(query)
+        async with self._session_of().request(
+                method, YarlURL(url, encoded=True), data=body, headers=request_headers
+        ) as response:
+            content: bytes = await response.read()
+            if response.status == 404:
+                raise FileNotFoundError(key)
+            if response.status >= 300:
+                raise S3Error(method, key, response.status, content.decode('utf-8', 'replace'))
+            if response_headers is not None:
+                response_headers.update({k.lower(): v for k, v in response.headers.items()})
+            return content
+
+    def presigned_url(self, key: str, query: Optional[Dict[str, str]] = None) -> str:
+        """ Returns the presigned URL for downloading the object. """
+
+        path: str = self.base_path + key
+        signed: Dict[str, str] = self.signer.presign(
+            'GET', self.host, path, query or {}, self.presign_expire, _amz_date()
+        )
+        return f"{self.scheme}://{self.host}{quote(path, safe='/-_.~')}?{_canonical_query(signed)}"
+
+    async def open_sink(self, entity: str, file_id: str, filename: str, content_type: str) -> BlobSink:
+        return _S3Sink(self, self.key_of(entity, file_id, filename), content_type)
+
+    async def write_info(self, entity: str, file_id: str, info: dict) -> None:
+        await self.request(
+            'PUT',
+            self.key_of(entity, file_id, '.fileinfo.json'),
+            body=json.dumps(info, ensure_ascii=False).encode('utf-8'),
+            headers={'content-type': 'application/json'}
+        )
+        self._infos.pop((entity, file_id), None)
+
+    async def read_info(self, entity: str, file_id: str) -> dict:
+        """ Returns the file info struct, cached for ``storage.metaRevalidate``
+        seconds (stored files are never changed in place). """
+
+        cached: Optional[Tuple[float, dict]] = self._infos.get((entity, file_id), None)
+        if cached is not None and time.monotonic() - cached[0] < config.STORAGE['meta_revalidate']:
+            return cached[1]
+        info: dict = json.loads(await self.request('GET', self.key_of(entity, file_id, '.fileinfo.json')))
+        if len(self._infos) >= config.STORAGE['meta_cache_size']:
+            self._infos.pop(next(iter(self._infos)))
+        self._infos[(entity, file_id)] = (time.monotonic(), info)
+        return info
+
+    async def remove(self, entity: str, files_ids: List[str]) -> None:
+        async def _remove(file_id: str) -> None:
+            try:
+                info: dict = await self.read_info(entity, file_id)
+            except FileNotFoundError:
+                return
+            self._infos.pop((entity, file_id), None)
+            await self.request('DELETE', self.key_of(entity, file_id, info.get('filename', file_id)))
+            await self.request('DELETE', self.key_of(entity, file_id, '.fileinfo.json'))
+
+        await asyncio.gather(*[_remove(file_id) for file_id in files_ids])
+
+    async def file_response(self, entity: str, file_id: str, request: Optional[Request]) -> Response:
+        from .routines import content_disposition
+
+        info: dict = await self.read_info(entity, file_id)
+        filename: str = info.get('filename', file_id)
+        etag: Optional[str] = f'"{info["sha256"]}"' if info.get('sha256', None) else None
+        if etag and request is not None and 'if-none-match' in request.headers:
+            if etag_matches(request.headers['if-none-match'], etag):
+                return NotModifiedResponse(Headers({'etag': etag}))
+        url: str = self.presigned_url(self.key_of(entity, file_id, filename), {
+            'response-content-type': info.get('content_type', None) or 'application/octet-stream',
+            'response-content-disposition': content_disposition(filename)
+        })
+        # The redirect itself may be cached by the client, but not longer than
+        # the presigned URL is valid.
+        return RedirectResponse(url, status_code=302, headers={
+            'Cache-Control': f"private, max-age={max(0, self.presign_expire - 30)}"
+        })
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -0,0 +1,306 @@
+"""
+Provides the non-blocking, streaming storing of uploaded files to storage entities.
+
+Unlike :py:func:`~wefram.ds.storages.upload_file_content`, which copies the
+already spooled file object synchronously, functions of this module write the
+file chunk by chunk, as it comes, using the worker threads for the file I/O. The
+SHA-256 hash and the size of the file are computed on the fly; the size limit of
+the storage entity (if any) is enforced as soon as it is exceeded. The content
+is passed to the backend of the storage entity (see
+:py:mod:`~wefram.ds.storages.backends`) as it comes.
+"""
+
+from typing import *
+import os
+import hashlib
+import datetime
+from uuid import uuid4
+import anyio
+from multipart.multipart import MultipartParser, parse_options_header
+from ...requests import Request
+from ... import exceptions, logger
+from . import entities
+from .backends import BlobSink, StorageBackend, get_backend
+from .images import image_size
+from .routines import test_required, uuid_from, get_file_blobfn, invalidate_file_meta
+
+
+__all__ = [
+    'FileTooLarge',
+    'StorageWriter',
+    'write_file_info',
+    'store_stream',
+    'store_file_object',
+    'store_request_files'
+]
+
+
+CHUNK_SIZE: int = 64 * 1024
+
+
+class FileTooLarge(exceptions.ApiError):
+    """ Raised when the uploading file exceeds the storage entity size limit. """
+
+    def __init__(self, max_size: int):
+        super().__init__(413, f"The file exceeds the maximum allowed size of {max_size} bytes")
+
+
+async def write_file_info(
+        entity: str,
+        file_id: str,
+        filename: str,
+        size: int,
+        sha256: str,
+        info: Optional[dict] = None
+) -> dict:
+    """ Writes the ``.fileinfo.json`` struct of the stored file, completing the
+    given extra info with the file name, size, hash, timestamp, the uploading
+    user (the current one, if not given explicitly) and the dimensions of
+    images (kept by the local backend). Returns the written info. """
+
+    from ...aaa import get_current_user
+
+    backend: StorageBackend = get_backend(entity)
+    info = dict(info) if isinstance(info, dict) else {}
+    info['filename'] = filename
+    info['filesize'] = size
+    info['sha256'] = sha256
+    if backend.local and str(info.get('content_type', None) or '').startswith('image/') and 'width' not in info:
+        dimensions: Optional[Tuple[int, int]] = await anyio.to_thread.run_sync(
+            image_size, get_file_blobfn(entity, file_id, filename)
+        )
+        if dimensions is not None:
+            info['width'], info['height'] = dimensions
+    info.setdefault('timestamp', datetime.datetime.now().isoformat(timespec='seconds'))
+    if 'user' not in info:
+        current_user: Optional[Any] = get_current_user()
+        info['user'] = None if current_user is None else current_user.user_id
+    await backend.write_info(entity, file_id, info)
+    invalidate_file_meta(entity, file_id)
+    return info
+
+
+class StorageWriter:
+    """ Writes the single file to the storage entity, chunk by chunk. The usage:
+
+    .. highlight:: python
+    .. code-block:: python
+
+        writer = StorageWriter('myapp.photos', 'photo.jpg', {'content_type': 'image/jpeg'})
+        await writer.open()
+        try:
+            async for chunk in some_source:
+                await writer.write(chunk)
+        except BaseException:
+            await writer.abort()
+            raise
+        file_id: str = await writer.close()
+
+    """
+
+    def __init__(
+            self,
+            entity: str,
+            filename: str,
+            info: Optional[dict] = None,
+            force_id: Optional[str] = None
+    ):
+        self.entity: str = entity
+        self.filename: str = os.path.basename(filename or '') or 'file'
+        self.info: dict = dict(info) if isinstance(info, dict) else {}
+        self.file_id: str = uuid_from(uuid4().hex if not force_id else force_id)
+        self.max_size: Optional[int] = getattr(entities.registered.get(entity, None), 'max_size', None)
+        self.size: int = 0
+        self.hash = hashlib.sha256()
+        self._sink: Optional[BlobSink] = None
+
+    async def open(self) -> None:
+        if not test_required(self.entity):
+            raise exceptions.AccessDenied()
+        self.check_size(int(self.info.get('filesize', 0) or 0))
+        self._sink = await get_backend(self.entity).open_sink(
+            self.entity,
+            self.file_id,
+            self.filename,
+            self.info.get('content_type', None) or 'application/octet-stream'
+        )
+
+    @property
+    def blobfn(self) -> str:
+        return get_file_blobfn(self.entity, self.file_id, self.filename)
+
+    def check_size(self, size: int) -> None:
+        if self.max_size and size > self.max_size:
+            raise FileTooLarge(self.max_size)
+
+    async def write(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.size += len(chunk)
+        self.check_size(self.size)
+        self.hash.update(chunk)
+        await self._sink.write(chunk)
+
+    async def close(self) -> str:
+        """ Finishes the file writing, writing the file info struct next to the
+        file content. Returns the new ``file_id``. The writing is aborted if the
+        content fails to be committed. """
+
+        sink, self._sink = self._sink, None
+        try:
+            await sink.commit(self.hash.hexdigest())
+        except BaseException:
+            # Not leaving the partially stored content (the incomplete multipart
+            # upload, the temporary file) behind the failed commit
+            try:
+                await sink.abort()
+            except Exception as e:
+                logger.error(f"failed to abort storing of {self.entity}/{self.file_id}: {e!r}", 'storages')
+            raise
+        await write_file_info(self.entity, self.file_id, self.filename, self.size, self.hash.hexdigest(), self.info)
+        return self.file_id
+
+    async def abort(self) -> None:
+        """ Aborts the writing, removing the partially written file. """
+
+        if self._sink is not None:
+            sink, self._sink = self._sink, None
+            await sink.abort()
+
+
+async def store_stream(
+        entity: str,
+        chunks: AsyncIterable[bytes],
+        filename: str,
+        info: Optional[dict] = None,
+        force_id: Optional[str] = None
+) -> str:
+    """ Stores the file given as the async iterable of chunks to the storage entity,
+    returning the new ``file_id``. The arguments are the same as of
+    :py:func:`~wefram.ds.storages.upload_file_content`.
+    """
+
+    writer: StorageWriter = StorageWriter(entity, filename, info, force_id)
+    await writer.open()
+    try:
+        async for chunk in chunks:
+            await writer.write(chunk)
+    except BaseException:
+        await writer.abort()
+        raise
+    return await writer.close()
+
+
+async def store_file_object(
+        entity: str,
+        file: Any,
+        filename: str,
+        info: Optional[dict] = None,
+        force_id: Optional[str] = None
+) -> str:
+    """ The non-blocking version of :py:func:`~wefram.ds.storages.upload_file_content`,
+    reading the given (sync) file object in the worker thread. """
+
+    async def _chunks() -> AsyncIterator[bytes]:
+        while True:
+            chunk: bytes = await anyio.to_thread.run_sync(file.read, CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    return await store_stream(entity, _chunks(), filename, info, force_id)
+
+
+async def store_request_files(request: Request, entity: str, limit: Optional[int] = None) -> List[str]:
+    """ Parses the ``multipart/form-data`` request body as it comes from the
+    client, storing every uploaded file straight to the given storage entity.
+    The request body is never spooled to the memory or temporary files. Returns
+    the list of new ``file_id`` in the order of the uploaded files.
+
+    The request path must be registered in the
+    :py:data:`~wefram.requests.routing.streaming_routes_prefixes` to prevent the
+    request body from being parsed in advance.
+
+    :param request: the request
+    :param entity: the storage entity name
+    :param limit: the maximum number of files to store, the rest are ignored
+    """
+
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    if content_type != b'multipart/form-data' or b'boundary' not in params:
+        raise exceptions.ApiError(400, "multipart/form-data request expected")
+
+    entity_obj: Optional[entities.StorageEntity] = entities.registered.get(entity, None)
+    max_size: Optional[int] = getattr(entity_obj, 'max_size', None)
+    content_length: int = int(request.headers.get('content-length', 0) or 0)
+    if max_size and limit == 1 and content_length > max_size + 64 * 1024:
+        # Rejecting early, without reading the body at all
+        raise FileTooLarge(max_size)
+
+    # The parser's callbacks are synchronous, so they only collect events,
+    # which are then processed asynchronously after each chunk fed.
+    events: List[Tuple[str, Any]] = []
+    header: Dict[str, bytes] = {'field': b'', 'value': b''}
+    headers: Dict[bytes, bytes] = {}
+
+    def on_part_begin() -> None:
+        headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header['field'] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header['value'] += data[start:end]
+
+    def on_header_end() -> None:
+        headers[header['field'].lower()] = header['value']
+        header['field'] = b''
+        header['value'] = b''
+
+    def on_headers_finished() -> None:
+        events.append(('begin', dict(headers)))
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        events.append(('data', data[start:end]))
+
+    def on_part_end() -> None:
+        events.append(('end', None))
+
+    parser = MultipartParser(params[b'boundary'], {
+        'on_part_begin': on_part_begin,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished
+    })
+
+    files_ids: List[str] = []
+    writer: Optional[StorageWriter] = None
+    try:
+        async for body_chunk in request.stream():
+            parser.write(body_chunk)
+            for event, data in events:
+                if event == 'begin':
+                    disposition, options = parse_options_header(data.get(b'content-disposition', b''))
+                    filename: Optional[bytes] = options.get(b'filename', None)
+                    if filename is None or (limit is not None and len(files_ids) >= limit):
+                        writer = None
+                        continue
+                    writer = StorageWriter(entity, filename.decode('utf-8', 'replace'), {
+                        'content_type': data.get(b'content-type', b'application/octet-stream').decode('latin-1')
+                    })
+                    await writer.open()
+                elif event == 'data' and writer is not None:
+                    await writer.write(data)
+                elif event == 'end' and writer is not None:
+                    files_ids.append(await writer.close())
+                    writer = None
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        raise
+    return files_ids
@@ -199,8 +199,14 @@ export class EntityForm extends React.Component<EntityFormProps, EntityFormState
 
     this.setState({loading: true})
 
+    const params: Record<string, any> = {}
+    if (this.props.requestDeep)
+      params.deep = true
+    if (this.props.requestLoad && this.props.requestLoad.length)
+      params.load = this.props.requestLoad.join(',')
+
     api.get(api.pathWithParams(this.props.requestPath, {key: this.props.entityKey}), {
-      params: this.props.requestDeep ? {deep: true} : undefined
+      params: Object.keys(params).length ? params : undefined
     }).then(res => {
       this.props.onFetch
         ? this.setState({loading: false, success: true}, () => this.props.onFetch && this.props.onFetch(res.data))
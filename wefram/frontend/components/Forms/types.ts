@@ -28,6 +28,7 @@ export type EntityFormProps = {
   help?: React.ReactNode
   stateDataName?: string
   requestDeep?: boolean
+  requestLoad?: string[]
   requestPath?: RequestApiPath | string
   requiredForSubmit?: string[]
   skipUnsavedAttrsWarn?: string[]
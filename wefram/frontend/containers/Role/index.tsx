@@ -112,6 +112,7 @@ export default class Screen extends React.Component<ScreenProps, ScreenState> {
       <EntityForm
         entityKey={key}
         requestPath={objectPath}
+        requestLoad={['users']}
 
         data={this.state.data}
         help={<Help />}
@@ -23,16 +23,16 @@ export const localization: LocalizationAPI = {
     return translations[domain][s]
   },
 
-  async load(): Response<LocaleDicrionary> {
-    return await api.get(translationsPath)
+  async load(version?: string): Response<LocaleDicrionary> {
+    return await api.get(translationsPath, version ? {params: {v: version}} : undefined)
   },
 
   initializeFromStruct(s: LocaleDicrionary) {
     translations = s
   },
 
-  async initializeFromServer() {
-    await localization.load().then(res => {
+  async initializeFromServer(version?: string) {
+    await localization.load(version).then(res => {
       localization.initializeFromStruct(res.data)
     })
   },
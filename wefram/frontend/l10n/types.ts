@@ -27,9 +27,11 @@ export type LocalizationAPI = {
   _tryToTranslate(s: string, domain: string): string | null
 
   /**
-   * Loads the localization dictionary from the instantiate request's response data.
+   * Loads the localization dictionary from the backend. Given the version (the
+   * instantiate request's `localizationVersion`), the dictionary is requested by
+   * that version, so it is cached by the browser until the version changes.
    */
-  load(): Response<LocaleDicrionary>
+  load(version?: string): Response<LocaleDicrionary>
 
   /**
    * Initializes the localization dictionary from the {LocaleDictionary} struct.
@@ -39,8 +41,9 @@ export type LocalizationAPI = {
 
   /**
    * Initializes the localization dictionary from the backend using request.
+   * @param version - the dictionary version to request, if known.
    */
-  initializeFromServer(): Promise<any>
+  initializeFromServer(version?: string): Promise<any>
 
   /**
    * Used to localize the given text (using given optional context domain).
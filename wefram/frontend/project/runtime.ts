@@ -69,8 +69,7 @@ class ProjectRuntime {
         runtime.rememberUsername = res.data.aaaConfiguration.rememberUsername
       })
       aaa.initializeFromStruct(res.data.session)
-      localization.initializeFromStruct(res.data.localization)
-      return res.data
+      return localization.initializeFromServer(res.data.localizationVersion).then(() => res.data)
     })
   }
 
@@ -1,6 +1,6 @@
 import {SidebarConfiguration} from 'system/sidebar'
 import {ClientSession} from 'system/aaa'
-import {LocaleDicrionary, Locale} from 'system/l10n'
+import {Locale} from 'system/l10n'
 import {ScreensConfiguration} from 'system/screens'
 import {Response} from 'system/response'
 
@@ -29,7 +29,7 @@ export type ProjectConfiguration = {
   screens: ScreensConfiguration
   locale: Locale
   title: string
-  localization: LocaleDicrionary
+  localizationVersion: string
   urlConfiguration: ProjectUrlConfiguration
   aaaConfiguration: ProjectAaaConfiguration
 }
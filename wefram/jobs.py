@@ -0,0 +1,370 @@
+"""
+Provides the background jobs queue.
+
+The slow side effects (mail sending, files processing, external directories
+lookups, etc) may be moved out of the request handlers to the background jobs,
+executed by the separate worker processes (see ``manage worker``). The queue is
+built on Redis streams with consumer groups, providing at-least-once delivery:
+the job is acknowledged only after it has been done, and the job taken by the
+worker which has died is re-delivered to the other worker after the visibility
+timeout.
+
+The example of declaring and enqueueing the job:
+
+.. highlight:: python
+.. code-block:: python
+
+    from wefram import jobs
+
+    @jobs.task(retries=5)
+    async def send_report(user_id: str, period: str) -> None:
+        ...
+
+    async def some_controller(request):
+        await send_report.enqueue(user_id, 'month')
+        await send_report.enqueue(user_id, 'year', delay=3600)
+
+The job arguments must be JSON-serializable. Jobs are executed within their own
+context, using the CLI middlewares, so the database and Redis connections are
+available like in the request handler.
+"""
+
+from typing import *
+import asyncio
+import socket
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from .tools import CSTYLE, get_calling_app, json_encode, json_decode
+from . import config, ds, logger, runtime
+
+
+__all__ = [
+    'Job',
+    'registered',
+    'task',
+    'enqueue',
+    'metrics',
+    'run_worker'
+]
+
+
+GROUP: str = 'workers'
+
+# Moves the due delayed jobs to the queue stream atomically.
+# KEYS: the delayed jobs sorted set, the stream; ARGV: now, max count.
+_PROMOTE_LUA: str = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, payload in ipairs(due) do
+    redis.call('XADD', KEYS[2], '*', 'job', payload)
+    redis.call('ZREM', KEYS[1], payload)
+end
+return #due
+"""
+
+
+def _stream_key(queue: str) -> str:
+    return f"jobs:stream:{queue}"
+
+
+def _delayed_key(queue: str) -> str:
+    return f"jobs:delayed:{queue}"
+
+
+def _dead_key(queue: str) -> str:
+    return f"jobs:dead:{queue}"
+
+
+def _metrics_key(queue: str) -> str:
+    return f"jobs:metrics:{queue}"
+
+
+@dataclass
+class Job:
+    """ The registered job (the async function executed by workers). Calling
+    the job object calls the function itself, immediately; use :py:meth:`enqueue`
+    to execute it in background. """
+
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    queue: str = 'default'
+    retries: int = 3
+    backoff: float = 10
+    timeout: Optional[float] = None
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        return await self.func(*args, **kwargs)
+
+    async def enqueue(self, *args, delay: Optional[float] = None, **kwargs) -> str:
+        """ Enqueues the job with given arguments, returning the job id.
+
+        :param delay: the number of seconds after which the job will be executed
+        """
+
+        return await enqueue(self.name, *args, delay=delay, **kwargs)
+
+
+registered: Dict[str, Job] = {}
+
+
+def task(
+        name: Optional[str] = None,
+        queue: str = 'default',
+        retries: int = 3,
+        backoff: float = 10,
+        timeout: Optional[float] = None
+) -> Callable[[Callable], Job]:
+    """ The decorator registering the async function as the background job.
+
+    :param name: the job name, defaults to the function name; the name is prefixed
+        with the app name
+    :param queue: the name of the queue the job is enqueued to
+    :param retries: how many times the failed job will be retried before being
+        moved to the dead jobs stream; the retry is called with the same arguments
+        objects the failed run has been called with, so the job may narrow its
+        (list or dict) arguments in place to retry only the failed part of them
+    :param backoff: the delay (in seconds) before the first retry, doubled for
+        every next one
+    :param timeout: the max run time (in seconds) of the job
+    """
+
+    app: str = get_calling_app()
+
+    def decorator(func: Callable) -> Job:
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError(f"the background job must be an async function, {func} given instead")
+        job_name: str = '.'.join([app, name or func.__name__])
+        job: Job = Job(name=job_name, func=func, queue=queue, retries=retries, backoff=backoff, timeout=timeout)
+        registered[job_name] = job
+        logger.debug(f"registered background job {CSTYLE['green']}{job_name}{CSTYLE['clear']}")
+        return job
+
+    return decorator
+
+
+async def _push(cn: ds.redis.RedisConnection, queue: str, payload: dict, delay: Optional[float]) -> None:
+    encoded: str = json_encode(payload)
+    if delay:
+        await cn.zadd(_delayed_key(queue), {encoded: time.time() + delay})
+    else:
+        await cn.xadd(_stream_key(queue), {'job': encoded})
+
+
+async def enqueue(name: str, *args, delay: Optional[float] = None, **kwargs) -> str:
+    """ Enqueues the registered job by its name, returning the job id.
+
+    :param name: the job name (<app>.<name>)
+    :param delay: the number of seconds after which the job will be executed
+    """
+
+    if name not in registered:
+        raise KeyError(f"background job '{name}' is not registered")
+    job: Job = registered[name]
+    payload: dict = {
+        'id': uuid.uuid4().hex,
+        'job': name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'attempt': 0,
+        'enqueued': time.time() + (delay or 0)
+    }
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    await _push(cn, job.queue, payload, delay)
+    await cn.hincrby(_metrics_key(job.queue), 'enqueued', 1)
+    return payload['id']
+
+
+async def metrics(queues: Optional[List[str]] = None) -> Dict[str, dict]:
+    """ Returns the queues metrics: the number of waiting, delayed, in-progress
+    (delivered but not acknowledged) and dead jobs, processing counters, and
+    average latency (time from the planned start to the real one) and run time.
+    """
+
+    queues = queues or sorted({j.queue for j in registered.values()} or {'default'})
+    cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+    response: Dict[str, dict] = {}
+    for queue in queues:
+        pipe = cn.pipeline(transaction=False)
+        pipe.xlen(_stream_key(queue))
+        pipe.zcard(_delayed_key(queue))
+        pipe.xlen(_dead_key(queue))
+        pipe.hgetall(_metrics_key(queue))
+        length, delayed, dead, stored = await pipe.execute()
+        try:
+            pending: int = (await cn.xpending(_stream_key(queue), GROUP))['pending']
+        except Exception:
+            pending = 0
+        values: Dict[str, str] = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in stored.items()
+        }
+        processed: int = int(values.get('processed', 0))
+        started: int = processed + int(values.get('failed', 0))
+        response[queue] = {
+            'waiting': max(length - pending, 0),
+            'delayed': delayed,
+            'inProgress': pending,
+            'dead': dead,
+            'enqueued': int(values.get('enqueued', 0)),
+            'processed': processed,
+            'failed': int(values.get('failed', 0)),
+            'retried': int(values.get('retried', 0)),
+            'redelivered': int(values.get('redelivered', 0)),
+            'avgLatency': (float(values.get('latency', 0)) / started) if started else None,
+            'avgRuntime': (float(values.get('runtime', 0)) / started) if started else None
+        }
+    return response
+
+
+class _Worker:
+    def __init__(self, queues: List[str], concurrency: int):
+        self.queues: List[str] = queues
+        self.concurrency: int = concurrency
+        self.consumer: str = f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility: int = config.JOBS['visibility_timeout']
+        self.slots: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self.running: Set[asyncio.Task] = set()
+        self.cn: Optional[ds.redis.RedisConnection] = None
+
+    async def prepare(self) -> None:
+        self.cn = await ds.redis.create_connection()
+        for queue in self.queues:
+            try:
+                await self.cn.xgroup_create(_stream_key(queue), GROUP, id='0', mkstream=True)
+            except Exception as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    async def promote(self) -> None:
+        script = self.cn.register_script(_PROMOTE_LUA)
+        for queue in self.queues:
+            await script(keys=[_delayed_key(queue), _stream_key(queue)], args=[time.time(), 100])
+
+    async def reclaim(self, queue: str, count: int) -> list:
+        """ Takes over the jobs delivered to other (probably died) workers and
+        not acknowledged within the visibility timeout. """
+
+        result: list = await self.cn.execute_command(
+            'XAUTOCLAIM', _stream_key(queue), GROUP, self.consumer, self.visibility * 1000, '0-0', 'COUNT', count
+        )
+        messages: list = [m for m in (result[1] if result else []) if m and m[1]]
+        if messages:
+            await self.cn.hincrby(_metrics_key(queue), 'redelivered', len(messages))
+        return messages
+
+    async def fetch(self, count: int) -> List[Tuple[str, Any, Any]]:
+        batch: List[Tuple[str, Any, Any]] = []
+        for queue in self.queues:
+            for message_id, fields in await self.reclaim(queue, count - len(batch)):
+                batch.append((queue, message_id, fields))
+            if len(batch) >= count:
+                return batch
+        streams: Dict[str, str] = {_stream_key(q): '>' for q in self.queues}
+        response: list = await self.cn.xreadgroup(
+            GROUP, self.consumer, streams, count=count - len(batch), block=1000
+        ) or []
+        for stream, messages in response:
+            stream = stream.decode() if isinstance(stream, bytes) else stream
+            queue: str = stream[len('jobs:stream:'):]
+            for message_id, fields in messages:
+                batch.append((queue, message_id, fields))
+        return batch
+
+    async def process(self, queue: str, message_id: Any, fields: Any) -> None:
+        try:
+            try:
+                if isinstance(fields, list):
+                    fields = dict(zip(fields[0::2], fields[1::2]))
+                payload: dict = json_decode(fields.get(b'job', fields.get('job')))
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.error(f"malformed job message {message_id} in queue '{queue}': {e!r}", 'jobs')
+                await self.cn.xadd(_dead_key(queue), {'message': str(message_id), 'error': repr(e)})
+            else:
+                await self.execute(queue, payload)
+            pipe = self.cn.pipeline(transaction=True)
+            pipe.xack(_stream_key(queue), GROUP, message_id)
+            pipe.xdel(_stream_key(queue), message_id)
+            await pipe.execute()
+        except Exception as e:
+            # Not acknowledged job will be re-delivered after the visibility timeout
+            logger.error(f"failed to process job message {message_id} in queue '{queue}': {e!r}", 'jobs')
+        finally:
+            self.slots.release()
+
+    async def execute(self, queue: str, payload: dict) -> None:
+        job: Optional[Job] = registered.get(payload['job'], None)
+        started: float = time.time()
+        mk: str = _metrics_key(queue)
+        if job is None:
+            logger.error(f"unknown background job '{payload['job']}', moving to the dead jobs", 'jobs')
+            await self.cn.xadd(_dead_key(queue), {'job': json_encode(payload), 'error': 'unknown job'})
+            return
+
+        try:
+            if job.timeout:
+                await asyncio.wait_for(
+                    runtime.within_background(job.func, *payload['args'], **payload['kwargs']), job.timeout
+                )
+            else:
+                await runtime.within_background(job.func, *payload['args'], **payload['kwargs'])
+        except Exception as e:
+            duration: float = time.time() - started
+            pipe = self.cn.pipeline(transaction=False)
+            pipe.hincrby(mk, 'failed', 1)
+            pipe.hincrbyfloat(mk, 'latency', max(started - payload['enqueued'], 0))
+            pipe.hincrbyfloat(mk, 'runtime', duration)
+            await pipe.execute()
+            payload['attempt'] += 1
+            if payload['attempt'] > job.retries:
+                logger.error(f"background job {job.name} [{payload['id']}] failed, giving up: {e!r}", 'jobs')
+                await self.cn.xadd(_dead_key(queue), {'job': json_encode(payload), 'error': repr(e)})
+                return
+            delay: float = job.backoff * (2 ** (payload['attempt'] - 1))
+            logger.warning(f"background job {job.name} [{payload['id']}] failed, retry in {delay}s: {e!r}", 'jobs')
+            payload['enqueued'] = time.time() + delay
+            await _push(self.cn, queue, payload, delay)
+            await self.cn.hincrby(mk, 'retried', 1)
+            return
+
+        pipe = self.cn.pipeline(transaction=False)
+        pipe.hincrby(mk, 'processed', 1)
+        pipe.hincrbyfloat(mk, 'latency', max(started - payload['enqueued'], 0))
+        pipe.hincrbyfloat(mk, 'runtime', time.time() - started)
+        await pipe.execute()
+
+    async def run(self) -> None:
+        await self.prepare()
+        logger.info(
+            f"worker {self.consumer} started: queues={','.join(self.queues)}, concurrency={self.concurrency}",
+            'jobs'
+        )
+        try:
+            while True:
+                await self.slots.acquire()
+                free: int = 1
+                while free < self.concurrency and not self.slots.locked():
+                    await self.slots.acquire()
+                    free += 1
+                await self.promote()
+                batch: List[Tuple[str, Any, Any]] = await self.fetch(free)
+                for _ in range(free - len(batch)):
+                    self.slots.release()
+                for queue, message_id, fields in batch:
+                    job: asyncio.Task = asyncio.create_task(self.process(queue, message_id, fields))
+                    self.running.add(job)
+                    job.add_done_callback(self.running.discard)
+        finally:
+            if self.running:
+                # Not acknowledged jobs will be re-delivered to the other worker
+                await asyncio.wait(self.running, timeout=self.visibility)
+            await self.cn.close()
+
+
+async def run_worker(queues: Optional[List[str]] = None, concurrency: Optional[int] = None) -> None:
+    """ Runs the jobs worker in the current process, executing jobs from the given
+    queues (all queues of registered jobs by default) with the given number
+    of jobs executed at the same time. Runs until cancelled. """
+
+    queues = queues or sorted({j.queue for j in registered.values()} or {'default'})
+    await _Worker(queues, concurrency or config.JOBS['concurrency']).run()
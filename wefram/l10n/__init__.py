@@ -1,6 +1,6 @@
 from .locales import *
 from .funcs import *
-from .catalog import pack_dictionary, ui_locale_json
+from .catalog import pack_dictionary, translations_payload, ui_locale_json
 
 
 def start() -> None:
@@ -6,21 +6,27 @@ language's translations, distributed over domains (contexts).
 from typing import *
 import os.path
 import json
+import gzip
+import hashlib
 from json.decoder import JSONDecodeError
 from ..runtime import context
 from ..tools import CSTYLE, get_calling_app
 from .. import logger
 from .locales import Locale
 from .config import BUILT_DICTS_PATH
+from .compiled import CATALOG_EXTENSION, MappedCatalog, write_catalog
 from .resources import *
 
 
 __all__ = [
     'locate_dictionary_json',
+    'locate_compiled_catalog',
     'Dictionary',
     'translate',
     'translate_pluralizable',
     'pack_dictionary',
+    'TranslationsPayload',
+    'translations_payload',
     'ui_locale_json'
 ]
 
@@ -110,10 +116,68 @@ def locate_dictionary_json(locale: Locale) -> Optional[str]:
     return None
 
 
+def locate_compiled_catalog(locale: Locale) -> Optional[str]:
+    """ Returns the path to the compiled catalog made for the localization
+    dictionary JSON file (see :py:mod:`wefram.l10n.compiled`). If there is no
+    such one, or it is older than the JSON file - the ``None`` will be returned.
+    """
+
+    json_fn: Optional[str] = locate_dictionary_json(locale)
+    if not json_fn:
+        return None
+    fn: str = ''.join([os.path.splitext(json_fn)[0], CATALOG_EXTENSION])
+    try:
+        if os.stat(fn).st_mtime < os.stat(json_fn).st_mtime:
+            return None
+    except FileNotFoundError:
+        return None
+    return fn
+
+
+class TranslationsPayload:
+    """ The whole catalog of the locale serialized to JSON (and compressed) once,
+    to be sent to the frontend as is. The ``version`` is the content hash, so the
+    payload requested by its version may be cached by clients forever. """
+
+    __slots__ = ('content', 'gzipped', 'version', 'etag')
+
+    def __init__(self, content: bytes):
+        self.content: bytes = content
+        self.gzipped: bytes = gzip.compress(content, compresslevel=6, mtime=0)
+        self.version: str = hashlib.sha256(content).hexdigest()[:16]
+        self.etag: str = f'"{self.version}"'
+
+
+# The maximum number of memoized translations per dictionary; the memo is
+# dropped entirely when exceeded (translated terms are, mostly, the finite set
+# of texts from the code, so this is rarely happens).
+MEMO_SIZE: int = 16384
+
+
 class Dictionary:
+    """
+    The localization catalog of the single locale. For the fast translation, the
+    domains fallback chain (the requested domain, the application's common
+    domain ``<app>.*``, the global domain ``*``) is flattened into the single
+    lookup table per (domain, application) at load time (and lazily for other
+    requested combinations), and translations are memoized by the term.
+
+    If the compiled catalog is made for the locale (by the ``make`` process),
+    it is memory-mapped instead of loading the JSON dictionary, and terms are
+    looked up in it directly. The catalog is turned into regular domains on the
+    first change of the dictionary.
+    """
+
     def __init__(self, locale_: Locale, autoload: bool = True):
         self.locale: Locale = locale_
-        self._domains: Dict[str, _Domain] = (self.load() if autoload else dict()) or dict()
+        self._mapped: Optional[MappedCatalog] = self.load_compiled() if autoload else None
+        self._domains: Dict[str, _Domain] = (
+            self.load() if autoload and self._mapped is None else dict()
+        ) or dict()
+        self._flat: Dict[Tuple[str, str], Tuple[Dict[str, str], Dict[str, str]]] = {}
+        self._memo: Dict[Tuple[Optional[str], str, str], str] = {}
+        self._payload: Optional[TranslationsPayload] = None
+        self.compile()
 
     @classmethod
     def parse_dictionary(
@@ -172,10 +236,36 @@ class Dictionary:
             )
         return loaded
 
+    def load_compiled(self) -> Optional[MappedCatalog]:
+        catalog_path: Optional[str] = locate_compiled_catalog(self.locale)
+        if not catalog_path:
+            return None
+        try:
+            mapped: MappedCatalog = MappedCatalog(catalog_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"failed to map the compiled translations {catalog_path}: {e}")
+            return None
+        logger.debug(
+            f"mapped localization catalog for locale {CSTYLE['bold']}{str(self.locale)}{CSTYLE['clear']}"
+        )
+        return mapped
+
+    def materialize(self) -> None:
+        """ Turns the mapped compiled catalog (if any) into regular domains, so
+        they may be changed. """
+        if self._mapped is None:
+            return
+        mapped: MappedCatalog = self._mapped
+        self._mapped = None
+        self._domains = {name: _Domain(messages) for name, messages in mapped.as_dict().items()}
+        mapped.close()
+        self.invalidate()
+
     def merge(self, domains: Dict[str, _Domain]) -> None:
         for n, d in domains.items():
             domain = self.ensure_domain(n)
             domain.merge_with(d)
+        self.invalidate()
 
     def add(
             self,
@@ -189,12 +279,24 @@ class Dictionary:
         domain_name: str = '.'.join([app_name, domain])
         _domain = self.ensure_domain(domain_name)
         _domain.add(untranslated, translated)
+        self.invalidate()
 
     def as_dict(self) -> Dict[str, dict]:
+        if self._mapped is not None:
+            return self._mapped.as_dict()
         return {
             name: domain.as_dict for name, domain in self._domains.items()
         }
 
+    def payload(self) -> TranslationsPayload:
+        """ Returns the serialized catalog, built on the first call after the
+        catalog (re)load or change. """
+        if self._payload is None:
+            self._payload = TranslationsPayload(
+                json.dumps(self.as_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            )
+        return self._payload
+
     def save(self, filename: Optional[str] = None) -> None:
         contents: Dict[str, dict] = self.as_dict()
         filename: str = f"{filename or str(self.locale)}.json"
@@ -205,12 +307,15 @@ class Dictionary:
             os.unlink(filename)
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(contents, f, ensure_ascii=False)
+        write_catalog(''.join([os.path.splitext(filename)[0], CATALOG_EXTENSION]), contents)
 
     @property
     def domains(self) -> Dict[str, _Domain]:
+        self.materialize()
         return self._domains
 
     def get_domain(self, name: str) -> Optional[_Domain]:
+        self.materialize()
         return self._domains.get(name, None)
 
     def ensure_domain(self, name: str) -> _Domain:
@@ -218,8 +323,63 @@ class Dictionary:
         if _domain is not None:
             return _domain
         self._domains[name] = _Domain({})
+        self.invalidate()
         return self._domains[name]
 
+    def invalidate(self) -> None:
+        """ Drops the flattened lookup tables and memoized translations, must be
+        called when domains are changed. """
+        self._flat.clear()
+        self._memo.clear()
+        self._payload = None
+
+    def compile(self) -> None:
+        """ Flattens every loaded domain with its fallback chain into the lookup
+        table in advance. """
+        for name in self._domains:
+            if '.' not in name:
+                continue
+            app_name, domain = name.split('.', 1)
+            self.lookup_table(domain, app_name)
+
+    def lookup_table(self, domain: str, app_name: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """ Returns the flattened (exact, lower-cased) lookup tables for the given
+        domain requested by the given application. """
+        key: Tuple[str, str] = (domain, app_name)
+        flat: Optional[Tuple[Dict[str, str], Dict[str, str]]] = self._flat.get(key, None)
+        if flat is not None:
+            return flat
+
+        searching_domain: str = '.'.join([app_name, domain]) if '.' not in domain else domain
+        exact: Dict[str, str] = {}
+        lowered: Dict[str, str] = {}
+        # From the least specific to the most one, so the latter wins
+        for domain_name in ('*', f"{app_name}.*", searching_domain):
+            _domain: Optional[_Domain] = self.get_domain(domain_name)
+            if _domain is None:
+                continue
+            exact.update(_domain.messages)
+            lowered.update(_domain.messages_lc)
+        flat = self._flat[key] = (exact, lowered)
+        return flat
+
+    def lookup_mapped(self, term: str, domain: str, app_name: str) -> str:
+        """ Looks the term up in the mapped compiled catalog, through the same
+        fallback chain as :meth:`lookup_table` flattens. """
+        searching_domain: str = '.'.join([app_name, domain]) if '.' not in domain else domain
+        # From the most specific to the least one, so the former wins
+        chain: Tuple[str, str, str] = (searching_domain, f"{app_name}.*", '*')
+        for domain_name in chain:
+            result: Optional[str] = self._mapped.get(domain_name, str(term))
+            if result is not None:
+                return result
+        lowered: str = str(term).lower()
+        for domain_name in chain:
+            result = self._mapped.getlc(domain_name, lowered)
+            if result is not None:
+                return result
+        return term
+
     def translate(
             self,
             untranslated: [str, Tuple[str, str]],
@@ -227,47 +387,50 @@ class Dictionary:
             app_name: str,
             get_plural: bool = False
     ) -> str:
-        untranslated: List[str] = list(untranslated) \
+        term: str = (untranslated[-1] if get_plural else untranslated[0]) \
             if isinstance(untranslated, (list, tuple)) \
-            else [untranslated, ]
+            else untranslated
 
-        if not self._domains:
-            return untranslated[-1] if get_plural else untranslated[0]
+        if not self._domains and self._mapped is None:
+            return term
 
-        domain: str = domain or "*"
-        searching_domain: str = ('.'.join([app_name, domain]) if domain else app_name) \
-            if not domain or '.' not in domain \
-            else domain
-        searching_domains: List[str] = [searching_domain, f"{app_name}.*", '*']
-
-        term: str = untranslated[-1] if get_plural else untranslated[0]
-        for domain_name in searching_domains:
-            _domain: Optional[_Domain] = self.get_domain(domain_name)
-            if _domain is None:
-                continue
-            result: Optional[str] = _domain.get(term)
-            if result is not None:
-                return result
+        key: Tuple[Optional[str], str, str] = (domain, app_name, term)
+        result: Optional[str] = self._memo.get(key, None)
+        if result is not None:
+            return result
 
-        lcterm = str(term).lower()
-        for domain_name in searching_domains:
-            _domain: Optional[_Domain] = self.get_domain(domain_name)
-            if _domain is None:
-                continue
-            result: Optional[str] = _domain.getlc(lcterm)
-            if result is not None:
-                return result
+        if self._mapped is not None:
+            result = self.lookup_mapped(term, domain or "*", app_name)
+        else:
+            exact, lowered = self.lookup_table(domain or "*", app_name)
+            result = exact.get(term, None)
+            if result is None:
+                # The case-insensitive match is tried only if there is no exact one
+                # in the whole fallback chain
+                result = lowered.get(str(term).lower(), term)
 
-        return term
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[key] = result
+        return result
 
 
 _catalogs: Dict[str, Optional[Dictionary]] = {}
 
+# The same catalogs by the locale objects, sparing the locale code formatting
+# on every translation (locales are parsed once and reused, see the
+# `LocalizationMiddleware`).
+_catalogs_by_locale: Dict[Locale, Dictionary] = {}
+
 
 def _get_dictionary(locale: Locale) -> Dictionary:
+    dictionary: Optional[Dictionary] = _catalogs_by_locale.get(locale, None)
+    if dictionary is not None:
+        return dictionary
     locale_code: str = str(locale)
     if locale_code not in _catalogs:
         _catalogs[locale_code]: Optional[Dictionary] = Dictionary(locale)
+    _catalogs_by_locale[locale] = _catalogs[locale_code]
     return _catalogs[locale_code]
 
 
@@ -285,6 +448,14 @@ def pack_dictionary(
     return dictionary.as_dict()
 
 
+def translations_payload(
+        locale: Optional[Locale] = None
+) -> TranslationsPayload:
+    """ Returns the serialized catalog of the given (or the current) locale. """
+    dictionary: Dictionary = _get_current_dictionary() if locale is None else _get_dictionary(locale)
+    return dictionary.payload()
+
+
 def ui_locale_json() -> dict:
     locale: Locale = context['locale']
     date_format: str = str(locale.datetime_skeletons['yMd']) \
@@ -0,0 +1,206 @@
+"""
+Provides the compiled (binary) localization catalogs. The catalog is made by
+the ``make`` process next to the built JSON dictionary and is memory-mapped
+read-only by every worker, so its pages are shared between all workers via the
+OS page cache instead of being parsed into per-process dicts. Opening the
+catalog reads only its header and the domains directory.
+
+The catalog layout (all integers are little-endian ``uint32``, offsets are
+absolute):
+
+* the header: the magic ``WFLC``, the format version (``uint16``), the reserved
+  ``uint16`` and the number of domains;
+* the domains directory: for every domain, its name (offset, length), the exact
+  terms hash index (offset, number of slots) and the lower-cased terms hash
+  index (offset, number of slots);
+* hash indexes: open addressing tables (with the linear probing) with the
+  power of two number of slots; each slot is the CRC32 of the term, the term
+  (offset, length) and the translation (offset, length); the empty slot has the
+  term offset ``0xFFFFFFFF``;
+* the strings table: sorted unique UTF-8 strings (domains names, terms and
+  translations), referenced by slots.
+"""
+
+from typing import *
+import os
+import mmap
+import struct
+import zlib
+
+
+__all__ = [
+    'CATALOG_EXTENSION',
+    'write_catalog',
+    'MappedCatalog'
+]
+
+
+CATALOG_EXTENSION: str = '.cat'
+
+MAGIC: bytes = b'WFLC'
+VERSION: int = 1
+EMPTY: int = 0xFFFFFFFF
+
+HEADER: struct.Struct = struct.Struct('<4sHHI')
+DOMAIN: struct.Struct = struct.Struct('<IIIIII')
+SLOT: struct.Struct = struct.Struct('<IIIII')
+
+
+def _slots_for(count: int) -> int:
+    # The load factor is kept at most 0.5, so the probing is short
+    slots: int = 1
+    while slots < count * 2:
+        slots <<= 1
+    return slots
+
+
+def _build_index(
+        messages: Dict[str, str],
+        slots: int,
+        offsets: Dict[str, Tuple[int, int]]
+) -> bytes:
+    table: List[Tuple[int, int, int, int, int]] = [(0, EMPTY, 0, 0, 0)] * slots
+    mask: int = slots - 1
+    for term, translated in messages.items():
+        term_offset, term_length = offsets[term]
+        hashsum: int = zlib.crc32(term.encode('utf-8'))
+        i: int = hashsum & mask
+        while table[i][1] != EMPTY:
+            i = (i + 1) & mask
+        table[i] = (hashsum, term_offset, term_length) + offsets[translated]
+    return b''.join([SLOT.pack(*slot) for slot in table])
+
+
+def write_catalog(filename: str, domains: Dict[str, Dict[str, str]]) -> None:
+    """ Writes the compiled catalog of the given domains (by the domain name,
+    untranslated texts with corresponding translated ones) to the file. """
+
+    tables: List[Tuple[str, Dict[str, str], Dict[str, str]]] = []
+    strings: Set[str] = set()
+    for name, messages in domains.items():
+        lowered: Dict[str, str] = {u.lower(): t for u, t in messages.items()}
+        tables.append((name, messages, lowered))
+        strings.add(name)
+        strings.update(messages.keys())
+        strings.update(messages.values())
+        strings.update(lowered.keys())
+
+    sizes: List[Tuple[int, int]] = [
+        (_slots_for(len(messages)), _slots_for(len(lowered))) for _, messages, lowered in tables
+    ]
+    indexes_offset: int = HEADER.size + DOMAIN.size * len(tables)
+    strings_offset: int = indexes_offset + SLOT.size * sum([a + b for a, b in sizes])
+
+    strings_table: bytearray = bytearray()
+    offsets: Dict[str, Tuple[int, int]] = {}
+    for string in sorted(strings):
+        encoded: bytes = string.encode('utf-8')
+        offsets[string] = (strings_offset + len(strings_table), len(encoded))
+        strings_table.extend(encoded)
+
+    directory: List[bytes] = []
+    indexes: List[bytes] = []
+    offset: int = indexes_offset
+    for (name, messages, lowered), (exact_slots, lower_slots) in zip(tables, sizes):
+        directory.append(DOMAIN.pack(
+            *offsets[name],
+            offset, exact_slots,
+            offset + SLOT.size * exact_slots, lower_slots
+        ))
+        indexes.append(_build_index(messages, exact_slots, offsets))
+        indexes.append(_build_index(lowered, lower_slots, offsets))
+        offset += SLOT.size * (exact_slots + lower_slots)
+
+    tmpfn: str = f"{filename}.tmp"
+    with open(tmpfn, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(tables)))
+        f.write(b''.join(directory))
+        f.write(b''.join(indexes))
+        f.write(strings_table)
+    os.replace(tmpfn, filename)
+
+
+class MappedCatalog:
+    """
+    The compiled catalog mapped to the memory read-only. Terms are looked up
+    directly in the mapped hash indexes, without loading them into dicts.
+    """
+
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            self._mm: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, count = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"not a compiled localization catalog: {filename}")
+            self._domains: Dict[str, Tuple[int, int, int, int]] = {}
+            for i in range(count):
+                name_offset, name_length, *index = DOMAIN.unpack_from(self._mm, HEADER.size + DOMAIN.size * i)
+                self._domains[self._string(name_offset, name_length)] = tuple(index)
+        except (ValueError, struct.error, UnicodeDecodeError):
+            self._mm.close()
+            raise ValueError(f"corrupted compiled localization catalog: {filename}")
+
+    def _string(self, offset: int, length: int) -> str:
+        return self._mm[offset:offset + length].decode('utf-8')
+
+    def _lookup(self, offset: int, slots: int, term: str) -> Optional[str]:
+        encoded: bytes = term.encode('utf-8')
+        hashsum: int = zlib.crc32(encoded)
+        mask: int = slots - 1
+        i: int = hashsum & mask
+        while True:
+            slot_hash, term_offset, term_length, value_offset, value_length = \
+                SLOT.unpack_from(self._mm, offset + SLOT.size * i)
+            if term_offset == EMPTY:
+                return None
+            if slot_hash == hashsum \
+                    and term_length == len(encoded) \
+                    and self._mm[term_offset:term_offset + term_length] == encoded:
+                return self._string(value_offset, value_length)
+            i = (i + 1) & mask
+
+    @property
+    def domains(self) -> List[str]:
+        """ Returns names of domains in the catalog. """
+        return list(self._domains.keys())
+
+    def has_domain(self, name: str) -> bool:
+        return name in self._domains
+
+    def get(self, domain: str, untranslated: str) -> Optional[str]:
+        """ Returns the translated text for the given untranslated one in the
+        given domain, or ``None`` if there is no such translation. """
+        index: Optional[Tuple[int, int, int, int]] = self._domains.get(domain, None)
+        if index is None:
+            return None
+        return self._lookup(index[0], index[1], untranslated)
+
+    def getlc(self, domain: str, untranslated: str) -> Optional[str]:
+        """ The same as :meth:`get`, but for the lower-cased untranslated text,
+        used to find the translation without the case sensitivity. """
+        index: Optional[Tuple[int, int, int, int]] = self._domains.get(domain, None)
+        if index is None:
+            return None
+        return self._lookup(index[2], index[3], untranslated)
+
+    def messages(self, domain: str) -> Dict[str, str]:
+        """ Returns all translations of the given domain as ``dict``. """
+        index: Optional[Tuple[int, int, int, int]] = self._domains.get(domain, None)
+        if index is None:
+            return {}
+        messages: Dict[str, str] = {}
+        offset, slots = index[0], index[1]
+        for i in range(slots):
+            _, term_offset, term_length, value_offset, value_length = \
+                SLOT.unpack_from(self._mm, offset + SLOT.size * i)
+            if term_offset == EMPTY:
+                continue
+            messages[self._string(term_offset, term_length)] = self._string(value_offset, value_length)
+        return messages
+
+    def as_dict(self) -> Dict[str, Dict[str, str]]:
+        return {name: self.messages(name) for name in self._domains}
+
+    def close(self) -> None:
+        self._mm.close()
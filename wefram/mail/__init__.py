@@ -0,0 +1,2 @@
+from .routines import *
+from . import delivery
@@ -0,0 +1,199 @@
+"""
+Provides the SMTP delivery of the mail: the per-account pools of connected and
+authenticated SMTP connections, reused for many messages, with the bounded number
+of simultaneous connections to the single SMTP host and retrying the transient
+failures with the backoff.
+"""
+
+from typing import *
+import asyncio
+import time
+from dataclasses import dataclass
+from email.message import Message
+import aiosmtplib
+from .. import config, logger
+
+
+__all__ = [
+    'SmtpParams',
+    'SmtpPool',
+    'get_pool',
+    'deliver',
+    'close_all'
+]
+
+
+@dataclass(frozen=True)
+class SmtpParams:
+    """ The SMTP server connection parameters. """
+
+    host: str
+    port: int = 0
+    use_tls: bool = True
+    username: str = ''
+    password: str = ''
+
+    @property
+    def implicit_tls(self) -> bool:
+        """ The 465 port is the SMTP over TLS; others use STARTTLS if the TLS is on. """
+        return self.use_tls and self.port == 465
+
+    @property
+    def effective_port(self) -> int:
+        return self.port or (587 if self.use_tls else 25)
+
+
+class _PooledConnection:
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp: aiosmtplib.SMTP = smtp
+        self.released: float = time.monotonic()
+
+
+class SmtpPool:
+    """ The pool of connected and authenticated SMTP connections to the single
+    server with the single set of credentials. """
+
+    def __init__(self, params: SmtpParams, size: int, idle_timeout: float):
+        self.params: SmtpParams = params
+        self.size: int = size
+        self.idle_timeout: float = idle_timeout
+        self.idle: List[_PooledConnection] = []
+        self.slots: asyncio.Semaphore = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        params: SmtpParams = self.params
+        smtp: aiosmtplib.SMTP = aiosmtplib.SMTP(
+            hostname=params.host,
+            port=params.effective_port,
+            use_tls=params.implicit_tls,
+            start_tls=False,
+            timeout=config.MAIL['timeout']
+        )
+        await smtp.connect()
+        if params.use_tls and not params.implicit_tls:
+            await smtp.starttls()
+        if params.username:
+            await smtp.login(params.username, params.password)
+        logger.debug(f"connected to SMTP {params.host}:{params.effective_port}", 'mail')
+        return smtp
+
+    async def _take(self) -> aiosmtplib.SMTP:
+        while self.idle:
+            conn: _PooledConnection = self.idle.pop()
+            if not conn.smtp.is_connected:
+                continue
+            if time.monotonic() - conn.released > self.idle_timeout:
+                await _quit(conn.smtp)
+                continue
+            return conn.smtp
+        return await self._connect()
+
+    async def send(self, messages: Sequence[Message]) -> List[Optional[Exception]]:
+        """ Sends the given messages using the single pooled connection, returning
+        the list of errors (``None`` for the succeeded messages) in the order of
+        messages. The connection failure fails all not yet sent messages. """
+
+        results: List[Optional[Exception]] = [None] * len(messages)
+        async with self.slots, _host_slots(self.params.host):
+            try:
+                smtp: aiosmtplib.SMTP = await self._take()
+            except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                return [e] * len(messages)
+
+            broken: bool = False
+            for i, message in enumerate(messages):
+                if broken:
+                    results[i] = aiosmtplib.SMTPServerDisconnected("connection lost")
+                    continue
+                try:
+                    await smtp.send_message(message)
+                except aiosmtplib.SMTPResponseException as e:
+                    results[i] = e
+                    # The server may close the connection after some errors (421, etc)
+                    broken = e.code == 421 or not smtp.is_connected
+                except aiosmtplib.SMTPRecipientsRefused as e:
+                    # The transaction is reset, the connection is still usable
+                    results[i] = e
+                    broken = not smtp.is_connected
+                except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                    results[i] = e
+                    broken = True
+
+            if broken or not smtp.is_connected:
+                await _quit(smtp)
+            else:
+                self.idle.append(_PooledConnection(smtp))
+        return results
+
+    async def close(self) -> None:
+        while self.idle:
+            await _quit(self.idle.pop().smtp)
+
+
+async def _quit(smtp: aiosmtplib.SMTP) -> None:
+    try:
+        if smtp.is_connected:
+            await smtp.quit()
+    except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError):
+        smtp.close()
+
+
+_pools: Dict[SmtpParams, SmtpPool] = {}
+_hosts: Dict[str, asyncio.Semaphore] = {}
+
+
+def _host_slots(host: str) -> asyncio.Semaphore:
+    if host not in _hosts:
+        _hosts[host] = asyncio.Semaphore(config.MAIL['host_concurrency'])
+    return _hosts[host]
+
+
+def get_pool(params: SmtpParams) -> SmtpPool:
+    """ Returns the connections pool for the given SMTP parameters. """
+
+    if params not in _pools:
+        _pools[params] = SmtpPool(params, config.MAIL['pool_size'], config.MAIL['idle_timeout'])
+    return _pools[params]
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all([_is_transient(e) for e in error.recipients])
+    return True  # connection-level errors
+
+
+async def deliver(params: SmtpParams, messages: Sequence[Message]) -> List[Optional[Exception]]:
+    """ Delivers the given messages using the pooled connection, retrying the
+    transient failures (connection errors and 4xx responses) with the exponential
+    backoff. Returns the list of final errors, ``None`` for delivered messages.
+    """
+
+    pool: SmtpPool = get_pool(params)
+    results: List[Optional[Exception]] = [None] * len(messages)
+    pending: List[int] = list(range(len(messages)))
+    retries: int = config.MAIL['retries']
+    for attempt in range(retries + 1):
+        errors: List[Optional[Exception]] = await pool.send([messages[i] for i in pending])
+        retry: List[int] = []
+        for i, error in zip(pending, errors):
+            results[i] = error
+            if error is not None and _is_transient(error):
+                retry.append(i)
+        if not retry or attempt == retries:
+            break
+        delay: float = config.MAIL['backoff'] * (2 ** attempt)
+        logger.warning(
+            f"{len(retry)} message(s) to {params.host} failed temporarily, retrying in {delay}s", 'mail'
+        )
+        await asyncio.sleep(delay)
+        pending = retry
+    return results
+
+
+async def close_all() -> None:
+    """ Closes all pooled connections. """
+
+    for pool in _pools.values():
+        await pool.close()
@@ -1,11 +1,29 @@
+"""
+Provides the mail sending routines. The mail is sent using the SMTP settings
+of the :py:class:`~wefram.models.mail.MailAccount` account, by the background
+jobs workers (see :py:mod:`wefram.jobs`) with pooled SMTP connections.
+"""
+
+from typing import *
 import asyncio
-import aiosmtplib
 import sys
-
+from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+import aiosmtplib
+from .. import config, jobs
+from ..models import MailAccount
+from .delivery import SmtpParams, deliver
+
+
+__all__ = [
+    'make_message',
+    'send',
+    'send_many',
+    'send_now',
+    'send_mail_async'
+]
 
-MAIL_PARAMS = {'TLS': True, 'host': 'xxxxxxxx', 'password': 'xxxxxxxx', 'user': 'xxxxxxxx', 'port': 587}
 
 if sys.platform == 'win32':
     loop = asyncio.get_event_loop()
@@ -14,8 +32,124 @@ if sys.platform == 'win32':
         asyncio.set_event_loop(loop)
 
 
+def make_message(
+        sender: str,
+        to: List[str],
+        subject: str,
+        text: str,
+        text_type: str = 'plain',
+        cc: Optional[List[str]] = None,
+        bcc: Optional[List[str]] = None
+) -> MIMEMultipart:
+    """ Makes the MIME message ready to be sent. """
+
+    msg = MIMEMultipart()
+    msg.preamble = subject
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = ', '.join(to)
+    if cc:
+        msg['Cc'] = ', '.join(cc)
+    if bcc:
+        msg['Bcc'] = ', '.join(bcc)
+    msg.attach(MIMEText(text, text_type, 'utf-8'))
+    return msg
+
+
+async def _get_account(account: Optional[str]) -> MailAccount:
+    found: Optional[MailAccount] = (await MailAccount.get(account)) if account else await MailAccount.first()
+    if found is None:
+        raise KeyError(f"mail account {account or '(default)'} has not been found")
+    return found
+
+
+def _params_of(account: MailAccount) -> SmtpParams:
+    return SmtpParams(
+        host=account.snd_host,
+        port=int(account.snd_port or 0),
+        use_tls=bool(account.use_tls),
+        username=account.username or '',
+        password=account.password or ''
+    )
+
+
+async def send_now(messages: Sequence[Message], account: Optional[str] = None) -> List[Optional[Exception]]:
+    """ Sends the given messages immediately, from the current process, using the
+    pooled SMTP connection of the given mail account (the first account by default).
+    Returns the list of errors, ``None`` for the delivered messages.
+
+    :param messages: the list of messages (see :py:func:`make_message`)
+    :param account: the :py:class:`~wefram.models.mail.MailAccount` ``id``
+    """
+
+    return await deliver(_params_of(await _get_account(account)), messages)
+
+
+@jobs.task(name='deliverMail', queue='mail', retries=3, backoff=60)
+async def _deliver_job(messages: List[dict], account: Optional[str] = None) -> None:
+    errors: List[Optional[Exception]] = await send_now([make_message(**m) for m in messages], account)
+    failed: List[Exception] = [e for e in errors if e is not None]
+    if not failed:
+        return
+
+    # Only not delivered messages are left to the job retry, so delivered ones
+    # are not sent twice
+    count: int = len(messages)
+    messages[:] = [m for m, e in zip(messages, errors) if e is not None]
+    raise aiosmtplib.SMTPException(f"failed to deliver {len(failed)} of {count} message(s): {failed[0]!r}")
+
+
+async def send(
+        sender: str,
+        to: List[str],
+        subject: str,
+        text: str,
+        text_type: str = 'plain',
+        cc: Optional[List[str]] = None,
+        bcc: Optional[List[str]] = None,
+        account: Optional[str] = None
+) -> str:
+    """ Enqueues the message to be sent by the background worker, returning the
+    corresponding job id.
+
+    :param sender: From whom the email is being sent
+    :param to: A list of recipient email addresses
+    :param subject: The subject of the email
+    :param text: The text of the email
+    :param text_type: Mime subtype of text, defaults to 'plain' (can be 'html')
+    :param cc: A list of Cc email addresses
+    :param bcc: A list of Bcc email addresses
+    :param account: the :py:class:`~wefram.models.mail.MailAccount` ``id`` about
+        to be used (the first account by default)
+    """
+
+    return await _deliver_job.enqueue([{
+        'sender': sender,
+        'to': list(to),
+        'subject': subject,
+        'text': text,
+        'text_type': text_type,
+        'cc': list(cc or []),
+        'bcc': list(bcc or [])
+    }], account)
+
+
+async def send_many(messages: Sequence[dict], account: Optional[str] = None) -> List[str]:
+    """ Enqueues many messages at once. Messages are grouped into batches, every of
+    them is delivered using the single SMTP connection. Every message is the dict
+    with the :py:func:`send` arguments (except ``account``). Returns the list of
+    enqueued jobs ids. """
+
+    batch: int = config.MAIL['batch_size']
+    return [
+        await _deliver_job.enqueue(list(messages[i:i + batch]), account)
+        for i in range(0, len(messages), batch)
+    ]
+
+
 async def send_mail_async(sender, to, subject, text, textType='plain', **params):
-    """Send an outgoing email with the given parameters.
+    """Send an outgoing email with the given parameters immediately, using the
+    pooled SMTP connection.
 
     :param sender: From whom the email is being sent
     :type sender: str
@@ -38,51 +172,23 @@ async def send_mail_async(sender, to, subject, text, textType='plain', **params)
     Optional Parameters:
     :cc: A list of Cc email addresses.
     :bcc: A list of Bcc email addresses.
+    :account: The MailAccount ``id`` to send with (the first account by default).
+    :mail_params: The explicit SMTP parameters dict (host, port, TLS, user, password)
+        used instead of the mail account.
     """
 
-    # Default Parameters
-    cc = params.get("cc", [])
-    bcc = params.get("bcc", [])
-    mail_params = params.get("mail_params", MAIL_PARAMS)
-
-    # Prepare Message
-    msg = MIMEMultipart()
-    msg.preamble = subject
-    msg['Subject'] = subject
-    msg['From'] = sender
-    msg['To'] = ', '.join(to)
-    if len(cc): msg['Cc'] = ', '.join(cc)
-    if len(bcc): msg['Bcc'] = ', '.join(bcc)
-
-    msg.attach(MIMEText(text, textType, 'utf-8'))
-
-    # Contact SMTP server and send Message
-    host = mail_params.get('host', 'localhost')
-    isSSL = mail_params.get('SSL', False);
-    isTLS = mail_params.get('TLS', False);
-    port = mail_params.get('port', 465 if isSSL else 25)
-    smtp = aiosmtplib.SMTP(hostname=host, port=port, use_tls=isSSL)
-    await smtp.connect()
-    if isTLS:
-        await smtp.starttls()
-    if 'user' in mail_params:
-        await smtp.login(mail_params['user'], mail_params['password'])
-    await smtp.send_message(msg)
-    await smtp.quit()
-
-
-if __name__ == "__main__":
-    email = "xxxxxxxx";
-    co1 = send_mail_async(email,
-              [email],
-              "Test 1",
-              'Test 1 Message',
-              textType="plain")
-    co2 = send_mail_async(email,
-              [email],
-              "Test 2",
-              'Test 2 Message',
-              textType="plain")
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(asyncio.gather(co1, co2))
-    loop.close()
+    msg = make_message(sender, to, subject, text, textType, params.get('cc'), params.get('bcc'))
+    mail_params: Optional[dict] = params.get('mail_params', None)
+    if mail_params:
+        smtp_params = SmtpParams(
+            host=mail_params.get('host', 'localhost'),
+            port=int(mail_params.get('port', 465 if mail_params.get('SSL', False) else 25)),
+            use_tls=bool(mail_params.get('TLS', False) or mail_params.get('SSL', False)),
+            username=mail_params.get('user', ''),
+            password=mail_params.get('password', '')
+        )
+        errors = await deliver(smtp_params, [msg])
+    else:
+        errors = await send_now([msg], params.get('account', None))
+    if errors[0] is not None:
+        raise errors[0]
@@ -1,5 +1,5 @@
 from typing import *
-from .. import aaa
+from .. import aaa, runtime
 
 
 def print_help() -> None:
@@ -20,4 +20,15 @@ async def run(params: List[str]) -> None:
         [(await aaa.drop_user_sessions_by_login(login)) for login in params]
         return
 
+    if command == 'reindex-sessions':
+        await runtime.within_cli(_reindex_sessions)
+        return
+
     print(f"Unsupported command for [aaa]: {command}")
+
+
+async def _reindex_sessions() -> None:
+    from ..models import Session
+
+    count: int = await Session.reindex()
+    print(f"Indexed {count} session(s)")
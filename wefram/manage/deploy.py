@@ -254,6 +254,37 @@ def make_dockerfile() -> None:
         f.write(dockerfile)
 
 
+def make_nginx_conf() -> None:
+    """ Generates the sample nginx site configuration ``nginx.conf`` in the root
+    path of the deployment: serving static files directly, proxying the rest to
+    the application and providing the internal locations used by the
+    ``X-Accel-Redirect`` offload of stored files (see ``storage.offload``).
+    """
+
+    print("Generating sample nginx.conf")
+    bindaddr, bindport = str(config.DEPLOY['bind']).split(':', 1) \
+        if ':' in str(config.DEPLOY['bind']) \
+        else (
+            str(config.DEPLOY['bind']),
+            '8000'
+        )
+    volume: dict = config.DEPLOY['volume']
+    volume_root: str = volume.get('root', defaults.DEPLOY_VOLUME['root'])
+    if not volume_root.startswith('/'):
+        volume_root = os.path.join(DEPLOYMENT_ROOT, volume_root)
+    with open(os.path.join(config.CORE_ROOT, 'manage', 'dist', 'deploy', 'nginx', 'nginx.conf'), 'r') as f:
+        nginx_conf: str = jinja2.Template(f.read()).render(
+            upstream=f"{'127.0.0.1' if bindaddr in ('0.0.0.0', '') else bindaddr}:{bindport}",
+            statics_url=defaults.URL_STATICS,
+            statics_root=STATICS_DST,
+            files_root=os.path.join(volume_root, volume.get('files', defaults.DEPLOY_VOLUME['files'])),
+            files_prefix=config.STORAGE['offload_files_prefix'].rstrip('/'),
+            assets_prefix=config.STORAGE['offload_assets_prefix'].rstrip('/')
+        )
+    with open(os.path.join(DEPLOYMENT_ROOT, 'nginx.conf'), 'w') as f:
+        f.write(nginx_conf)
+
+
 async def run(*_) -> None:
     logger.set_level(logger.WARNING)
     config.PRODUCTION = True
@@ -312,5 +343,8 @@ async def run(*_) -> None:
     print("")
     make_dockerfile()
 
+    print("")
+    make_nginx_conf()
+
     print("")
     print("done")
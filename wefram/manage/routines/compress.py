@@ -0,0 +1,87 @@
+"""
+Provides the build-time compression of static files: every compressible file
+gets the ``.gz`` (and ``.br``, if the ``brotli`` package is installed) sibling
+with its content compressed at the maximum level, served as is by
+:py:class:`~wefram.requests.PrecompressedStaticFiles` (and by the front proxy
+with ``gzip_static``/``brotli_static`` enabled).
+"""
+
+from typing import *
+import os
+import gzip
+
+
+__all__ = [
+    'COMPRESSIBLE_EXTENSIONS',
+    'precompress_file',
+    'precompress_tree'
+]
+
+
+COMPRESSIBLE_EXTENSIONS: Tuple[str, ...] = (
+    '.js', '.mjs', '.css', '.html', '.htm', '.json', '.map', '.svg', '.txt', '.xml',
+    '.ico', '.ttf', '.otf', '.eot', '.wasm'
+)
+MIN_SIZE: int = 1024
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _write_sibling(filename: str, content: bytes, source_size: int) -> bool:
+    """ Writes the compressed sibling if it is really smaller than the source,
+    removing the stale one otherwise. """
+
+    if len(content) >= source_size:
+        if os.path.isfile(filename):
+            os.remove(filename)
+        return False
+    tmpfn: str = f"{filename}.tmp"
+    with open(tmpfn, 'wb') as f:
+        f.write(content)
+    os.replace(tmpfn, filename)
+    return True
+
+
+def precompress_file(filename: str) -> int:
+    """ Makes compressed siblings of the given file, unless they are up to date
+    already. Returns the number of written siblings. """
+
+    stat_result: os.stat_result = os.stat(filename)
+    if stat_result.st_size < MIN_SIZE:
+        return 0
+
+    targets: List[Tuple[str, Callable[[bytes], bytes]]] = [
+        (f"{filename}.gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))
+    ]
+    if brotli is not None:
+        targets.append((f"{filename}.br", lambda data: brotli.compress(data, quality=11)))
+
+    content: Optional[bytes] = None
+    written: int = 0
+    for target, compress in targets:
+        try:
+            if os.stat(target).st_mtime >= stat_result.st_mtime:
+                continue
+        except FileNotFoundError:
+            pass
+        if content is None:
+            with open(filename, 'rb') as f:
+                content = f.read()
+        written += int(_write_sibling(target, compress(content), stat_result.st_size))
+    return written
+
+
+def precompress_tree(root: str) -> int:
+    """ Makes compressed siblings of every compressible file under the given
+    directory. Returns the number of written siblings. """
+
+    written: int = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            written += precompress_file(os.path.join(dirpath, filename))
+    return written
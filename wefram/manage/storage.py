@@ -0,0 +1,119 @@
+"""
+Provides the stored files maintenance commands.
+
+Usage:
+``manage storage report`` -- shows the storage usage and the space reclaimed by
+the deduplication;
+``manage storage dedup [--verbose]`` -- converts the existing storage tree to the
+content-addressed, deduplicating layout (see :py:mod:`wefram.ds.storages.blobs`);
+``manage storage gc [--dry-run] [--grace HOURS] [--verbose]`` -- removes stored
+files not referenced anymore (see :py:mod:`wefram.ds.storages.collector`).
+"""
+
+from typing import *
+from .. import config
+
+
+def print_help() -> None:
+    print(
+        "\nUsage: manage storage <command>\n"
+        "\n"
+        "  report              shows the storage usage and the space reclaimed by the deduplication\n"
+        "  dedup [--verbose]   converts existing stored files to the deduplicating layout\n"
+        "  gc [--dry-run] [--grace HOURS] [--verbose]\n"
+        "                      removes stored files not referenced anymore; with --dry-run only\n"
+        f"                      reports them; the grace period is {config.STORAGE['gc_grace_hours']} hours by default\n"
+    )
+
+
+def _size(value: int) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def report() -> None:
+    from ..ds.storages import storage_report
+
+    stats: Dict[str, Dict[str, int]] = storage_report()
+    total: Dict[str, int] = stats.pop('total')
+    print(f"{'entity':<40} {'files':>8} {'logical':>12} {'physical':>12}")
+    for entity, counters in stats.items():
+        print(
+            f"{entity:<40} {counters['files']:>8} "
+            f"{_size(counters['logical']):>12} {_size(counters['physical']):>12}"
+        )
+    print(f"{'(total)':<40} {total['files']:>8} {_size(total['logical']):>12} {_size(total['physical']):>12}")
+    print(f"\nReclaimed by the deduplication: {_size(total['logical'] - total['physical'])}")
+
+
+async def gc(dry_run: bool, grace_hours: Optional[float], verbose: bool) -> None:
+    from ..ds.storages import collect_garbage, CollectReport
+
+    result: CollectReport = await collect_garbage(dry_run, grace_hours, verbose)
+    print(f"{'entity':<40} {'referenced':>10} {'stored':>8} {'orphaned':>8} {'size':>12}")
+    for entity, collected in result.entities.items():
+        print(
+            f"{entity:<40} {collected.referenced:>10} {collected.stored:>8} "
+            f"{len(collected.orphaned):>8} {_size(collected.size):>12}"
+        )
+    if result.blobs:
+        print(f"{'(unreferenced blobs)':<40} {'':>10} {'':>8} {result.blobs:>8} {_size(result.blobs_size):>12}")
+    print(
+        f"\n{'Would remove' if dry_run else 'Removed'} {result.orphaned} file(s)"
+        f" and {result.blobs} blob(s), {_size(result.size)} total"
+    )
+
+
+async def run(args: List[str]) -> None:
+    from ..ds.storages import dedup_existing
+
+    if not args:
+        print_help()
+        return
+
+    command: str = args.pop(0)
+
+    if command == 'report':
+        report()
+        return
+
+    if command == 'dedup':
+        if not config.STORAGE['dedup']:
+            print(
+                "Note: the deduplication is not enabled (`storage.dedup` configuration option),"
+                " so new uploads will not be deduplicated."
+            )
+        stats: Dict[str, int] = dedup_existing('--verbose' in args)
+        print(
+            f"Processed {stats['files']} file(s), {stats['linked']} linked to already stored content,"
+            f" {_size(stats['reclaimed'])} reclaimed"
+        )
+        return
+
+    if command == 'gc':
+        from .. import runtime
+        from .routines.project import ensure_apps_loaded
+
+        dry_run: bool = False
+        verbose: bool = False
+        grace_hours: Optional[float] = None
+        while args:
+            arg: str = args.pop(0)
+            if arg == '--dry-run':
+                dry_run = True
+            elif arg == '--verbose':
+                verbose = True
+            elif arg == '--grace' and args:
+                grace_hours = float(args.pop(0))
+            else:
+                print_help()
+                return
+
+        ensure_apps_loaded()
+        await runtime.within_cli(gc, dry_run, grace_hours, verbose)
+        return
+
+    print(f"Unsupported command for [storage]: {command}")
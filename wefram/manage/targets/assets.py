@@ -1,11 +1,14 @@
 from typing import *
-import uuid
 import os.path
+import json
 import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 import csscompressor
 import jsmin
 from ... import config, logger, defaults
 from ...tools import CSTYLE, module_path
+from ..routines.compress import precompress_tree
 
 
 __all__ = [
@@ -16,25 +19,72 @@ __all__ = [
 STATICS_ASSETS_ROOT: str = os.path.join(config.STATICS_ROOT, 'assets')
 STATICS_FONTS_ROOT: str = os.path.join(config.STATICS_ROOT, 'fonts')
 
+# The minified sources are cached between builds, keyed by the content hash,
+# so only changed sources are minified again. The manifest maps every source
+# file to its hash by the mtime and the size, so unchanged sources are not even
+# read. Sources which are not built anymore (and their cached minified
+# contents) are dropped after every build.
+ASSETS_BUILD_ROOT: str = os.path.join(config.BUILD_ROOT, 'assets')
+ASSETS_CACHE_ROOT: str = os.path.join(ASSETS_BUILD_ROOT, 'cache')
+ASSETS_MANIFEST_FN: str = os.path.join(ASSETS_BUILD_ROOT, 'manifest.json')
+ASSETS_MANIFEST_VERSION: int = 1
+
+# The built bundles names, read by `wefram.ui.views`
+BUNDLES_MANIFEST_FN: str = os.path.join(config.STATICS_ROOT, 'assets.json')
+
+# Sources minified by the current build
+_built_sources: Set[str] = set()
 
-def run(roots: List[str]) -> None:
-    assets_uuid: str = uuid.uuid4().hex
 
+def run(roots: List[str]) -> None:
+    _built_sources.clear()
     build_assets_root()
     make_dist(roots)
     make_fonts(roots)
-    make_styles(roots, assets_uuid)
-    make_scripts(roots, assets_uuid)
+    bundles: Dict[str, str] = {}
+    styles: Optional[str] = make_styles(roots)
+    if styles:
+        bundles['css'] = styles
+    scripts: Optional[str] = make_scripts(roots)
+    if scripts:
+        bundles['js'] = scripts
     # make_dists(roots)
 
+    remove_stale_bundles(bundles)
+    prune_minified_cache()
+    with open(BUNDLES_MANIFEST_FN, 'w') as f:
+        json.dump(bundles, f)
+    # The single build id is kept for the backward compatibility
     with open(os.path.join(config.STATICS_ROOT, 'assets.uuid'), 'w') as f:
-        f.write(assets_uuid)
+        f.write(hashlib.sha256(''.join(sorted(bundles.values())).encode()).hexdigest()[:32])
+
+    if config.STATICS['precompress']:
+        make_compressed([STATICS_ASSETS_ROOT, STATICS_FONTS_ROOT])
+
+
+def _is_bundle(filename: str) -> bool:
+    return os.path.isfile(os.path.join(STATICS_ASSETS_ROOT, filename))
 
 
 def build_assets_root() -> None:
-    """ Removes old files from the assets directory and create the new one. """
-    shutil.rmtree(STATICS_ASSETS_ROOT, ignore_errors=True)
+    """ Removes old files from the assets directory and create the new one. Built
+    bundles are kept, so unchanged ones are not rewritten (and recompressed). """
     os.makedirs(STATICS_ASSETS_ROOT, exist_ok=True)
+    for name in os.listdir(STATICS_ASSETS_ROOT):
+        if _is_bundle(name):
+            continue
+        shutil.rmtree(os.path.join(STATICS_ASSETS_ROOT, name), ignore_errors=True)
+
+
+def remove_stale_bundles(bundles: Dict[str, str]) -> None:
+    """ Removes bundles of previous builds (and their compressed siblings). """
+    current: Set[str] = set(bundles.values())
+    for name in os.listdir(STATICS_ASSETS_ROOT):
+        if not _is_bundle(name):
+            continue
+        base: str = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if base not in current:
+            os.remove(os.path.join(STATICS_ASSETS_ROOT, name))
 
 
 def path_from_root(root: str) -> Optional[str]:
@@ -44,8 +94,132 @@ def path_from_root(root: str) -> Optional[str]:
         return None
 
 
-def make_scripts(roots: List[str], assets_uuid: str) -> None:
-    contents: List[str] = []
+def _minify(kind: str, content: str) -> str:
+    """ Minifies the single source, executed in the worker process. """
+    if kind == 'js':
+        return jsmin.jsmin(content)
+    return csscompressor.compress(content)
+
+
+def _prepare_css(content: str, root: str) -> str:
+    return content \
+        .strip() \
+        .replace('{{ PUBLIC_ASSETS }}', f'{defaults.URL_STATICS}/assets') \
+        .replace('{{ PUBLIC_FONTS }}', f'{defaults.URL_STATICS}/fonts') \
+        .replace('{{ APP_ASSETS }}', f'{defaults.URL_STATICS}/assets/{root}')
+
+
+def _load_manifest() -> Dict[str, dict]:
+    try:
+        with open(ASSETS_MANIFEST_FN, 'r') as f:
+            manifest: dict = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version', None) != ASSETS_MANIFEST_VERSION:
+        return {}
+    return manifest.get('sources', None) or {}
+
+
+def _save_manifest(sources: Dict[str, dict]) -> None:
+    os.makedirs(ASSETS_BUILD_ROOT, exist_ok=True)
+    with open(ASSETS_MANIFEST_FN, 'w') as f:
+        json.dump({'version': ASSETS_MANIFEST_VERSION, 'sources': sources}, f)
+
+
+def prune_minified_cache() -> None:
+    """ Drops the manifest entries of sources which have not been built this
+    time (removed or moved ones), and the cached minified contents no longer
+    referenced by the manifest. """
+
+    manifest: Dict[str, dict] = _load_manifest()
+    sources: Dict[str, dict] = {fn: entry for fn, entry in manifest.items() if fn in _built_sources}
+    if len(sources) != len(manifest):
+        _save_manifest(sources)
+
+    if not os.path.isdir(ASSETS_CACHE_ROOT):
+        return
+    referenced: Set[str] = {entry.get('sha256', None) for entry in sources.values()}
+    for name in os.listdir(ASSETS_CACHE_ROOT):
+        if name.endswith('.tmp') or name.split('.', 1)[0] not in referenced:
+            os.remove(os.path.join(ASSETS_CACHE_ROOT, name))
+
+
+def minify_sources(kind: str, sources: List[Tuple[str, str]]) -> List[str]:
+    """ Returns minified contents of the given (filename, root) sources, in the
+    same order. Unchanged sources are taken from the cache, changed ones are
+    minified in parallel, by the pool of worker processes. """
+
+    os.makedirs(ASSETS_CACHE_ROOT, exist_ok=True)
+    manifest: Dict[str, dict] = _load_manifest()
+    results: List[Optional[str]] = [None] * len(sources)
+    pending: Dict[str, Tuple[str, List[int]]] = {}
+
+    for i, (filename, root) in enumerate(sources):
+        _built_sources.add(filename)
+        stat_result: os.stat_result = os.stat(filename)
+        known: Optional[dict] = manifest.get(filename, None)
+        sha256: Optional[str] = None
+        if known and known.get('mtime') == stat_result.st_mtime and known.get('size') == stat_result.st_size:
+            sha256 = known['sha256']
+        content: Optional[str] = None
+        if sha256 is None or not os.path.isfile(os.path.join(ASSETS_CACHE_ROOT, f"{sha256}.{kind}")):
+            with open(filename, 'r') as f:
+                content = f.read()
+            if kind == 'css':
+                content = _prepare_css(content, root)
+            sha256 = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            manifest[filename] = {'mtime': stat_result.st_mtime, 'size': stat_result.st_size, 'sha256': sha256}
+        cachefn: str = os.path.join(ASSETS_CACHE_ROOT, f"{sha256}.{kind}")
+        if os.path.isfile(cachefn):
+            with open(cachefn, 'r') as f:
+                results[i] = f.read()
+            continue
+        pending.setdefault(sha256, (content, []))[1].append(i)
+
+    if pending:
+        logger.info(
+            f"building assets statics [{CSTYLE['bold']}{kind.upper()}{CSTYLE['clear']}]"
+            f" -> minifying {len(pending)} changed source(s)"
+        )
+        shas: List[str] = list(pending.keys())
+        contents: List[str] = [pending[sha256][0] for sha256 in shas]
+        minified: List[str]
+        if len(shas) > 1:
+            with ProcessPoolExecutor() as pool:
+                minified = list(pool.map(_minify, [kind] * len(shas), contents))
+        else:
+            minified = [_minify(kind, contents[0])]
+        for sha256, content in zip(shas, minified):
+            cachefn: str = os.path.join(ASSETS_CACHE_ROOT, f"{sha256}.{kind}")
+            with open(f"{cachefn}.tmp", 'w') as f:
+                f.write(content)
+            os.replace(f"{cachefn}.tmp", cachefn)
+            for i in pending[sha256][1]:
+                results[i] = content
+
+    _save_manifest(manifest)
+    return results
+
+
+def write_bundle(kind: str, content: str) -> str:
+    """ Writes the bundle under the content-hash name, unless it exists already
+    (so the unchanged bundle keeps its mtime). Returns the bundle filename. """
+
+    encoded: bytes = content.encode('utf-8')
+    fn: str = f"{hashlib.sha256(encoded).hexdigest()[:32]}.{kind}"
+    fqfn: str = os.path.join(STATICS_ASSETS_ROOT, fn)
+    if os.path.isfile(fqfn):
+        logger.info(f"building assets statics [{CSTYLE['bold']}{kind.upper()}{CSTYLE['clear']}] -> {CSTYLE['red']}{fn}{CSTYLE['clear']} is up to date")
+        return fn
+    logger.info(f"building assets statics [{CSTYLE['bold']}{kind.upper()}{CSTYLE['clear']}] -> writting {CSTYLE['red']}{fn}{CSTYLE['clear']}")
+    with open(f"{fqfn}.tmp", 'wb') as f:
+        f.write(encoded)
+    os.replace(f"{fqfn}.tmp", fqfn)
+    return fn
+
+
+def make_scripts(roots: List[str]) -> Optional[str]:
+    sources: List[Tuple[str, str]] = []
     embed: List[str] = []
     logger.info(f"building assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}]")
 
@@ -58,15 +232,12 @@ def make_scripts(roots: List[str], assets_uuid: str) -> None:
         if not os.path.isdir(srcpath):
             continue
         logger.info(f"building assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}] => {root}")
-        sources: List[str] = sorted([f for f in os.listdir(srcpath) if f.endswith('.js')])
-        for source in sources:
+        for source in sorted([f for f in os.listdir(srcpath) if f.endswith('.js')]):
             logger.info(f"building assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}] => {root}/js/{source}")
-            with open(os.path.join(srcpath, source), 'r') as f:
-                contents.append(f.read())
+            sources.append((os.path.join(srcpath, source), root))
         embedpath: str = os.path.join(srcpath, 'embed')
         if os.path.isdir(embedpath):
-            sources: List[str] = sorted([f for f in os.listdir(embedpath) if f.endswith('.js')])
-            for source in sources:
+            for source in sorted([f for f in os.listdir(embedpath) if f.endswith('.js')]):
                 logger.info(f"embedding assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}] => {root}/js/embed/{source}")
                 with open(os.path.join(embedpath, source), 'r') as f:
                     embed.append(f.read())
@@ -80,31 +251,25 @@ def make_scripts(roots: List[str], assets_uuid: str) -> None:
         if not os.path.isdir(srcpath):
             continue
         logger.info(f"building assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}] => {root}")
-        sources: List[str] = sorted([f for f in os.listdir(srcpath) if f.endswith('.js')])
-        for source in sources:
+        for source in sorted([f for f in os.listdir(srcpath) if f.endswith('.js')]):
             logger.info(f"building assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}] => {root}/js/finally/{source}")
-            with open(os.path.join(srcpath, source), 'r') as f:
-                contents.append(f.read())
+            sources.append((os.path.join(srcpath, source), root))
 
     # Now making the final asset
-    if not contents and not embed:
-        return
+    if not sources and not embed:
+        return None
+
+    # Sources are minified one by one, so they are separated by the newline to
+    # keep the automatic semicolon insertion working between them.
+    contents: str = '\n'.join(minify_sources('js', sources))
+    bundle: str = '"use strict";\n\n'
+    if embed:
+        bundle += '\n\n'.join(embed) + '\n\n'
+    return write_bundle('js', bundle + contents)
 
-    contents: str = jsmin.jsmin('\n\n'.join(contents))
-    embed: str = '\n\n'.join(embed)
-    fn: str = f"{assets_uuid}.js"
-    logger.info(f"building assets statics [{CSTYLE['bold']}JS{CSTYLE['clear']}] -> writting {CSTYLE['red']}{fn}{CSTYLE['clear']}")
-    with open(os.path.join(STATICS_ASSETS_ROOT, fn), 'w') as f:
-        f.write('"use strict";\n\n')
-        if embed:
-            f.write(embed)
-            f.write('\n\n')
-        if contents:
-            f.write(contents)
-
-
-def make_styles(roots: List[str], assets_uuid: str) -> None:
-    contents: List[str] = []
+
+def make_styles(roots: List[str]) -> Optional[str]:
+    sources: List[Tuple[str, str]] = []
     embed: List[str] = []
     logger.info(f"building assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}]")
 
@@ -117,20 +282,12 @@ def make_styles(roots: List[str], assets_uuid: str) -> None:
         if not os.path.isdir(srcpath):
             continue
         logger.info(f"building assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}] => {root}")
-        sources: List[str] = sorted([f for f in os.listdir(srcpath) if f.endswith('.css')])
-        for source in sources:
+        for source in sorted([f for f in os.listdir(srcpath) if f.endswith('.css')]):
             logger.info(f"building assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}] => {root}/css/{source}")
-            with open(os.path.join(srcpath, source), 'r') as f:
-                content: str = f.read() \
-                    .strip() \
-                    .replace('{{ PUBLIC_ASSETS }}', f'{defaults.URL_STATICS}/assets') \
-                    .replace('{{ PUBLIC_FONTS }}', f'{defaults.URL_STATICS}/fonts') \
-                    .replace('{{ APP_ASSETS }}', f'{defaults.URL_STATICS}/assets/{root}')
-                contents.append(content)
+            sources.append((os.path.join(srcpath, source), root))
         embedpath: str = os.path.join(srcpath, 'embed')
         if os.path.isdir(embedpath):
-            sources: List[str] = sorted([f for f in os.listdir(embedpath) if f.endswith('.css')])
-            for source in sources:
+            for source in sorted([f for f in os.listdir(embedpath) if f.endswith('.css')]):
                 logger.info(f"embedding assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}] => {root}/css/embed/{source}")
                 with open(os.path.join(embedpath, source), 'r') as f:
                     embed.append(f.read())
@@ -144,31 +301,19 @@ def make_styles(roots: List[str], assets_uuid: str) -> None:
         if not os.path.isdir(srcpath):
             continue
         logger.info(f"building assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}] => {root}")
-        sources: List[str] = sorted([f for f in os.listdir(srcpath) if f.endswith('.css')])
-        for source in sources:
+        for source in sorted([f for f in os.listdir(srcpath) if f.endswith('.css')]):
             logger.info(f"building assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}] => {root}/css/finally/{source}")
-            with open(os.path.join(srcpath, source), 'r') as f:
-                content: str = f.read() \
-                    .strip() \
-                    .replace('{{ PUBLIC_ASSETS }}', f'{defaults.URL_STATICS}/assets') \
-                    .replace('{{ PUBLIC_FONTS }}', f'{defaults.URL_STATICS}/fonts') \
-                    .replace('{{ APP_ASSETS }}', f'{defaults.URL_STATICS}/assets/{root}')
-                contents.append(content)
+            sources.append((os.path.join(srcpath, source), root))
 
     # Now making the final asset
-    if not contents and not embed:
-        return
+    if not sources and not embed:
+        return None
 
-    contents: str = csscompressor.compress('\n\n'.join(contents))
-    embed: str = '\n\n'.join(embed)
-    fn: str = f"{assets_uuid}.css"
-    logger.info(f"building assets statics [{CSTYLE['bold']}CSS{CSTYLE['clear']}] -> writting {CSTYLE['red']}{fn}{CSTYLE['clear']}")
-    with open(os.path.join(STATICS_ASSETS_ROOT, fn), 'w') as f:
-        if embed:
-            f.write(embed)
-            f.write('\n\n')
-        if contents:
-            f.write(contents)
+    contents: str = ''.join(minify_sources('css', sources))
+    bundle: str = ''
+    if embed:
+        bundle += '\n\n'.join(embed) + '\n\n'
+    return write_bundle('css', bundle + contents)
 
 
 def make_dist(roots: List[str]) -> None:
@@ -185,6 +330,13 @@ def make_dist(roots: List[str]) -> None:
         shutil.copytree(fqpath, apath)
 
 
+def make_compressed(paths: List[str]) -> None:
+    """ Makes precompressed (gzip and brotli) siblings of built static files. """
+    logger.info(f"building assets statics [{CSTYLE['bold']}COMPRESS{CSTYLE['clear']}]")
+    written: int = sum(precompress_tree(path) for path in paths if os.path.isdir(path))
+    logger.info(f"building assets statics [{CSTYLE['bold']}COMPRESS{CSTYLE['clear']}] -> {written} file(s) written")
+
+
 def make_fonts(roots: List[str]) -> None:
     shutil.rmtree(STATICS_FONTS_ROOT, ignore_errors=True)
     os.makedirs(STATICS_FONTS_ROOT)
@@ -1,5 +1,6 @@
 import subprocess
 from ... import config
+from ..routines.compress import precompress_tree
 
 
 def run(*_) -> None:
@@ -16,3 +17,6 @@ def run(*_) -> None:
     if result.returncode != 0:
         raise RuntimeError
 
+    if config.STATICS['precompress']:
+        precompress_tree(config.STATICS_ROOT)
+
@@ -0,0 +1,37 @@
+"""
+Runs the background jobs worker (see :py:mod:`wefram.jobs`).
+
+Usage: ``manage worker [--concurrency N] [--queues queue1,queue2]``
+"""
+
+from typing import *
+from .. import config
+
+
+def print_help() -> None:
+    print(
+        "\nUsage: manage worker [--concurrency N] [--queues queue1,queue2]\n"
+        "\n"
+        f"  --concurrency N   the number of jobs executed at the same time (default {config.JOBS['concurrency']})\n"
+        "  --queues          comma-separated queues to process (default: all queues of registered jobs)\n"
+    )
+
+
+async def run(args: List[str]) -> None:
+    from .. import jobs
+    from .routines.project import ensure_apps_loaded
+
+    concurrency: Optional[int] = None
+    queues: Optional[List[str]] = None
+    while args:
+        arg: str = args.pop(0)
+        if arg == '--concurrency' and args:
+            concurrency = int(args.pop(0))
+        elif arg == '--queues' and args:
+            queues = [q for q in args.pop(0).split(',') if q]
+        else:
+            print_help()
+            return
+
+    ensure_apps_loaded()
+    await jobs.run_worker(queues, concurrency)
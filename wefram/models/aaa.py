@@ -141,11 +141,19 @@ class User(ds.Model):
     roles = ds.relationship(
         ds.TheModel('Role'),
         secondary='systemUsersRoles',
-        back_populates='users',
-        lazy='selectin'
+        back_populates='users'
     )
     """ The many-to-many relationship to roles which this user is
-    assigned with. """
+    assigned with. Is not loaded by default, so request it explicitly
+    when needed (using ``load=['roles']`` on fetching or
+    :py:meth:`~wefram.ds.Model.load_related` on the instance).
+
+    .. note::
+        Accessing the not loaded collection in async code makes SQLAlchemy
+        to lazy load it outside of the greenlet, which fails with the
+        ``MissingGreenlet`` error. Newly created (not yet flushed) users
+        have the empty collection and may be appended to without loading.
+    """
 
     class Meta:
         caption_key = 'caption'
@@ -226,23 +234,17 @@ class User(ds.Model):
         Example of the result:
         ['app1.permission1', 'app1.permission2', 'app2.some_permission']
 
+        The roles' permissions are taken from the per-worker cache (see
+        :py:func:`~wefram.aaa.permissions_for_user`); the user who does not
+        exist has no permissions at all.
+
         :param user_id: the ID of the user for which return permissions for
         :return: list of permissions
         """
 
-        user: Optional[User] = await cls.get(user_id)
-        if user is None:
-            raise KeyError(f"User[id={user_id}] has not been found")
-        roles: List[Role] = user.roles
-
-        permissions: Set[str] = set()
-        for role in roles:
-            role_perms = role.permissions
-            if not role_perms:
-                continue
-            permissions = permissions.union(set(role_perms))
+        from ..aaa import permissions_for_user
 
-        return list(permissions)
+        return await permissions_for_user(user_id)
 
     @classmethod
     async def update_locked_state(cls, state: bool, ids: List[str]) -> None:
@@ -292,9 +294,15 @@ class Role(ds.Model):
     users = ds.relationship(
         ds.TheModel('User'),
         secondary='systemUsersRoles',
-        back_populates='roles',
-        lazy='selectin'
+        back_populates='roles'
     )
+    """ The many-to-many relationship to users (members) of this role.
+    Is not loaded by default because may be very large; request it
+    explicitly when needed (using ``load=['users']`` on fetching,
+    :py:meth:`~wefram.ds.Model.load_related` on the instance, or the
+    ``load=users`` argument of the Role API read request). Accessing the
+    not loaded collection in async code fails with the ``MissingGreenlet``
+    error, see :py:attr:`User.roles`. """
 
     class Meta:
         caption_key = 'name'
@@ -313,6 +321,48 @@ class SessionLog(ds.Model):
         order = '-ts'
 
 
+# Fetches the session hash and (optionally) touches it with the single
+# round trip. KEYS: the session key, the user's sessions index key, the
+# roles version key; ARGV: the touch timestamp (or empty string to not
+# touch), the TTL. The current roles version is appended to the hash
+# fields as the '_rcur' pseudo-field. Sessions stored with the previous
+# (JSON string) layout are returned as {'legacy', <json>} pair.
+_FETCH_AND_TOUCH_LUA: str = """
+local t = redis.call('TYPE', KEYS[1])['ok']
+if t == 'hash' then
+    if ARGV[1] ~= '' then
+        redis.call('HSET', KEYS[1], 'touch', ARGV[1])
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+        redis.call('EXPIRE', KEYS[2], ARGV[2])
+    end
+    local fields = redis.call('HGETALL', KEYS[1])
+    table.insert(fields, '_rcur')
+    table.insert(fields, redis.call('GET', KEYS[3]) or '0')
+    return fields
+elseif t == 'string' then
+    return {'legacy', redis.call('GET', KEYS[1])}
+end
+return false
+"""
+
+
+# Updates fields of the existing session hash only, so the session expired in
+# the meantime is not recreated as the partial hash. KEYS: the session key, the
+# user's sessions index key; ARGV: the TTL to set (or empty string to keep the
+# current one), then field-value pairs.
+_UPDATE_EXISTING_LUA: str = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+if ARGV[1] ~= '' then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
 @dataclass
 class Session:
     """ The session class used in-memory as representation of the current
@@ -323,6 +373,21 @@ class Session:
     permissions: List[str]
     start_timestamp: datetime.datetime
     touch_timestamp: datetime.datetime
+    permissions_mask: Optional[int] = None
+    roles_version: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.permissions_mask is None:
+            self.permissions_mask = self.mask_for(self.permissions)
+
+    @staticmethod
+    def mask_for(permissions: List[str]) -> int:
+        """ Returns the permissions bitset for the given list of permission scopes,
+        including the 'authenticated' pseudo-scope. """
+
+        from ..aaa import permissions as aaa_permissions
+
+        return aaa_permissions.mask_of(['authenticated'] + list(permissions))
 
     @classmethod
     async def create(cls, user: User) -> 'Session':
@@ -335,14 +400,15 @@ class Session:
         :return: the :class:~wefram.models.aaa.Session: session object
         """
 
-        from ..aaa import random_token
+        from ..aaa import random_token, roles_version
 
         session = cls(
             token=random_token(),
             user=user.dict(set_name='session'),
             permissions=await user.all_permissions(),
             start_timestamp=datetime.datetime.now(),
-            touch_timestamp=datetime.datetime.now()
+            touch_timestamp=datetime.datetime.now(),
+            roles_version=await roles_version()
         )
         await session.save()
         return session
@@ -363,53 +429,194 @@ class Session:
         }
         return json_encode(response)
 
-    async def save(self) -> None:
-        """ Saves the current session object to the in-memory storage (Redis) giving
-        all working processes ability to act with it. """
+    def as_redis_hash(self) -> Dict[str, str]:
+        """ Returns the session as a mapping of fields to store in the Redis
+        hash. The token is not stored because it is a part of the key. """
+
+        from ..aaa import permissions as aaa_permissions
+
+        return {
+            'user': json_encode(self.user),
+            'permissions': json_encode(self.permissions),
+            'pmask': format(self.permissions_mask or 0, 'x'),
+            'pver': aaa_permissions.version() or '',
+            'rver': self.roles_version or '',
+            'start': self.start_timestamp.isoformat(timespec='seconds'),
+            'touch': self.touch_timestamp.isoformat(timespec='seconds')
+        }
+
+    @classmethod
+    def from_redis_hash(cls, token: str, fields: Dict[Union[str, bytes], Union[str, bytes]]) -> 'Session':
+        """ Makes the session object from the Redis hash fields previously
+        made by :py:meth:`~as_redis_hash` method. """
+
+        from ..aaa import permissions as aaa_permissions
+
+        values: Dict[str, str] = {
+            (k.decode('utf-8') if isinstance(k, bytes) else k): (v.decode('utf-8') if isinstance(v, bytes) else v)
+            for k, v in fields.items()
+        }
+
+        # The stored bitset is valid only if it was made using the same permission
+        # scope -> bit mapping as the current process uses.
+        version: Optional[str] = aaa_permissions.version()
+        mask: Optional[int] = int(values['pmask'], 16) \
+            if version and values.get('pver', None) == version and values.get('pmask', None) \
+            else None
+
+        return cls(
+            token=token,
+            user=json_decode(values['user']),
+            permissions=json_decode(values['permissions']),
+            start_timestamp=datetime.datetime.fromisoformat(values['start']),
+            touch_timestamp=datetime.datetime.fromisoformat(values['touch']),
+            permissions_mask=mask,
+            roles_version=values.get('rver', None) or None
+        )
+
+    @classmethod
+    def from_json(cls, jsoned: Union[str, bytes]) -> 'Session':
+        """ Makes the session object from the JSON representation previously
+        made by :py:meth:`~jsonify` method (the legacy, string-based layout of
+        the stored session). """
+
+        values: Dict[str, Any] = json_decode(jsoned)
+        values['start_timestamp'] = datetime.datetime.fromisoformat(values['start_timestamp'])
+        values['touch_timestamp'] = datetime.datetime.fromisoformat(values['touch_timestamp'])
+        values.pop('permissions_mask', None)
+        values.pop('roles_version', None)
+        return cls(**values)
+
+    @staticmethod
+    async def lifetime() -> int:
+        """ Returns the session lifetime (max idle time) in seconds. """
 
         from .. import settings
 
+        return (await settings.get('aaa'))[SETTINGS_SESSION_LIFETIME] * 60
+
+    async def save(self) -> None:
+        """ Saves the entire session object to the in-memory storage (Redis) giving
+        all working processes ability to act with it. The session is stored as the
+        Redis hash and is registered in the per-user sessions index at the same
+        (atomic) time. """
+
+        lifetime: int = await self.lifetime()
+        rk: str = self.redis_key_for(self.user['id'], self.token)
+        ik: str = self.redis_index_key_for(self.user['id'])
+        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+        pipe = cn.pipeline(transaction=True)
+        pipe.delete(rk)
+        pipe.hset(rk, mapping=self.as_redis_hash())
+        pipe.expire(rk, lifetime)
+        pipe.sadd(ik, self.token)
+        pipe.expire(ik, lifetime)
+        await pipe.execute()
+
+    async def _update_existing(self, fields: Dict[str, str], lifetime: Optional[int] = None) -> bool:
+        """ Writes given fields to the stored session (and sets its TTL, if given)
+        within the single round trip, unless the session has expired already.
+        Returns ``False`` in the last case. """
+
         rk: str = self.redis_key_for(self.user['id'], self.token)
+        ik: str = self.redis_index_key_for(self.user['id'])
         cn: ds.redis.RedisConnection = await ds.redis.get_connection()
-        await cn.set(rk, self.jsonify())
-        await cn.expire(rk, ((await settings.get('aaa'))[SETTINGS_SESSION_LIFETIME] * 60))
+        script = cn.register_script(_UPDATE_EXISTING_LUA)
+        args: List[Union[str, int]] = ['' if lifetime is None else lifetime]
+        for name, value in fields.items():
+            args.extend([name, value])
+        return bool(await script(keys=[rk, ik], args=args))
 
     async def touch(self) -> None:
-        """ Refreshes the last session activity timestamp in the in-memory storage. """
+        """ Refreshes the last session activity timestamp in the in-memory storage.
+        Only the timestamp field and TTLs are written, with the single request. """
 
         self.touch_timestamp = datetime.datetime.now()
-        await self.save()
+        await self._update_existing(
+            {'touch': self.touch_timestamp.isoformat(timespec='seconds')},
+            await self.lifetime()
+        )
+
+    async def refresh_permissions(self, roles_version: Optional[str] = None) -> None:
+        """ Recalculates the session's permissions from the user's current roles
+        and writes them to the in-memory storage, so the changes made to roles
+        apply to the session without the user's re-login. """
+
+        from ..aaa import permissions_for_user, permissions as aaa_permissions
+
+        self.permissions = await permissions_for_user(self.user['id'])
+        self.permissions_mask = self.mask_for(self.permissions)
+        self.roles_version = roles_version
+        # The session keeps its TTL, and is not written at all if has expired
+        await self._update_existing({
+            'permissions': json_encode(self.permissions),
+            'pmask': format(self.permissions_mask or 0, 'x'),
+            'pver': aaa_permissions.version() or '',
+            'rver': self.roles_version or ''
+        })
 
     async def drop(self) -> None:
         """ Drops this session deleting it from the in-memory storage, preventing
         (if any) logged-in user from ability to continue work using this session. """
 
         rk: str = self.redis_key_for(self.user['id'], self.token)
+        ik: str = self.redis_index_key_for(self.user['id'])
         cn: ds.redis.RedisConnection = await ds.redis.get_connection()
-        await cn.delete(rk)
+        pipe = cn.pipeline(transaction=True)
+        pipe.unlink(rk)
+        pipe.srem(ik, self.token)
+        await pipe.execute()
 
     @classmethod
-    async def fetch(cls, user_id: str, token: str) -> 'Session':
+    async def fetch(cls, user_id: str, token: str, touch: bool = False) -> 'Session':
         """ Fetches the session for the given user's ID and given session token.
         Returns the :class:~wefram.models.aaa.Session: object if the session
         exists, or raises FileNotFoundError otherwise.
 
         :param user_id: the :class:~wefram.models.aaa.User: 'id' of the user;
         :param token: the corresponding session token
+        :param touch: if set to ``True`` - the session's last activity timestamp
+            will be refreshed too, within the same Redis round trip
         :return: the Session object, if the session exists
         :raises: FileNotFoundError if there is no session for given criteria
         """
 
+        from .. import config
+        from ..aaa.routines import ROLES_VERSION_KEY
+
         rk: str = cls.redis_key_for(user_id, token)
+        ik: str = cls.redis_index_key_for(user_id)
+        now: datetime.datetime = datetime.datetime.now()
+        lifetime: int = (await cls.lifetime()) if touch else 0
         cn: ds.redis.RedisConnection = await ds.redis.get_connection()
-        jsoned: Optional[str] = await cn.get(rk)
-        if jsoned is None:
+        script = cn.register_script(_FETCH_AND_TOUCH_LUA)
+        flat: Optional[list] = await script(
+            keys=[rk, ik, ROLES_VERSION_KEY],
+            args=[now.isoformat(timespec='seconds') if touch else '', lifetime]
+        )
+        if not flat:
+            # The session has expired, so removing it from the user's index too
+            await cn.srem(ik, token)
             raise FileNotFoundError(token)
-        cached: dict = json_decode(jsoned)
-        values: Dict[str, Any] = cached
-        values['start_timestamp'] = datetime.datetime.fromisoformat(values['start_timestamp'])
-        values['touch_timestamp'] = datetime.datetime.fromisoformat(values['touch_timestamp'])
-        return cls(**values)
+
+        fields: dict = dict(zip(flat[0::2], flat[1::2]))
+        legacy: Optional[Union[str, bytes]] = fields.get(b'legacy', fields.get('legacy', None))
+        if legacy is not None:
+            session: Session = cls.from_json(legacy)
+            if touch:
+                session.touch_timestamp = now
+                await session.save()
+            return session
+
+        current: Union[str, bytes] = fields.pop(b'_rcur', None) or fields.pop('_rcur', None) or '0'
+        if isinstance(current, bytes):
+            current = current.decode('utf-8')
+        session: Session = cls.from_redis_hash(token, fields)
+        if config.AUTH['push_permissions'] and session.roles_version != current:
+            # Roles have been changed since the session's permissions were
+            # calculated, so pushing the actual ones to the session.
+            await session.refresh_permissions(current)
+        return session
 
     @classmethod
     def redis_key_for(cls, user_id: str, token: str) -> str:
@@ -425,7 +632,39 @@ class Session:
         :return: the corresponding Redis key
         """
 
-        return ':'.join(['aaa', 'session', user_id, token])
+        return ':'.join(['aaa', 'session', str(user_id), token])
+
+    @classmethod
+    def redis_index_key_for(cls, user_id: str) -> str:
+        """ Return the Redis key name of the per-user sessions index - the Redis
+        set containing tokens of all user's sessions. The key will be combined
+        with static prefix 'aaa:sessions' and corresponding user id.
+
+        Example:
+        "aaa:sessions:1ab2fa10-d152-4ac9-9d06-1bfee423ce70"
+
+        :param user_id: the :class:~wefram.models.aaa.User: 'id' of the user;
+        :return: the corresponding Redis key
+        """
+
+        return ':'.join(['aaa', 'sessions', str(user_id)])
+
+    @classmethod
+    async def get_all_tokens_for_user(cls, user_id: str) -> List[str]:
+        """ Returns tokens of all sessions for the given user (by user's id),
+        using the per-user sessions index. Note that the index may contain
+        tokens of already expired sessions, whose are removed from the index
+        on the next fetch.
+
+        :param user_id: the corresponding User.id
+        :return: a list of session tokens
+        """
+
+        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+        return [
+            (t.decode('utf-8') if isinstance(t, bytes) else t)
+            for t in await cn.smembers(cls.redis_index_key_for(user_id))
+        ]
 
     @classmethod
     async def get_all_sessrks_for_user(cls, user_id: str) -> List[str]:
@@ -445,24 +684,86 @@ class Session:
             user
         """
 
-        rk: str = ':'.join(['aaa', 'session', user_id, '*'])
-        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
-        return [k.decode('utf-8') for k in await cn.keys(rk)]
+        return [cls.redis_key_for(user_id, t) for t in await cls.get_all_tokens_for_user(user_id)]
 
     @classmethod
     async def fetch_all_for_user(cls, user_id: str) -> List['Session']:
         """ Returns active sessions (:class:~wefram.models.aaa.Session: objects) for the
-        given user by the corresponding ID.
+        given user by the corresponding ID. All sessions are fetched with the single
+        pipelined request, and expired ones are removed from the user's index.
 
         :param user_id: The ID of the user for which to get all sessions for
         :return: a list of Session objects
         """
-        rks: List[str] = await cls.get_all_sessrks_for_user(user_id)
-        if not rks:
+
+        tokens: List[str] = await cls.get_all_tokens_for_user(user_id)
+        if not tokens:
             return []
-        return [
-            (await cls.fetch(user_id, rk.split(':')[-1])) for rk in rks
-        ]
+        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+        pipe = cn.pipeline(transaction=False)
+        [pipe.hgetall(cls.redis_key_for(user_id, t)) for t in tokens]
+        results: list = await pipe.execute(raise_on_error=False)
+
+        sessions: List[Session] = []
+        expired: List[str] = []
+        for token, fields in zip(tokens, results):
+            if isinstance(fields, Exception):
+                # The session stored using the legacy layout
+                try:
+                    sessions.append(await cls.fetch(user_id, token))
+                except FileNotFoundError:
+                    pass
+                continue
+            if not fields:
+                expired.append(token)
+                continue
+            sessions.append(cls.from_redis_hash(token, fields))
+        if expired:
+            await cn.srem(cls.redis_index_key_for(user_id), *expired)
+        return sessions
+
+    @classmethod
+    async def drop_all_for_user(cls, user_id: str) -> None:
+        """ Drops all sessions of the given user (by the corresponding ID) with the
+        single pipelined request, including the user's sessions index itself.
+
+        :param user_id: The ID of the user for which to drop all sessions for
+        """
+
+        rks: List[str] = await cls.get_all_sessrks_for_user(user_id)
+        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+        await cn.unlink(*rks, cls.redis_index_key_for(user_id))
+
+    @classmethod
+    async def reindex(cls, batch: int = 1000) -> int:
+        """ Rebuilds the per-user sessions indexes from the existing sessions' keys.
+        Used to migrate sessions made prior the indexing been introduced. Uses
+        incremental ``SCAN`` so does not block the Redis server like ``KEYS`` does.
+
+        :param batch: the ``COUNT`` hint for the ``SCAN`` command
+        :return: the number of indexed sessions
+        """
+
+        lifetime: int = await cls.lifetime()
+        cn: ds.redis.RedisConnection = await ds.redis.get_connection()
+        pipe = cn.pipeline(transaction=False)
+        index_keys: Set[str] = set()
+        count: int = 0
+        async for rk in cn.scan_iter(match=cls.redis_key_for('*', '*'), count=batch):
+            rk: str = rk.decode('utf-8') if isinstance(rk, bytes) else rk
+            parts: List[str] = rk.split(':')
+            if len(parts) != 4:
+                continue
+            ik: str = cls.redis_index_key_for(parts[2])
+            pipe.sadd(ik, parts[3])
+            index_keys.add(ik)
+            count += 1
+            if count % batch == 0:
+                await pipe.execute()
+        for ik in index_keys:
+            pipe.expire(ik, lifetime)
+        await pipe.execute()
+        return count
 
 
 class SessionUser(BaseUser):
@@ -478,6 +779,7 @@ class SessionUser(BaseUser):
         self.session: Session = session
         self.user: dict = self.session.user
         self.scopes: List[str] = scopes
+        self.permissions_mask: int = self.session.permissions_mask or 0
 
         self.user_id: str = str(self.user.get('id', ''))
         self.login: str = str(self.user.get('login', ''))
@@ -80,14 +80,22 @@ class SettingsCatalog(UserDict):
 
         return super().__iter__()
 
-    def redis_key(self, user_id: Optional[str]) -> str:
-        """ Returns the Redis attribute key name to store values for this
-        settings catalog. The format of the key name:
+    @staticmethod
+    def redis_key_for(entity_name: str, user_id: Optional[str] = None) -> str:
+        """ Returns the Redis attribute key name to store values of the settings
+        catalog of the given entity, without loading the catalog itself. The
+        format of the key name:
 
         ``settings:catalog:[user_id]:<entity_name>``
 
         """
-        return ':'.join(['settings', 'catalog', (user_id or ''), self.entity_name])
+        return ':'.join(['settings', 'catalog', (user_id or ''), entity_name])
+
+    def redis_key(self, user_id: Optional[str]) -> str:
+        """ Returns the Redis attribute key name to store values for this
+        settings catalog (see :py:meth:`redis_key_for`).
+        """
+        return self.redis_key_for(self.entity_name, user_id)
 
     def load_defaults(self) -> None:
         """ Set properties' values to the default values (read from the entity
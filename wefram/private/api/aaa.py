@@ -47,6 +47,15 @@ class User(ModelAPI):
 
         return s
 
+    def loader_options(self, deep: bool = None, load: Optional[Sequence[str]] = None) -> List[Any]:
+        """ Loads the user's roles (which are few) when the single user is
+        requested, but not for the users list.
+        """
+
+        if self.key and not load:
+            load = ['roles']
+        return super().loader_options(deep, load)
+
     async def delete(self, *keys: Union[str, int]) -> None:
         """ Removes the user(s) using the User's remove method. This is important
         to ovirride the default behaviour with the correspodning
@@ -73,7 +82,9 @@ class User(ModelAPI):
 class Role(ModelAPI):
     """
     The API class handling the systemRole model
-    (:py:class:`~wefram.models.Role` class).
+    (:py:class:`~wefram.models.Role` class). The role's users (members)
+    may be very many, so they are loaded (and returned) only when explicitly
+    requested with the ``load=users`` read argument.
     """
 
     model = Role
@@ -14,8 +14,9 @@ __all__ = [
     'MSG_PERMISSIONS_TESTING',
     'MSG_SETTINGS_SESSION_LIFETIME',
     'MSG_SETTINGS_JWT_LIFETIME',
-    'MSG_SETTINGS_FAILEDAUTH_DELAY',
-    'MSG_SETTINGS_SUCCEEDAUTH_DELAY',
+    'MSG_SETTINGS_LOGIN_ATTEMPTS',
+    'MSG_SETTINGS_LOGIN_ATTEMPTS_IP',
+    'MSG_SETTINGS_LOGIN_WINDOW',
     'MSG_USERS',
     'MSG_ROLES',
     'MSG_DOMAINS',
@@ -26,8 +27,9 @@ __all__ = [
     'SETTINGS_REMEMBER_USERNAME',
     'SETTINGS_SESSION_LIFETIME',
     'SETTINGS_JWT_EXPIRE',
-    'SETTINGS_FAILEDAUTH_DELAY',
-    'SETTINGS_SUCCEEDAUTH_DELAY'
+    'SETTINGS_LOGIN_ATTEMPTS',
+    'SETTINGS_LOGIN_ATTEMPTS_IP',
+    'SETTINGS_LOGIN_WINDOW'
 ]
 
 
@@ -43,8 +45,9 @@ MSG_PERMISSIONS_TESTING = lazy_gettext("Running development tests", 'system.aaa'
 MSG_SETTINGS_REMEMBER_USERNAME = lazy_gettext("Permit to remember an username at log on screen", 'system.aaa')
 MSG_SETTINGS_SESSION_LIFETIME = lazy_gettext("Max session idle time (minutes)", 'system.aaa')
 MSG_SETTINGS_JWT_LIFETIME = lazy_gettext("Security token lifetime (minutes)", 'system.aaa')
-MSG_SETTINGS_FAILEDAUTH_DELAY = lazy_gettext("Delay when login has failed (secs)", 'system.aaa')
-MSG_SETTINGS_SUCCEEDAUTH_DELAY = lazy_gettext("Delay when login has succeed (secs)", 'system.aaa')
+MSG_SETTINGS_LOGIN_ATTEMPTS = lazy_gettext("Max failed logins per account", 'system.aaa')
+MSG_SETTINGS_LOGIN_ATTEMPTS_IP = lazy_gettext("Max failed logins per IP address", 'system.aaa')
+MSG_SETTINGS_LOGIN_WINDOW = lazy_gettext("Failed logins counting period (minutes)", 'system.aaa')
 MSG_USERS = lazy_gettext("Users", 'system.aaa')
 MSG_ROLES = lazy_gettext("Roles", 'system.aaa')
 MSG_DOMAINS = lazy_gettext("Active Directory", 'system.aaa')
@@ -55,5 +58,6 @@ PERMISSION_ADMINSETTINGS: str = 'adminSettings'
 SETTINGS_REMEMBER_USERNAME: str = 'remember_username'
 SETTINGS_SESSION_LIFETIME: str = 'session_timeout_mins'
 SETTINGS_JWT_EXPIRE: str = 'jwt_expire_mins'
-SETTINGS_FAILEDAUTH_DELAY: str = 'failed_auth_delay'
-SETTINGS_SUCCEEDAUTH_DELAY: str = 'succeed_auth_delay'
+SETTINGS_LOGIN_ATTEMPTS: str = 'login_attempts'
+SETTINGS_LOGIN_ATTEMPTS_IP: str = 'login_attempts_ip'
+SETTINGS_LOGIN_WINDOW: str = 'login_window_mins'
@@ -4,15 +4,15 @@ Provides different authentication and authorization functionality which is out o
 
 from typing import *
 import datetime
-from asyncio import sleep
-from ... import api, logger, settings
+from ... import api, logger
 from ...requests import Request, NoContentResponse, JSONResponse, HTTPException, SuccessResponse
 from ...runtime import context
 from ...exceptions import AuthenticationFailed
 from ...aaa.wrappers import requires_authenticated, requires
 from ...aaa.routines import authenticate, create_session, refresh_with_token, drop_user_sessions_by_id
+from ...aaa import throttling
 from ...models import User, Session, SessionLog, SessionUser
-from ..const.aaa import SETTINGS_FAILEDAUTH_DELAY, SETTINGS_SUCCEEDAUTH_DELAY, PERMISSION_ADMINUSERSROLES
+from ..const.aaa import PERMISSION_ADMINUSERSROLES
 
 
 API_V1: int = 1
@@ -63,7 +63,9 @@ async def v1_login(request: Request) -> JSONResponse:
     will be created, the new session's JWT token will be generated and returned
     to the calling frontend.
 
-    Returns the new session state.
+    Returns the new session state. Too many failed attempts for the login or
+    from the client's address result in the 429 response with ``Retry-After``
+    header, which is returned before any database access.
     """
 
     payload: Dict[str, str] = request.scope['payload']
@@ -74,26 +76,32 @@ async def v1_login(request: Request) -> JSONResponse:
         logger.debug("no username or password", 'login')
         raise HTTPException(400)
 
+    client_ip: Optional[str] = request.client.host if request.client else None
+    wait: int = await throttling.retry_after(username, client_ip)
+    if wait:
+        logger.info(f"authentication throttled for '{username}' from {client_ip}", 'login')
+        return JSONResponse({'retryAfter': wait}, status_code=429, headers={'Retry-After': str(wait)})
+
     try:
         user: User = await authenticate(username, password)
     except AuthenticationFailed:
         logger.info(f"authentication failed for '{username}'", 'login')
-        await sleep((await settings.get('aaa'))[SETTINGS_FAILEDAUTH_DELAY] * 1.0)
+        await throttling.failed(username, client_ip)
         raise HTTPException(401)
 
+    await throttling.succeed(username)
+
     token: str
     refresh_token: str
     expire: datetime.datetime
     token, refresh_token, expire = await create_session(user)
     logger.info(f"successfully authenticated '{username}'", 'login')
 
-    await sleep((await settings.get('aaa'))[SETTINGS_SUCCEEDAUTH_DELAY] * 1.0)
-
     await SessionLog.create(
         user_id=user.id,
         ts=datetime.datetime.now(),
         extra={
-            'from': request.client.host,
+            'from': client_ip,
             'host': request.headers.get('host', None),
             'user_agent': request.headers.get('user-agent', None)
         }
@@ -1,7 +1,7 @@
 from typing import *
-from starlette.datastructures import FormData, UploadFile
 from ... import api
 from ...requests import (
+    routing,
     route,
     Request,
     JSONResponse,
@@ -15,26 +15,21 @@ from ...tools import array_from
 from ...ds import storages
 
 
+# Uploaded files are streamed straight to the storage by endpoints below, so the
+# request body must not be spooled by the request middleware in advance.
+routing.streaming_routes_prefixes.append(routing.format_path('/storage', 'api'))
+
+
 @api.handle_post('/storage/{entity}/file')
 async def store_file(request: Request) -> PlainTextResponse:
     """ Store a single uploaded file to the storage, returning its
     FileId key.
     """
     entity: str = request.path_params['entity']
-    payload: FormData = request.scope['payload']
-    for data in payload.values():
-        if not isinstance(data, UploadFile):
-            continue
-        data: UploadFile
-        return PlainTextResponse(storages.upload_file_content(
-            entity,
-            data.file,
-            data.filename,
-            {
-                'content_type': data.content_type
-            }
-        ))
-    raise HTTPException(400)
+    new_files_ids: List[str] = await storages.store_request_files(request, entity, limit=1)
+    if not new_files_ids:
+        raise HTTPException(400)
+    return PlainTextResponse(new_files_ids[0])
 
 
 @api.handle_post('/storage/{entity}/files')
@@ -43,21 +38,7 @@ async def store_files(request: Request) -> JSONResponse:
     their FileIds as a list (array).
     """
     entity: str = request.path_params['entity']
-    new_files_ids: List[str] = []
-    payload: FormData = request.scope['payload']
-    for data in payload.values():
-        if not isinstance(data, UploadFile):
-            continue
-        data: UploadFile
-        new_files_ids.append(storages.upload_file_content(
-            entity,
-            data.file,
-            data.filename,
-            {
-                'content_type': data.content_type
-            }
-        ))
-    return JSONResponse(new_files_ids)
+    return JSONResponse(await storages.store_request_files(request, entity))
 
 
 @api.handle_put('/storage/{entity}/file/{file_id}')
@@ -69,22 +50,11 @@ async def replace_file(request: Request) -> PlainTextResponse:
     """
     file_id: str = request.path_params['file_id']
     entity: str = request.path_params['entity']
+    new_files_ids: List[str] = await storages.store_request_files(request, entity, limit=1)
+    if not new_files_ids:
+        raise HTTPException(400)
     storages.remove_file(entity, file_id)
-
-    payload: FormData = request.scope['payload']
-    for data in payload.values():
-        if not isinstance(data, UploadFile):
-            continue
-        data: UploadFile
-        return PlainTextResponse(storages.upload_file_content(
-            entity,
-            data.file,
-            data.filename,
-            {
-                'content_type': data.content_type
-            }
-        ))
-    raise HTTPException(400)
+    return PlainTextResponse(new_files_ids[0])
 
 
 @api.handle_delete('/storage/{entity}/file/{file_id}')
@@ -107,12 +77,76 @@ async def delete_files(request: Request) -> NoContentResponse:
     return NoContentResponse()
 
 
+@api.handle_post('/storage/{entity}/uploads')
+async def create_upload(request: Request) -> JSONResponse:
+    """ Creates the resumable upload session. The JSON body declares the file:
+    ``{"filename": str, "size": int, "contentType": str}``. Returns the session
+    state, including its ``id`` used for the subsequent requests.
+    """
+    entity: str = request.path_params['entity']
+    try:
+        declared: dict = await request.json()
+        size: int = int(declared['size'])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400)
+    session: storages.UploadSession = await storages.create_upload(
+        entity, str(declared.get('filename', '')), size, declared.get('contentType', None)
+    )
+    return JSONResponse(session.json(), status_code=201, headers=_upload_headers(session))
+
+
+@api.handle_req('/storage/{entity}/uploads/{upload_id}', methods=['PATCH', 'PUT'])
+async def append_upload(request: Request) -> JSONResponse:
+    """ Appends the chunk given as the raw request body to the upload at the
+    offset given by the ``Upload-Offset`` header, which must be equal to the
+    current offset of the upload. Returns the session state; the ``fileId`` is
+    set when the last chunk has been received.
+    """
+    entity: str = request.path_params['entity']
+    try:
+        offset: int = int(request.headers['upload-offset'])
+    except (ValueError, KeyError):
+        raise HTTPException(400)
+    session: storages.UploadSession = await storages.get_upload(request.path_params['upload_id'], entity)
+    session = await storages.append_upload(session, offset, request.stream())
+    return JSONResponse(session.json(), headers=_upload_headers(session))
+
+
+@api.handle_req('/storage/{entity}/uploads/{upload_id}', methods=['GET', 'HEAD'])
+async def get_upload(request: Request) -> JSONResponse:
+    """ Returns the upload session state, the current offset is also given by
+    the ``Upload-Offset`` header. """
+    entity: str = request.path_params['entity']
+    session: storages.UploadSession = await storages.get_upload(request.path_params['upload_id'], entity)
+    return JSONResponse(session.json(), headers=_upload_headers(session))
+
+
+@api.handle_delete('/storage/{entity}/uploads/{upload_id}')
+async def abort_upload(request: Request) -> NoContentResponse:
+    """ Cancels the upload, discarding the already received content. """
+    entity: str = request.path_params['entity']
+    session: storages.UploadSession = await storages.get_upload(request.path_params['upload_id'], entity)
+    await storages.abort_upload(session)
+    return NoContentResponse()
+
+
+def _upload_headers(session: storages.UploadSession) -> Dict[str, str]:
+    return {
+        'Upload-Offset': str(session.offset),
+        'Upload-Length': str(session.size),
+        'Cache-Control': 'no-store'
+    }
+
+
 @api.handle_get('/storage/{entity}/file/{file_id}')
 async def get_file(request: Request) -> FileResponse:
+    """ Returns the stored file; the variant of the stored image may be requested
+    by the ``w``, ``h``, ``fit`` and ``fmt`` query arguments (see
+    :py:mod:`wefram.ds.storages.images`). """
     file_id: str = request.path_params['file_id']
     entity: str = request.path_params['entity']
     try:
-        return await storages.get_file_response(entity, file_id)
+        return await storages.get_image_response(entity, file_id, request)
     except FileNotFoundError:
         raise HTTPException(404)
 
@@ -122,7 +156,7 @@ async def download(request: Request) -> Union[FileResponse, NotModifiedResponse]
     file_id: str = request.path_params['file_id']
     entity: str = request.path_params['entity']
     try:
-        return await storages.get_file_response(entity, file_id, request)
+        return await storages.get_image_response(entity, file_id, request)
     except FileNotFoundError:
         raise HTTPException(404)
 
@@ -1,10 +1,11 @@
 from typing import *
 import os.path
 from ... import api
-from ...requests import Request, PrebuiltFile, Response, JSONResponse, HTTPException
+from starlette.datastructures import Headers
+from ...requests import Request, Response, NotModifiedResponse, HTTPException, accepted_encodings, etag_matches
 from ...runtime import context
 from ...l10n.locales import Locale
-from ...l10n.catalog import locate_dictionary_json
+from ...l10n.catalog import TranslationsPayload, translations_payload
 from ...l10n.config import BUILT_DICTS_PATH, BUILT_TEXTS_PATH
 
 
@@ -76,11 +77,23 @@ async def v1_get_message_by_id(request: Request) -> Response:
 
 @api.handle_get('/translations', API_V1)
 async def v1_get_translations(request: Request) -> Response:
-    locale: Locale = context['locale']
-    filepath: str = locate_dictionary_json(locale)
-    if not filepath:
-        return JSONResponse({})
-    if not os.path.exists(filepath):
-        return JSONResponse({})
-    return PrebuiltFile(filepath)
+    """ Returns the whole catalog of the current locale. Requested by the version
+    (``?v=``, see the ``instantiate``), the response is cached by clients forever,
+    the unversioned one is revalidated by the ETag every time. """
+
+    payload: TranslationsPayload = translations_payload()
+    versioned: bool = request.scope['query_args'].get('v', None) == payload.version
+    headers: Dict[str, str] = {
+        'ETag': payload.etag,
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'public, max-age=31536000, immutable' if versioned else 'private, no-cache'
+    }
+    if 'if-none-match' in request.headers and etag_matches(request.headers['if-none-match'], payload.etag):
+        return NotModifiedResponse(Headers(headers))
+
+    content: bytes = payload.content
+    if 'gzip' in accepted_encodings(request.headers.get('accept-encoding', '')):
+        content = payload.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    return Response(content, media_type='application/json', headers=headers)
 
@@ -22,7 +22,7 @@ async def instantiate(request: Request) -> JSONResponse:
         'screens': ui.screens.runtime_json(),
         'locale': l10n.ui_locale_json(),
         'title': config.APP_TITLE,
-        'localization': l10n.pack_dictionary(),
+        'localizationVersion': l10n.translations_payload().version,
         'urlConfiguration': {
             'loginScreenUrl': config.URL['login_screen'],
             'defaultAuthenticatedUrl': config.URL['default_authenticated'] or config.URL['default'],
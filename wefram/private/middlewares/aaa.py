@@ -28,6 +28,7 @@ class AuthenticationCliMiddleware(cli.CliMiddleware):
         context['is_authenticated'] = False
         context['user']: BaseUser = UnauthenticatedUser()
         context['permissions']: List[str] = []
+        context['permissions_mask']: int = 0
         context['session']: Optional[Session] = None
         await call_next()
 
@@ -53,6 +54,7 @@ class ProjectAuthenticationBackend(AuthenticationBackend):
         context['is_authenticated'] = False
         context['user']: BaseUser = UnauthenticatedUser()
         context['permissions']: List[str] = []
+        context['permissions_mask']: int = 0
         context['session']: Optional[Session] = None
 
         if is_static_path(conn.scope['path']):
@@ -102,7 +104,11 @@ class ProjectAuthenticationBackend(AuthenticationBackend):
         session_token: str = payload['sess']
         user_id: str = payload['user']
         try:
-            session: Optional[Session] = await Session.fetch(user_id, session_token)
+            session: Optional[Session] = await Session.fetch(
+                user_id,
+                session_token,
+                touch=('X-Avoid-Session-Touch' not in conn.headers)
+            )
         except FileNotFoundError:
             logger.debug("expired session for the given jwt token")
             return
@@ -116,11 +122,8 @@ class ProjectAuthenticationBackend(AuthenticationBackend):
         context['is_authenticated'] = True
         context['user']: BaseUser = auth_user
         context['permissions']: List[str] = auth_scopes
+        context['permissions_mask']: int = auth_user.permissions_mask
         context['session']: Session = session
 
-        if 'X-Avoid-Session-Touch' not in conn.headers:
-            logger.debug(f"touching the session's last activity")
-            await session.touch()
-
         return AuthCredentials(auth_scopes), auth_user
 
@@ -21,9 +21,37 @@ __all__ = [
 ]
 
 
+# Parsed locales by the locale code (of the user's preference) and negotiated
+# ones by the Accept-Language header value. Both are bounded: the number of
+# distinct values seen in practice is small, so the cache is simply dropped
+# when overflowed.
+LOCALES_CACHE_SIZE: int = 1024
+_parsed: Dict[str, Optional[Locale]] = {}
+_negotiated: Dict[str, babel.Locale] = {}
+
+
+def _cache(cache: dict, key: str, value: Any) -> Any:
+    if len(cache) >= LOCALES_CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+    return value
+
+
+def parse_locale(code: str) -> Optional[Locale]:
+    """ Returns the parsed locale by its code, or ``None`` for unknown ones. """
+
+    if code in _parsed:
+        return _parsed[code]
+    try:
+        parsed: Optional[Locale] = Locale.parse(code)
+    except (babel.UnknownLocaleError, ValueError):
+        parsed = None
+    return _cache(_parsed, code, parsed)
+
+
 class LocalizationCliMiddleware(CliMiddleware):
     async def __call__(self, call_next: Callable) -> None:
-        context['locale']: Locale = Locale.parse(config.DEFAULT_LOCALE)
+        context['locale']: Locale = parse_locale(config.DEFAULT_LOCALE)
         await call_next()
 
 
@@ -45,24 +73,22 @@ class LocalizationMiddleware(BaseHTTPMiddleware):
         if 'user' in context and not isinstance(context['user'], UnauthenticatedUser):
             user: SessionUser = context['user']
             if user.locale:
-                try:
-                    selected_locale = Locale.parse(user.locale)
-                except babel.UnknownLocaleError:
-                    pass
+                selected_locale = parse_locale(user.locale)
 
         if not selected_locale:
             conn = HTTPConnection(request.scope)
-            if 'accept-language' in conn.headers and conn.headers['accept-language']:
-                locales_preferred: List[str] = await self.parse_accept_language(conn.headers['accept-language'])
-                locale_preferred: Optional[babel.Locale] = best_matching_locale(locales_preferred)
-
-                if locale_preferred:
-                    selected_locale = locale_preferred
-
-                else:
-                    selected_locale = Locale.parse(config.DEFAULT_LOCALE)
+            accept_language: Optional[str] = conn.headers.get('accept-language', None)
+            if accept_language:
+                selected_locale = _negotiated.get(accept_language, None)
+                if selected_locale is None:
+                    locales_preferred: List[str] = await self.parse_accept_language(accept_language)
+                    selected_locale = _cache(
+                        _negotiated,
+                        accept_language,
+                        best_matching_locale(locales_preferred) or parse_locale(config.DEFAULT_LOCALE)
+                    )
             else:
-                selected_locale = Locale.parse(config.DEFAULT_LOCALE)
+                selected_locale = parse_locale(config.DEFAULT_LOCALE)
 
         context['locale']: Locale = selected_locale
         return await call_next(request)
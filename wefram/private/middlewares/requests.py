@@ -8,6 +8,7 @@ from starlette.middleware.base import (
     RequestResponseEndpoint,
 )
 from starlette.requests import Request, Headers
+from ...requests import routing
 from ... import exceptions
 from ...tools import rerekey_camelcase_to_snakecase
 
@@ -48,7 +49,12 @@ class RequestMiddleware(BaseHTTPMiddleware):
         method: str = scope['method'].upper()
         payload: Optional[Any] = None
         payload_type: Optional[str] = None
-        if method in ('POST', 'PUT') and 'content-type' in headers:
+        path: str = request.url.path
+        if any(path.startswith(prefix) for prefix in routing.streaming_routes_prefixes):
+            # The endpoint reads the request body itself, as a stream
+            payload_type = 'stream'
+
+        elif method in ('POST', 'PUT') and 'content-type' in headers:
             content_type: str = headers['content-type'].lower()
             payload_type = 'plain'
 
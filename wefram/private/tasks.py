@@ -0,0 +1,62 @@
+"""
+Provides the platform built-in periodic tasks.
+"""
+
+import datetime
+from .. import config, ds, settings, tasks
+from ..models import RefreshToken, SessionLog
+from .const.aaa import SETTINGS_SESSION_LIFETIME, SETTINGS_JWT_EXPIRE
+
+
+__all__ = [
+    'expire_refresh_tokens',
+    'purge_session_log',
+    'purge_stale_uploads',
+    'collect_storage_garbage'
+]
+
+
+@tasks.every(hours=1, jitter=60, name='expireRefreshTokens')
+async def expire_refresh_tokens() -> None:
+    """ Deletes refresh tokens which could not be used anymore: the token
+    older than the session lifetime plus the JWT token lifetime refers to
+    the already expired session. """
+
+    settings_ = await settings.get('aaa', force_user_id=None)
+    jwt_expire: int = settings_[SETTINGS_JWT_EXPIRE] or 24 * 60
+    lifetime: datetime.timedelta = datetime.timedelta(minutes=settings_[SETTINGS_SESSION_LIFETIME] + jwt_expire)
+    await ds.execute(ds.delete(RefreshToken).where(RefreshToken.created < datetime.datetime.now() - lifetime))
+
+
+@tasks.cron('15 3 * * *', jitter=300, name='purgeSessionLog')
+async def purge_session_log() -> None:
+    """ Deletes the successful logins journal entries older than configured
+    (``auth.sessionLogKeepDays``) number of days. """
+
+    keep_days: int = config.AUTH['session_log_keep_days']
+    if not keep_days:
+        return
+    await ds.execute(
+        ds.delete(SessionLog).where(SessionLog.ts < datetime.datetime.now() - datetime.timedelta(days=keep_days))
+    )
+
+
+@tasks.every(hours=1, jitter=300, name='purgeStaleUploads')
+async def purge_stale_uploads() -> None:
+    """ Removes the partial content of expired resumable uploads. """
+
+    await ds.storages.purge_stale_uploads()
+
+
+async def collect_storage_garbage() -> None:
+    """ Removes stored files not referenced anymore, see :py:mod:`wefram.ds.storages.collector`. """
+
+    await ds.storages.collect_garbage()
+
+
+if config.STORAGE['gc_schedule']:
+    tasks.register(collect_storage_garbage, schedule=config.STORAGE['gc_schedule'], name='collectStorageGarbage', jitter=300)
+
+
+def start() -> None:
+    pass
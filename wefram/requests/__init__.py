@@ -3,7 +3,9 @@ from starlette.exceptions import HTTPException
 from starlette_context import context
 from .routing import route, is_static_path, Route
 from .responses import *
-from . import routing, responses
+from .statics import *
+from .negotiation import *
+from . import routing, responses, statics, negotiation
 
 
 def start() -> None:
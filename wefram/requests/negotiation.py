@@ -0,0 +1,46 @@
+"""
+Provides parsing of the request headers negotiating the response: the accepted
+content encodings (``Accept-Encoding``) and the conditional request validators
+(``If-None-Match``). Shared by the statics, the stored files and the other
+controllers serving cacheable content.
+"""
+
+from typing import *
+
+
+__all__ = [
+    'accepted_encodings',
+    'etag_matches'
+]
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """ Returns the set of content encodings accepted by the client, by the
+    ``Accept-Encoding`` header value. Encodings explicitly refused by the zero
+    quality (``q=0``) are not included.
+    """
+
+    accepted: Set[str] = set()
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """ Returns ``True`` if the ``If-None-Match`` header value matches the given
+    (quoted) entity tag, using the weak comparison.
+    """
+
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate == etag or candidate.startswith('W/') and candidate[2:] == etag:
+            return True
+    return False
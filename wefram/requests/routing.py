@@ -19,6 +19,7 @@ __all__ = [
     'abs_url',
     'format_path',
     'static_routes_prefixes',
+    'streaming_routes_prefixes',
     'is_static_path'
 ]
 
@@ -83,6 +84,10 @@ static_routes_prefixes: List[str] = [
     defaults.URL_STATICS
 ]
 
+# The paths prefixes of routes whose request body is read by the endpoint itself,
+# as a stream, and so must not be parsed (and spooled) in advance.
+streaming_routes_prefixes: List[str] = []
+
 
 def append(r: Route) -> None:
     """ Appends the given route to the routing table of the project. """
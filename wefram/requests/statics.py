@@ -0,0 +1,145 @@
+"""
+Provides the static files application serving the build statics: negotiates the
+``Accept-Encoding`` and serves the precompressed (``.br``, ``.gz``) sibling of
+the requested file, if the build made one (see the ``statics.precompress``
+configuration option), and marks files with content-hashed names (the assets
+bundles, the webpack chunks) as ``immutable`` for browsers and proxies.
+
+Results of the files lookup are kept in the per-worker memory for the
+``statics.statRevalidate`` seconds, so the hot static files are served without
+touching the file system for the stat.
+"""
+
+from typing import *
+import os
+import re
+import time
+import mimetypes
+import anyio
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.responses import FileResponse, Response
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.types import Scope
+from .. import config
+from .negotiation import accepted_encodings
+
+
+__all__ = [
+    'PrecompressedStaticFiles',
+    'is_hashed_name'
+]
+
+
+# The encodings in the order of preference, with the extension of the sibling file
+ENCODINGS: Tuple[Tuple[str, str], ...] = (
+    ('br', '.br'),
+    ('gzip', '.gz')
+)
+STAT_CACHE_SIZE: int = 4096
+
+# The content hash (or the build uuid) is the part of the name: `<hash>.js`,
+# `app.<hash>.js`, `vendor.<hash>.css`, etc.
+_HASHED_NAME = re.compile(r'(^|[.\-_])[0-9a-f]{16,}\.[a-z0-9]+$', re.IGNORECASE)
+
+
+def is_hashed_name(filename: str) -> bool:
+    """ Returns ``True`` if the file name contains the content hash, so the file
+    content is never changed under this name. """
+
+    return bool(_HASHED_NAME.search(os.path.basename(filename)))
+
+
+class _StaticFile:
+    __slots__ = ('filename', 'stat_result', 'variants', 'checked')
+
+    def __init__(
+            self,
+            filename: str,
+            stat_result: os.stat_result,
+            variants: Dict[str, Tuple[str, os.stat_result]]
+    ):
+        self.filename: str = filename
+        self.stat_result: os.stat_result = stat_result
+        self.variants: Dict[str, Tuple[str, os.stat_result]] = variants
+        self.checked: float = time.monotonic()
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """ The Starlette's ``StaticFiles`` serving precompressed variants of files
+    and long-living cache headers for content-hashed files. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stat_cache: Dict[str, _StaticFile] = {}
+
+    def _lookup(self, path: str) -> Optional[_StaticFile]:
+        """ Finds the requested file and its precompressed siblings (newer than
+        the file itself). Does the blocking file I/O. """
+
+        root: str = os.path.realpath(self.directory)
+        filename: str = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, filename]) != root:
+            return None
+        try:
+            stat_result: os.stat_result = os.stat(filename)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not os.path.isfile(filename):
+            return None
+        variants: Dict[str, Tuple[str, os.stat_result]] = {}
+        for encoding, extension in ENCODINGS:
+            try:
+                variant_stat: os.stat_result = os.stat(filename + extension)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if variant_stat.st_mtime >= stat_result.st_mtime:
+                variants[encoding] = (filename + extension, variant_stat)
+        return _StaticFile(filename, stat_result, variants)
+
+    async def lookup_static(self, path: str) -> Optional[_StaticFile]:
+        cached: Optional[_StaticFile] = self._stat_cache.get(path, None)
+        if cached is not None and time.monotonic() - cached.checked < config.STATICS['stat_revalidate']:
+            return cached
+        found: Optional[_StaticFile] = await anyio.to_thread.run_sync(self._lookup, path)
+        if found is None:
+            # Misses are not cached, so the cache can't be flooded by random paths
+            self._stat_cache.pop(path, None)
+            return None
+        if path not in self._stat_cache and len(self._stat_cache) >= STAT_CACHE_SIZE:
+            self._stat_cache.pop(next(iter(self._stat_cache)))
+        self._stat_cache[path] = found
+        return found
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope['method'] not in ('GET', 'HEAD'):
+            raise HTTPException(status_code=405)
+
+        found: Optional[_StaticFile] = await self.lookup_static(path)
+        if found is None:
+            raise HTTPException(status_code=404)
+
+        request_headers: Headers = Headers(scope=scope)
+        headers: Dict[str, str] = {}
+        filename: str = found.filename
+        stat_result: os.stat_result = found.stat_result
+        if found.variants:
+            headers['Vary'] = 'Accept-Encoding'
+            accepted: Set[str] = accepted_encodings(request_headers.get('accept-encoding', ''))
+            for encoding, _ in ENCODINGS:
+                if encoding in accepted and encoding in found.variants:
+                    filename, stat_result = found.variants[encoding]
+                    headers['Content-Encoding'] = encoding
+                    break
+        if is_hashed_name(found.filename):
+            headers['Cache-Control'] = f"public, max-age={config.STATICS['immutable_max_age']}, immutable"
+
+        response: FileResponse = FileResponse(
+            filename,
+            headers=headers,
+            media_type=mimetypes.guess_type(found.filename)[0] or 'application/octet-stream',
+            stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
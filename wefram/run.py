@@ -7,7 +7,8 @@ from . import config, apps, requests, logger, ds, runtime, middlewares, ui, l10n
 from .private import (
     controllers as private_controllers,
     api as private_apis,
-    screens as private_screens
+    screens as private_screens,
+    tasks as private_tasks
 )
 
 
@@ -23,6 +24,7 @@ l10n.start()
 private_controllers.start()
 private_apis.start()
 private_screens.start()
+private_tasks.start()
 
 
 # Ensures the environment
@@ -44,6 +46,10 @@ project_apps: apps.IAppsModules = apps.load(apps_to_load)
 # Initalizing apps' main modules
 apps_main: apps.IAppsMains = apps.initialize(project_apps)
 
+# Freezing the registered permissions into the scope -> bit mapping
+from .aaa import permissions as _permissions
+_permissions.freeze()
+
 
 def start() -> None:
     pass
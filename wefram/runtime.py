@@ -4,6 +4,7 @@ Provides some runtime contexts and functions.
 
 from typing import *
 from collections import UserDict
+from starlette_context import request_cycle_context
 from .requests import context as request_context
 from . import cli
 
@@ -77,16 +78,41 @@ async def within_cli(exe: Callable, *args, **kwargs) -> None:
     :param kwargs:
         Named arguments (optional) whose about to be applied to the calling exe
     """
-    from . import run, middlewares
+    from . import run
 
     run.ensure_started()
     context.context = {}  # Overriding the request-level context with usual dict
 
+    await _call_within_cli_middlewares(exe, *args, **kwargs)
+
+
+async def within_background(exe: Callable, *args, **kwargs) -> None:
+    """ Executes the given function (exe) within its own, non-request-driven context
+    and using declared CLI middlewares (so the database & Redis connections, etc are
+    available to the function), like :py:func:`within_cli` does. Unlike the last one,
+    this function does not override the process-wide context and is safe to be used
+    for the background tasks in the running server process.
+
+    :param exe:
+        The executable *async* function to execute
+    :param args:
+        Arguments (optional) whose about to be applied to the calling exe
+    :param kwargs:
+        Named arguments (optional) whose about to be applied to the calling exe
+    """
+
+    with request_cycle_context({}):
+        await _call_within_cli_middlewares(exe, *args, **kwargs)
+
+
+async def _call_within_cli_middlewares(exe: Callable, *args, **kwargs) -> None:
+    from . import middlewares
+
     cli_middlewares: list = middlewares.registered_cli
     call_stack: list = cli_middlewares + [cli.CliExecutable(exe, list(args), dict(kwargs))]
 
     if len(call_stack) == 1:  # if there are no CLI middlewares at all
-        await exe()
+        await exe(*args, **kwargs)
 
     else:  # call `exe` within CLI middlewares
         await (call_stack[0](call_stack[1:])).call_next()
@@ -0,0 +1,443 @@
+"""
+Provides the periodic tasks scheduler.
+
+Apps register the async functions about to be executed periodically, either
+with the fixed interval or with the cron-like schedule. The scheduler runs in
+every server worker process, but every occurrence of every task is executed
+only once across all processes and nodes sharing the same Redis: the occurrence
+is claimed using the Redis key set with ``NX``, and the running task holds the
+Redis lock which prevents the next occurrence from overlapping the current one.
+
+The example of registering tasks in the app's ``app.py``:
+
+.. highlight:: python
+.. code-block:: python
+
+    from wefram import tasks
+
+    @tasks.every(minutes=10)
+    async def refresh_rates() -> None:
+        ...
+
+    @tasks.cron('30 3 * * *')
+    async def nightly_cleanup() -> None:
+        ...
+
+Tasks are executed within their own context, using the CLI middlewares, so the
+database and Redis connections are available like in the request handler.
+"""
+
+from typing import *
+import asyncio
+import datetime
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from .tools import CSTYLE, get_calling_app
+from . import ds, logger, runtime
+
+
+__all__ = [
+    'Task',
+    'CronSchedule',
+    'registered',
+    'register',
+    'every',
+    'cron',
+    'metrics',
+    'start',
+    'stop'
+]
+
+
+# Releases the lock only if it is still held by the given owner.
+_RELEASE_LUA: str = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_OWNER: str = uuid.uuid4().hex
+
+
+class CronSchedule:
+    """ The cron-like schedule with the classic five fields: minute, hour, day
+    of month, month and day of week (0 or 7 is Sunday). Every field accepts
+    ``*``, numbers, ranges (``a-b``), steps (``*/n``, ``a-b/n``) and lists of
+    them separated by commas. """
+
+    _ranges: List[Tuple[int, int]] = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        fields: List[str] = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression must consist of 5 fields: {expression}")
+        self.expression: str = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            self._parse(f, *r) for f, r in zip(fields, self._ranges)
+        ]
+        self.weekdays: Set[int] = {(d % 7) for d in weekdays}
+        self.any_day: bool = fields[2] == '*'
+        self.any_weekday: bool = fields[4] == '*'
+
+    @staticmethod
+    def _parse(value: str, low: int, high: int) -> Set[int]:
+        result: Set[int] = set()
+        for part in value.split(','):
+            step: int = 1
+            if '/' in part:
+                part, step_s = part.split('/', 1)
+                step = int(step_s)
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = [int(x) for x in part.split('-', 1)]
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"invalid cron field value: {value}")
+            result.update(range(start, end + 1, step))
+        return result
+
+    def matches(self, moment: datetime.datetime) -> bool:
+        if moment.minute not in self.minutes or moment.hour not in self.hours or moment.month not in self.months:
+            return False
+        day: bool = moment.day in self.days
+        weekday: bool = (moment.isoweekday() % 7) in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday  # the classic cron behaviour when both are restricted
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """ Returns the nearest moment (with minute precision) after the given one
+        matching the schedule. """
+
+        candidate: datetime.datetime = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit: datetime.datetime = candidate + datetime.timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + datetime.timedelta(hours=1)
+                continue
+            if self.matches(candidate):
+                return candidate
+            candidate += datetime.timedelta(minutes=1)
+        raise ValueError(f"cron expression never matches: {self.expression}")
+
+
+@dataclass
+class Task:
+    """ The registered periodic task. """
+
+    name: str
+    func: Callable[[], Awaitable[None]]
+    interval: Optional[float] = None
+    schedule: Optional[CronSchedule] = None
+    jitter: float = 0
+    timeout: Optional[float] = None
+    running: bool = False
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_started: Optional[datetime.datetime] = None
+    last_duration: Optional[float] = None
+    total_duration: float = 0
+    next_due: float = field(default=0)
+
+    def due_after(self, moment: float) -> float:
+        """ Returns the next occurrence timestamp after the given one. The intervals
+        are aligned to the epoch, so all processes compute the same occurrences. """
+
+        if self.schedule is not None:
+            return self.schedule.next_after(datetime.datetime.fromtimestamp(moment)).timestamp()
+        return (moment // self.interval + 1) * self.interval
+
+    def period(self, due: float) -> float:
+        """ Returns the period (in seconds) between the given occurrence and the
+        next one. """
+
+        if self.schedule is not None:
+            return self.due_after(due) - due
+        return self.interval
+
+    def lock_ttl(self, due: float) -> int:
+        """ The lock TTL (seconds), after which the lock is considered abandoned. """
+
+        if self.timeout:
+            return int(self.timeout) + 1
+        return max(int(self.period(due)), 60) * 2
+
+    def claim_ttl(self, due: float) -> int:
+        """ The TTL (seconds) of the occurrence claim. The claim outlives the jitter
+        delay and the run itself, so no lagging process claims the same occurrence
+        again. """
+
+        return int(self.period(due) + self.jitter) + self.lock_ttl(due)
+
+
+registered: Dict[str, Task] = {}
+_runner: Optional[asyncio.Task] = None
+
+
+def register(
+        func: Callable[[], Awaitable[None]],
+        interval: Optional[float] = None,
+        schedule: Optional[str] = None,
+        name: Optional[str] = None,
+        jitter: float = 0,
+        timeout: Optional[float] = None,
+        app: Optional[str] = None
+) -> Task:
+    """ Registers the given async function as the periodic task.
+
+    :param func: the async function (without arguments) to execute
+    :param interval: the interval of executions, in seconds
+    :param schedule: the cron-like schedule expression, used instead of the interval
+    :param name: the task name, defaults to the function name; the name is prefixed
+        with the app name
+    :param jitter: the max random delay (in seconds) added to every occurrence,
+        used to spread the load of the simultaneous tasks
+    :param timeout: the max run time (in seconds) of the task, after which the task
+        will be cancelled
+    :param app: the parent app name, defaults to the calling app
+    :return: the registered :py:class:`Task`
+    """
+
+    if not asyncio.iscoroutinefunction(func):
+        raise TypeError(f"the periodic task must be an async function, {func} given instead")
+    if (interval is None) == (schedule is None):
+        raise ValueError("either interval or schedule must be given for the periodic task")
+    if interval is not None and interval <= 0:
+        raise ValueError("the periodic task interval must be positive")
+
+    app = app or get_calling_app()
+    task_name: str = '.'.join([app, name or func.__name__])
+    task: Task = Task(
+        name=task_name,
+        func=func,
+        interval=float(interval) if interval is not None else None,
+        schedule=CronSchedule(schedule) if schedule is not None else None,
+        jitter=float(jitter or 0),
+        timeout=timeout
+    )
+    registered[task_name] = task
+    logger.debug(f"registered periodic task {CSTYLE['green']}{task_name}{CSTYLE['clear']}")
+    return task
+
+
+def every(
+        seconds: float = 0,
+        minutes: float = 0,
+        hours: float = 0,
+        name: Optional[str] = None,
+        jitter: float = 0,
+        timeout: Optional[float] = None
+) -> Callable:
+    """ The decorator registering the async function as the periodic task executing
+    with the given interval. See :py:func:`register` for arguments. """
+
+    app: str = get_calling_app()
+
+    def decorator(func: Callable) -> Callable:
+        register(
+            func,
+            interval=seconds + minutes * 60 + hours * 3600,
+            name=name,
+            jitter=jitter,
+            timeout=timeout,
+            app=app
+        )
+        return func
+
+    return decorator
+
+
+def cron(
+        schedule: str,
+        name: Optional[str] = None,
+        jitter: float = 0,
+        timeout: Optional[float] = None
+) -> Callable:
+    """ The decorator registering the async function as the periodic task executing
+    by the given cron-like schedule. See :py:func:`register` for arguments. """
+
+    app: str = get_calling_app()
+
+    def decorator(func: Callable) -> Callable:
+        register(func, schedule=schedule, name=name, jitter=jitter, timeout=timeout, app=app)
+        return func
+
+    return decorator
+
+
+async def metrics() -> List[dict]:
+    """ Returns the run time metrics of all registered tasks, summarized over all
+    processes (as stored in Redis). """
+
+    cn: ds.redis.RedisConnection = await ds.redis.create_connection()
+    try:
+        pipe = cn.pipeline(transaction=False)
+        for name in registered:
+            pipe.hgetall(f"tasks:metrics:{name}")
+        results: List[dict] = await pipe.execute()
+    finally:
+        await cn.close()
+
+    response: List[dict] = []
+    for task, stored in zip(registered.values(), results):
+        values: Dict[str, str] = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in stored.items()
+        }
+        runs: int = int(values.get('runs', 0))
+        total: float = float(values.get('total', 0))
+        response.append({
+            'name': task.name,
+            'interval': task.interval,
+            'cron': task.schedule.expression if task.schedule else None,
+            'runs': runs,
+            'failures': int(values.get('failures', 0)),
+            'skipped': int(values.get('skipped', 0)),
+            'lastStarted': values.get('last_started', None),
+            'lastDuration': float(values['last_duration']) if 'last_duration' in values else None,
+            'avgDuration': (total / runs) if runs else None
+        })
+    return response
+
+
+async def _claim(cn: ds.redis.RedisConnection, task: Task, due: float) -> bool:
+    """ Claims the given occurrence of the task for this process. Returns ``False``
+    if the occurrence has been claimed by the other process. """
+
+    return bool(await cn.set(
+        f"tasks:due:{task.name}:{int(due)}", _OWNER, nx=True, ex=task.claim_ttl(due)
+    ))
+
+
+async def _lock(cn: ds.redis.RedisConnection, task: Task, due: float) -> bool:
+    """ Locks the task for the run of the claimed occurrence. Returns ``False``
+    if the previous run of the task is still in progress (anywhere). """
+
+    locked: bool = bool(await cn.set(f"tasks:lock:{task.name}", _OWNER, nx=True, ex=task.lock_ttl(due)))
+    if not locked:
+        task.skipped += 1
+        await cn.hincrby(f"tasks:metrics:{task.name}", 'skipped', 1)
+        logger.warning(f"periodic task {task.name} skipped: the previous run is still in progress", 'tasks')
+    return locked
+
+
+async def _execute(task: Task) -> None:
+    started: float = time.monotonic()
+    task.running = True
+    task.last_started = datetime.datetime.now()
+    failed: bool = False
+    try:
+        if task.timeout:
+            await asyncio.wait_for(runtime.within_background(task.func), task.timeout)
+        else:
+            await runtime.within_background(task.func)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        failed = True
+        task.failures += 1
+        logger.error(f"periodic task {task.name} failed: {e!r}", 'tasks')
+    finally:
+        task.running = False
+        duration: float = time.monotonic() - started
+        task.runs += 1
+        task.last_duration = duration
+        task.total_duration += duration
+
+        cn: ds.redis.RedisConnection = await ds.redis.create_connection()
+        try:
+            mk: str = f"tasks:metrics:{task.name}"
+            pipe = cn.pipeline(transaction=False)
+            pipe.hincrby(mk, 'runs', 1)
+            if failed:
+                pipe.hincrby(mk, 'failures', 1)
+            pipe.hincrbyfloat(mk, 'total', duration)
+            pipe.hset(mk, mapping={
+                'last_started': task.last_started.isoformat(timespec='seconds'),
+                'last_duration': duration
+            })
+            pipe.eval(_RELEASE_LUA, 1, f"tasks:lock:{task.name}", _OWNER)
+            await pipe.execute()
+        finally:
+            await cn.close()
+
+
+async def _occurrence(task: Task, due: float) -> None:
+    # The occurrence is claimed before the jitter delay, so processes with
+    # different delays do not race for it
+    cn: ds.redis.RedisConnection = await ds.redis.create_connection()
+    try:
+        if not await _claim(cn, task, due):
+            return
+    finally:
+        await cn.close()
+    if task.jitter:
+        await asyncio.sleep(random.uniform(0, task.jitter))
+    if task.running:
+        return
+    cn = await ds.redis.create_connection()
+    try:
+        locked: bool = await _lock(cn, task, due)
+    finally:
+        await cn.close()
+    if locked:
+        await _execute(task)
+
+
+async def _run() -> None:
+    now: float = time.time()
+    for task in registered.values():
+        task.next_due = task.due_after(now)
+
+    background: Set[asyncio.Task] = set()
+    while True:
+        if not registered:
+            await asyncio.sleep(60)
+            continue
+        nearest: float = min(t.next_due for t in registered.values())
+        await asyncio.sleep(max(nearest - time.time(), 0))
+        now = time.time()
+        for task in registered.values():
+            if task.next_due > now:
+                continue
+            due: float = task.next_due
+            task.next_due = task.due_after(now)
+            if task.running:
+                task.skipped += 1
+                continue
+            job: asyncio.Task = asyncio.create_task(_occurrence(task, due))
+            background.add(job)
+            job.add_done_callback(background.discard)
+
+
+async def start() -> None:
+    """ Starts the scheduler in the current process. Called on the server startup. """
+
+    global _runner
+    if _runner is not None:
+        return
+    logger.debug(f"starting the periodic tasks scheduler with {len(registered)} task(s)", 'tasks')
+    _runner = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """ Stops the scheduler in the current process. Called on the server shutdown. """
+
+    global _runner
+    if _runner is None:
+        return
+    _runner.cancel()
+    try:
+        await _runner
+    except asyncio.CancelledError:
+        pass
+    _runner = None
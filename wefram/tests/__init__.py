@@ -1,4 +1,34 @@
+"""
+The platform's tests, ran with ``manage test wefram [<test name>]``. Without the
+test name all tests are ran one after another. Tests are ran within the CLI
+context (with the database and Redis connections of the project) and leave no
+data behind. Benchmarks (like ``sessions_benchmark``) are ran by the name
+only.
+"""
+
+from typing import *
+from .orm import *
+from .aaa import *
+from .tasks import *
+from .mail import *
+from .storages import *
+from .uploads import *
+
+
+TESTS: List[Callable[..., Awaitable[None]]] = [
+    deep_read_queries,
+    role_edit_bumps_version,
+    ad_domains_order,
+    session_expired_update,
+    login_storm,
+    scheduler_single_run,
+    mail_pooled_delivery,
+    s3_backend,
+    resumable_upload
+]
 
 
 async def main(*_) -> None:
+    for test in TESTS:
+        await test()
     print("tests OK")
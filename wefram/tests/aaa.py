@@ -0,0 +1,332 @@
+"""
+Tests of the authentication and authorization facilities.
+"""
+
+from typing import *
+import time
+import uuid
+import asyncio
+import datetime
+import ldap3
+from ldap3.utils.ciDict import CaseInsensitiveDict
+from ..ds import db, redis
+from .. import config
+from ..aaa import roles_version, throttling
+from ..models import Session, Role, User
+from ..requests import Request, Response, HTTPException
+from .tools import rolled_back, passed, count_checkouts
+
+
+__all__ = [
+    'role_edit_bumps_version',
+    'ad_domains_order',
+    'session_expired_update',
+    'login_storm',
+    'sessions_benchmark'
+]
+
+
+async def role_edit_bumps_version(*_) -> None:
+    """ Committed role changes bump the roles version, making sessions to pick
+    up new permissions. Roles are really committed here (and then removed),
+    because the version is bumped on commit only. """
+
+    role: Role = Role(name=f'test: roles version {uuid.uuid4().hex[:8]}', permissions=[])
+    db.add(role)
+    try:
+        version: int = int(await roles_version())
+        await db.commit()
+        assert int(await roles_version()) > version, "role creation has not bumped the roles version"
+
+        version = int(await roles_version())
+        role.permissions = ['test.permission']
+        await db.commit()
+        assert int(await roles_version()) > version, "role edit has not bumped the roles version"
+
+    finally:
+        await db.connection().delete(role)
+        await db.commit()
+
+    passed('role_edit_bumps_version')
+
+
+class _Directory(CaseInsensitiveDict):
+    """ The in-process Active Directory server's entries (by the login@domain),
+    served by the ldap3 ``MOCK_SYNC`` strategy. Records binds made to it. """
+
+    def __init__(self, host: str, binds: List[Tuple[str, str]], accounts: Dict[str, str]):
+        super().__init__()
+        self.host: str = host
+        self.binds: List[Tuple[str, str]] = binds
+        for login, password in accounts.items():
+            self[login] = CaseInsensitiveDict({'userPassword': [password.encode('utf-8')]})
+
+    def __contains__(self, identity: str) -> bool:
+        # The mock bind looks the binding identity up in the entries
+        if '@' in identity:
+            self.binds.append((self.host, identity))
+        return super().__contains__(identity)
+
+
+async def ad_domains_order(*_) -> None:
+    """ The AD backend binds to domains in their order, one after another, and
+    stops on the first succeeded one (or tries the rest concurrently only after
+    the first one has failed, if configured so). The binds are made by the
+    backend's thread pool against in-process directories. """
+
+    from ..aaa.auth import ad
+
+    binds: List[Tuple[str, str]] = []
+    directories: Dict[str, Dict[str, str]] = {
+        '127.0.0.1': {'tester@first.test': 'first'},
+        '127.0.0.2': {'tester@second.test': 'second'},
+        '127.0.0.3': {'tester@third.test': 'third'}
+    }
+    servers: List[Tuple[str, int, bool]] = [(host, 636, True) for host in directories]
+    for host, accounts in directories.items():
+        ad._get_server(host, 636, True).dit = _Directory(host, binds, accounts)
+    strategy: str = ad.CLIENT_STRATEGY
+    concurrent: bool = config.AUTH['ad_concurrent_domains']
+    ad.CLIENT_STRATEGY = ldap3.MOCK_SYNC
+    try:
+        async with rolled_back():
+            # The AD backend may be not enabled in the project, so its table
+            # is created within the rolled back transaction
+            await db.connection().run_sync(
+                lambda session: ad.ActiveDirectoryDomain.__table__.create(session.connection(), checkfirst=True)
+            )
+            for i, name in enumerate(('first', 'second', 'third')):
+                db.add(
+                    ad.ActiveDirectoryDomain(name=name, domain=f'{name}.test', server=f'127.0.0.{i + 1}', sort=-100 + i),
+                    User(login=f'tester@{name}.test', secret='', first_name=name)
+                )
+            await db.flush()
+
+            config.AUTH['ad_concurrent_domains'] = False
+            user: Optional[User] = await ad.authenticate('tester', 'first')
+            assert user is not None and user.login == 'tester@first.test'
+            assert binds == [('127.0.0.1', 'tester@first.test')], \
+                f"binds made after the first domain succeeded: {binds}"
+
+            binds.clear()
+            user = await ad.authenticate('tester', 'second')
+            assert user is not None and user.login == 'tester@second.test'
+            assert [host for host, _ in binds] == ['127.0.0.1', '127.0.0.2'], f"unexpected binds: {binds}"
+
+            binds.clear()
+            user = await ad.authenticate('tester', 'wrong')
+            assert user is None, "authenticated with the wrong password"
+            assert [host for host, _ in binds] == ['127.0.0.1', '127.0.0.2', '127.0.0.3'], \
+                f"unexpected binds: {binds}"
+
+            config.AUTH['ad_concurrent_domains'] = True
+            binds.clear()
+            user = await ad.authenticate('tester', 'third')
+            assert user is not None and user.login == 'tester@third.test'
+            assert binds[0][0] == '127.0.0.1' and len(binds) == 3, f"unexpected binds: {binds}"
+
+            binds.clear()
+            user = await ad.authenticate('tester', 'first')
+            assert user is not None and user.login == 'tester@first.test'
+            assert len(binds) == 1, f"binds made after the first domain succeeded: {binds}"
+
+    finally:
+        ad.CLIENT_STRATEGY = strategy
+        config.AUTH['ad_concurrent_domains'] = concurrent
+        for key in servers:
+            ad._servers.pop(key, None)
+
+    passed('ad_domains_order')
+
+
+def _login_request(login: str, ip: str) -> Request:
+    return Request({
+        'type': 'http',
+        'method': 'POST',
+        'path': '/api/system/v1/authenticate',
+        'headers': [],
+        'client': (ip, 0),
+        'payload': {'username': login, 'password': 'wrong password'}
+    })
+
+
+async def _login(login: str, ip: str) -> Tuple[int, Optional[str]]:
+    """ Calls the log-in handler with bad credentials, returning the response
+    status and the ``Retry-After`` header. """
+
+    from ..private.controllers.aaa import v1_login
+
+    try:
+        response: Response = await v1_login(_login_request(login, ip))
+    except HTTPException as exc:
+        return exc.status_code, None
+    return response.status_code, response.headers.get('retry-after', None)
+
+
+async def login_storm(attempts: str = '500') -> None:
+    """ Concurrent log-ins with bad credentials (a few logins from a few
+    addresses) are answered with 429 and ``Retry-After`` after the limit has
+    been reached, without taking any database connection. """
+
+    per_login, per_ip, window = await throttling._limits()
+    if not window or not (per_login or per_ip):
+        print("[SKIP] login_storm: failed log-ins are not limited by the settings")
+        return
+
+    attempts_: int = int(attempts)
+    tag: str = uuid.uuid4().hex[:8]
+    logins: List[str] = [f'storm-{tag}-{i}' for i in range(5)]
+    ips: List[str] = [f'192.0.2.{i}' for i in range(4)]
+    limit: int = max(per_login, per_ip)
+    try:
+        # Failed log-ins are authenticated (against the database) until the limits
+        # are reached; the sequence is not concurrent because the CLI context's
+        # database session is shared
+        for i, login in enumerate(logins):
+            for _ in range(limit + 1):
+                status, _retry = await _login(login, ips[i % len(ips)])
+                if status == 429:
+                    break
+                assert status == 401, f"the failed log-in has been answered with {status}"
+            else:
+                raise AssertionError(f"log-ins of '{login}' have not been limited after {limit} failures")
+
+        started: float = time.perf_counter()
+        with count_checkouts() as pool:
+            responses: List[Tuple[int, Optional[str]]] = await asyncio.gather(*[
+                _login(logins[i % len(logins)], ips[i % len(ips)]) for i in range(attempts_)
+            ])
+        elapsed: float = time.perf_counter() - started
+
+    finally:
+        cn: redis.RedisConnection = await redis.get_connection()
+        await cn.unlink(
+            *[throttling._login_key(login) for login in logins],
+            *[throttling._ip_key(ip) for ip in ips]
+        )
+
+    limited: List[Tuple[int, Optional[str]]] = [r for r in responses if r[0] == 429]
+    print(
+        f"{attempts_} concurrent log-in attempts in {elapsed:.3f}s: {len(limited)} limited,"
+        f" {pool.checkouts} database connections taken, {pool.peak} held at peak"
+    )
+    assert len(limited) == attempts_, f"{attempts_ - len(limited)} log-ins of the storm have not been limited"
+    assert all([retry and int(retry) > 0 for _status, retry in limited]), \
+        "limited log-ins have been answered without the 'Retry-After' header"
+    assert pool.checkouts == 0, f"the limited log-ins have taken {pool.checkouts} database connections"
+
+    passed('login_storm')
+
+
+def _make_session(permissions_count: int) -> Session:
+    return Session(
+        token=uuid.uuid4().hex,
+        user={
+            'id': str(uuid.uuid4()),
+            'login': 'test-session',
+            'first_name': 'Test',
+            'last_name': 'Session'
+        },
+        permissions=[f'test.permission{i}' for i in range(permissions_count)],
+        start_timestamp=datetime.datetime.now(),
+        touch_timestamp=datetime.datetime.now()
+    )
+
+
+async def session_expired_update(*_) -> None:
+    """ Touching or refreshing permissions of the expired (removed) session does
+    not recreate it. """
+
+    session: Session = _make_session(10)
+    await session.save()
+    await session.drop()
+
+    await session.touch()
+    await session.refresh_permissions('0')
+
+    cn: redis.RedisConnection = await redis.get_connection()
+    rk: str = session.redis_key_for(session.user['id'], session.token)
+    assert not await cn.exists(rk), "the expired session has been recreated"
+
+    passed('session_expired_update')
+
+
+class _RoundTrips:
+    """ Counts requests made with the Redis connection. """
+
+    def __init__(self, cn: redis.RedisConnection):
+        self.cn: redis.RedisConnection = cn
+        self.count: int = 0
+        self._execute_command: Callable = cn.execute_command
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        self.count += 1
+        return await self._execute_command(*args, **kwargs)
+
+    def __enter__(self) -> '_RoundTrips':
+        self.cn.execute_command = self
+        return self
+
+    def __exit__(self, *_) -> None:
+        del self.cn.execute_command
+
+
+async def _net_input_bytes(cn: redis.RedisConnection) -> int:
+    return int((await cn.info('stats'))['total_net_input_bytes'])
+
+
+async def sessions_benchmark(iterations: str = '1000', permissions_count: str = '300') -> None:
+    """ Compares bytes sent to Redis and round trips per authenticated request
+    made by the previous, JSON string session layout (get, set the whole
+    session, expire) and by the hash one (the single fetch-and-touch script
+    call). Usage: ``manage test wefram sessions_benchmark [iterations] [permissions]``.
+    """
+
+    iterations: int = int(iterations)
+    session: Session = _make_session(int(permissions_count))
+    cn: redis.RedisConnection = await redis.get_connection()
+    session.roles_version = await roles_version()
+    rk: str = session.redis_key_for(session.user['id'], session.token)
+    first: int = await _net_input_bytes(cn)
+    info_overhead: int = (await _net_input_bytes(cn)) - first
+
+    async def _legacy_request() -> None:
+        await cn.get(rk)
+        session.touch_timestamp = datetime.datetime.now()
+        lifetime: int = await Session.lifetime()
+        await cn.set(rk, session.jsonify())
+        await cn.expire(rk, lifetime)
+
+    async def _hash_request() -> None:
+        await Session.fetch(session.user['id'], session.token, touch=True)
+
+    results: Dict[str, Tuple[float, float, float]] = {}
+    try:
+        await cn.set(rk, session.jsonify())
+        await _hash_request()  # converts to the hash layout and loads the script
+        await cn.delete(rk)
+
+        for name, request in (('json string', _legacy_request), ('hash', _hash_request)):
+            if name == 'hash':
+                await session.save()
+            else:
+                await cn.set(rk, session.jsonify())
+            started_bytes: int = await _net_input_bytes(cn)
+            started: float = time.perf_counter()
+            with _RoundTrips(cn) as round_trips:
+                for _ in range(iterations):
+                    await request()
+            elapsed: float = time.perf_counter() - started
+            sent: int = (await _net_input_bytes(cn)) - started_bytes - info_overhead
+            results[name] = (sent / iterations, round_trips.count / iterations, elapsed * 1000 / iterations)
+            await cn.delete(rk)
+    finally:
+        await session.drop()
+
+    print(f"sessions with {permissions_count} permission scopes, {iterations} requests:")
+    for name, (sent, round_trips, elapsed) in results.items():
+        print(f"  {name:>12}: {sent:8.1f} bytes, {round_trips:.1f} round trips, {elapsed:.3f} ms per request")
+    assert results['hash'][0] < results['json string'][0]
+    assert results['hash'][1] < results['json string'][1]
+
+    passed('sessions_benchmark')
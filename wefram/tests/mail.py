@@ -0,0 +1,94 @@
+"""
+Tests of the mail delivery, against the local SMTP server (requires the
+``aiosmtpd`` package, the test is skipped without it).
+"""
+
+from typing import *
+import socket
+from .. import config
+from ..mail import make_message, delivery
+from .tools import passed
+
+
+__all__ = [
+    'mail_pooled_delivery'
+]
+
+
+MESSAGES_COUNT: int = 20
+
+
+class _Mailbox:
+    """ The local SMTP server handler, recording delivered messages and the
+    client connections they came over. Fails the first attempt for the given
+    recipients with the transient 4xx responses: on the RCPT command or on the
+    DATA one. """
+
+    def __init__(self, refuse_rcpt: Set[str], refuse_data: Set[str]):
+        self.refuse_rcpt: Set[str] = set(refuse_rcpt)
+        self.refuse_data: Set[str] = set(refuse_data)
+        self.delivered: List[str] = []
+        self.peers: Set[Tuple[str, int]] = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options) -> str:
+        if address in self.refuse_rcpt:
+            self.refuse_rcpt.discard(address)
+            return '450 4.2.0 Mailbox busy, try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        self.peers.add(session.peer)
+        refused: Set[str] = self.refuse_data & set(envelope.rcpt_tos)
+        if refused:
+            self.refuse_data -= refused
+            return '451 4.3.0 Temporary failure, try again later'
+        self.delivered.extend(envelope.rcpt_tos)
+        return '250 Message accepted'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def mail_pooled_delivery(*_) -> None:
+    """ Messages are delivered over the single pooled connection, reused between
+    deliveries, and transient failures are retried. """
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("[SKIP] mail_pooled_delivery: the 'aiosmtpd' package is not installed")
+        return
+
+    recipients: List[str] = [f'user{i}@test.local' for i in range(MESSAGES_COUNT)]
+    mailbox: _Mailbox = _Mailbox(refuse_rcpt={recipients[3]}, refuse_data={recipients[7], recipients[15]})
+    port: int = _free_port()
+    server: Controller = Controller(mailbox, hostname='127.0.0.1', port=port)
+    params: delivery.SmtpParams = delivery.SmtpParams(host='127.0.0.1', port=port, use_tls=False)
+    backoff: int = config.MAIL['backoff']
+    config.MAIL['backoff'] = 0
+    server.start()
+    try:
+        messages: list = [
+            make_message('sender@test.local', [to], f'Test {i}', f'Test message {i}')
+            for i, to in enumerate(recipients)
+        ]
+        half: int = MESSAGES_COUNT // 2
+        errors: List[Optional[Exception]] = await delivery.deliver(params, messages[:half])
+        errors += await delivery.deliver(params, messages[half:])
+
+        assert errors == [None] * MESSAGES_COUNT, f"messages have not been delivered: {errors}"
+        assert sorted(mailbox.delivered) == sorted(recipients), \
+            f"delivered {len(mailbox.delivered)} of {MESSAGES_COUNT} messages"
+        assert not mailbox.refuse_rcpt and not mailbox.refuse_data, "failed messages have not been retried"
+        assert len(mailbox.peers) == 1, f"messages have been sent over {len(mailbox.peers)} connections"
+
+    finally:
+        config.MAIL['backoff'] = backoff
+        await delivery.get_pool(params).close()
+        server.stop()
+
+    passed('mail_pooled_delivery')
@@ -0,0 +1,46 @@
+"""
+Tests of the ORM layer and the model-based API.
+"""
+
+from typing import *
+from .. import api
+from ..ds import db
+from ..models import User, Role
+from .tools import count_queries, rolled_back, passed
+
+
+__all__ = [
+    'deep_read_queries'
+]
+
+
+USERS_COUNT: int = 25
+
+
+async def deep_read_queries(*_) -> None:
+    """ The deep list read loads related objects with a bounded number of queries,
+    not with a query per object. """
+
+    async with rolled_back():
+        role: Role = Role(name='test: deep read', permissions=[])
+        users: List[User] = [
+            User(login=f'test-deep-read-{i}', secret='', first_name=f'Test {i}')
+            for i in range(USERS_COUNT)
+        ]
+        for user in users:
+            user.roles.append(role)
+        db.add(role, *users)
+        await db.flush()
+        keys: List[str] = [user.id for user in users]
+        db.connection().expunge_all()
+
+        entity: api.ModelAPI = api.get_entity('system.User')()
+        with count_queries() as counter:
+            items: List[dict] = await entity.read_many(keys, deep=True, filters={})
+
+        assert len(items) == USERS_COUNT, f"expected {USERS_COUNT} users, got {len(items)}"
+        assert all(len(item['roles']) == 1 for item in items), "roles are not loaded deeply"
+        # The users query plus one selectin query per relationship
+        assert counter.count <= 3, f"deep read made {counter.count} queries:\n" + '\n'.join(counter.statements)
+
+    passed('deep_read_queries')
@@ -0,0 +1,209 @@
+"""
+Tests of the stored files backends. The S3 backend is tested against the
+in-process stand-in of the S3-compatible object storage (like MinIO).
+"""
+
+from typing import *
+import uuid
+import socket
+import asyncio
+import hashlib
+from xml.etree import ElementTree
+import aiohttp
+from aiohttp import web
+from .. import logger
+from ..requests import Request, Response
+from ..ds import storages
+from ..ds.storages.s3 import S3Backend, S3Error, MIN_PART_SIZE
+from .tools import passed
+
+
+__all__ = [
+    's3_backend'
+]
+
+
+class _ObjectStorage:
+    """ The minimal S3-compatible object storage: single and multipart uploads,
+    downloads and removals of objects of the single bucket. Signatures are not
+    verified, but requests must be signed (by the header or by the presigned
+    URL) with the given access key. Requests of the given methods may be made
+    failing. """
+
+    def __init__(self, bucket: str, access_key: str):
+        self.bucket: str = bucket
+        self.access_key: str = access_key
+        self.objects: Dict[str, bytes] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        self.aborted: List[str] = []
+        self.failing: Set[Tuple[str, str]] = set()
+        self.app: web.Application = web.Application(client_max_size=64 * 1024 * 1024)
+        self.app.router.add_route('*', f'/{bucket}/{{key:.+}}', self.handle)
+        self.runner: Optional[web.AppRunner] = None
+        self.port: int = 0
+
+    async def start(self) -> None:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', self.port).start()
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+    def _failing(self, request: web.Request) -> bool:
+        query: str = 'uploadId' if 'uploadId' in request.query else ''
+        return (request.method, query) in self.failing
+
+    def _signed(self, request: web.Request) -> bool:
+        credential: str = f'Credential={self.access_key}/'
+        if request.headers.get('authorization', '').startswith(f'AWS4-HMAC-SHA256 {credential}'):
+            return True
+        return bool(request.query.get('X-Amz-Signature', None)) \
+            and f"Credential={request.query.get('X-Amz-Credential', '')}".startswith(credential)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        key: str = request.match_info['key']
+        if not self._signed(request):
+            return web.Response(status=403, text='<Error><Code>AccessDenied</Code></Error>')
+        if self._failing(request):
+            return web.Response(status=500, text='<Error><Code>InternalError</Code></Error>')
+
+        if request.method == 'POST' and 'uploads' in request.query:
+            upload_id: str = uuid.uuid4().hex
+            self.uploads[upload_id] = {}
+            return web.Response(text=(
+                '<InitiateMultipartUploadResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Bucket>{self.bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>'
+                '</InitiateMultipartUploadResult>'
+            ))
+
+        if request.method == 'PUT' and 'uploadId' in request.query:
+            parts: Optional[Dict[int, bytes]] = self.uploads.get(request.query['uploadId'], None)
+            if parts is None:
+                return web.Response(status=404)
+            body: bytes = await request.read()
+            parts[int(request.query['partNumber'])] = body
+            return web.Response(headers={'ETag': f'"{hashlib.md5(body).hexdigest()}"'})
+
+        if request.method == 'POST' and 'uploadId' in request.query:
+            parts = self.uploads.pop(request.query['uploadId'], None)
+            if parts is None:
+                return web.Response(status=404)
+            manifest: ElementTree.Element = ElementTree.fromstring(await request.read())
+            numbers: List[int] = [int(n.text) for n in manifest.iter('PartNumber')]
+            self.objects[key] = b''.join([parts[n] for n in numbers])
+            return web.Response(text='<CompleteMultipartUploadResult/>')
+
+        if request.method == 'DELETE' and 'uploadId' in request.query:
+            if self.uploads.pop(request.query['uploadId'], None) is None:
+                return web.Response(status=404)
+            self.aborted.append(key)
+            return web.Response(status=204)
+
+        if request.method == 'PUT':
+            self.objects[key] = await request.read()
+            return web.Response()
+
+        if request.method == 'GET':
+            if key not in self.objects:
+                return web.Response(status=404)
+            return web.Response(
+                body=self.objects[key],
+                content_type=request.query.get('response-content-type', 'application/octet-stream')
+            )
+
+        if request.method == 'DELETE':
+            self.objects.pop(key, None)
+            return web.Response(status=204)
+
+        return web.Response(status=405)
+
+
+async def _chunks(size: int) -> AsyncIterator[bytes]:
+    chunk: bytes = bytes(range(256)) * 256
+    sent: int = 0
+    while sent < size:
+        yield chunk[:size - sent]
+        sent += len(chunk)
+
+
+async def s3_backend(*_) -> None:
+    """ Files are stored to the S3 backend (the single and the multipart upload)
+    and downloaded by the redirect to the presigned URL (or revalidated), the
+    failed commit aborts the upload, failed background removals are logged
+    and the backend is closed on the shutdown. """
+
+    bucket: str = 'files'
+    tag: str = uuid.uuid4().hex[:8]
+    backend_name: str = f'test-s3-{tag}'
+    entity: str = f'system.test_s3_{tag}'
+    server: _ObjectStorage = _ObjectStorage(bucket, 'test')
+    await server.start()
+    backend: S3Backend = S3Backend(f'http://127.0.0.1:{server.port}', bucket, 'test', 'test')
+    storages.register_backend(backend_name, backend)
+    storages.register(entity, backend=backend_name)
+
+    errors: List[str] = []
+    error: Callable = logger.error
+    logger.error = lambda msg, *args: errors.append(msg)
+    try:
+        small_id: str = await storages.store_stream(entity, _chunks(1000), 'small.bin')
+        assert len(server.objects[backend.key_of(entity, small_id, 'small.bin')]) == 1000, \
+            "the small file has not been stored"
+        assert (await backend.read_info(entity, small_id))['filesize'] == 1000
+
+        response: Response = await backend.file_response(entity, small_id, None)
+        assert response.status_code == 302, f"the file response status is {response.status_code}, not 302"
+        async with aiohttp.ClientSession() as client:
+            async with client.get(response.headers['location']) as download:
+                assert download.status == 200, f"the presigned URL has been answered with {download.status}"
+                assert await download.read() == server.objects[backend.key_of(entity, small_id, 'small.bin')], \
+                    "the presigned URL serves not the stored content"
+        etag: str = f'"{(await backend.read_info(entity, small_id))["sha256"]}"'
+        revalidation: Request = Request({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/',
+            'headers': [(b'if-none-match', etag.encode())]
+        })
+        response = await backend.file_response(entity, small_id, revalidation)
+        assert response.status_code == 304, f"the revalidation has been answered with {response.status_code}"
+
+        size: int = MIN_PART_SIZE * 2 + 1000
+        large_id: str = await storages.store_stream(entity, _chunks(size), 'large.bin')
+        content: bytes = server.objects[backend.key_of(entity, large_id, 'large.bin')]
+        assert len(content) == size, f"the multipart upload stored {len(content)} of {size} bytes"
+        assert not server.uploads, "the multipart upload has not been completed"
+
+        server.failing.add(('POST', 'uploadId'))
+        try:
+            await storages.store_stream(entity, _chunks(size), 'failing.bin')
+        except S3Error:
+            pass
+        else:
+            raise AssertionError("the failed multipart upload completion has not been raised")
+        server.failing.clear()
+        assert not server.uploads and server.aborted, "the failed multipart upload has not been aborted"
+
+        server.failing.add(('DELETE', ''))
+        storages.remove_files(entity, [small_id, large_id])
+        await asyncio.gather(*list(storages.routines._removals), return_exceptions=True)
+        server.failing.clear()
+        assert errors and 'failed to remove' in errors[0], "the failed background removal has not been logged"
+
+        storages.remove_files(entity, [small_id, large_id])
+        await storages.close_backends()
+        assert not [k for k in server.objects if k.startswith(f'{entity}/')], "stored files have not been removed"
+        assert backend._session is None, "the backend has not been closed"
+
+    finally:
+        logger.error = error
+        storages.entities.registered.pop(entity, None)
+        storages.backends.backends.pop(backend_name, None)
+        await backend.close()
+        await server.stop()
+
+    passed('s3_backend')
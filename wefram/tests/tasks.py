@@ -0,0 +1,60 @@
+"""
+Tests of the periodic tasks scheduler.
+"""
+
+from typing import *
+import time
+import uuid
+import random
+import asyncio
+from ..ds import redis
+from .. import tasks
+from .tools import passed
+
+
+__all__ = [
+    'scheduler_single_run'
+]
+
+
+JITTER: float = 90
+
+
+async def scheduler_single_run(*_) -> None:
+    """ The occurrence of the task with the jitter longer than the minute runs
+    only once, when two schedulers (processes) wake up for it with different
+    delays. """
+
+    runs: List[str] = []
+
+    async def _job() -> None:
+        runs.append('run')
+
+    name: str = f'test.single_run_{uuid.uuid4().hex[:8]}'
+    schedulers: List[tasks.Task] = [
+        tasks.Task(name=name, func=_job, interval=300, jitter=JITTER) for _ in range(2)
+    ]
+    due: float = schedulers[0].due_after(time.time())
+
+    # The first scheduler runs the task immediately, the second one wakes up
+    # later; the real delays are scaled down to keep the test fast
+    delays: Iterator[float] = iter([0, 0.5])
+    uniform: Callable = random.uniform
+    random.uniform = lambda *_: next(delays, 0)
+    cn: redis.RedisConnection = await redis.get_connection()
+    try:
+        await asyncio.gather(*[tasks._occurrence(task, due) for task in schedulers])
+        await asyncio.sleep(0.5)
+        for task in schedulers:
+            await tasks._occurrence(task, due)
+
+        ttl: int = await cn.ttl(f"tasks:due:{name}:{int(due)}")
+        assert ttl > 300 + JITTER, f"the occurrence claim expires in {ttl}s, before the jitter and the run end"
+        assert len(runs) == 1, f"the occurrence has been ran {len(runs)} times"
+        assert sum([task.runs for task in schedulers]) == 1, "the occurrence has been ran by both schedulers"
+
+    finally:
+        random.uniform = uniform
+        await cn.unlink(f"tasks:due:{name}:{int(due)}", f"tasks:lock:{name}", f"tasks:metrics:{name}")
+
+    passed('scheduler_single_run')
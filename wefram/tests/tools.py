@@ -0,0 +1,85 @@
+"""
+Provides helpers used by the platform's tests (see ``manage test wefram``).
+"""
+
+from typing import *
+from contextlib import contextmanager, asynccontextmanager
+from sqlalchemy import event
+from ..runtime import context
+from ..ds.orm.engine import engine
+
+
+__all__ = [
+    'QueriesCounter',
+    'count_queries',
+    'PoolCounter',
+    'count_checkouts',
+    'rolled_back',
+    'passed'
+]
+
+
+class QueriesCounter:
+    """ Counts SQL statements executed by the database engine. """
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, execution_context, executemany) -> None:
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueriesCounter]:
+    """ Counts SQL statements executed within the block. """
+
+    counter: QueriesCounter = QueriesCounter()
+    event.listen(engine.sync_engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', counter)
+
+
+class PoolCounter:
+    """ Counts database connections checked out of the engine's pool, and the
+    peak number of connections held at once. """
+
+    def __init__(self):
+        self.checkouts: int = 0
+        self.peak: int = 0
+
+    def __call__(self, *_) -> None:
+        self.checkouts += 1
+        self.peak = max(self.peak, engine.sync_engine.pool.checkedout())
+
+
+@contextmanager
+def count_checkouts() -> Iterator[PoolCounter]:
+    """ Counts database connections checked out within the block. """
+
+    counter: PoolCounter = PoolCounter()
+    event.listen(engine.sync_engine, 'checkout', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, 'checkout', counter)
+
+
+@asynccontextmanager
+async def rolled_back() -> AsyncIterator[None]:
+    """ Rolls back everything made in the database within the block, so tests
+    leave no data behind. """
+
+    try:
+        yield
+    finally:
+        await context['db'].rollback()
+
+
+def passed(name: str) -> None:
+    print(f"[ OK ] {name}")
@@ -0,0 +1,120 @@
+"""
+Tests of the resumable uploads of the stored files.
+"""
+
+from typing import *
+import os
+import time
+import uuid
+import asyncio
+from .. import config
+from ..ds import redis, storages
+from ..ds.storages import resumable
+from ..ds.storages.resumable import UploadSession, UploadConflict
+from .tools import passed
+
+
+__all__ = [
+    'resumable_upload'
+]
+
+
+CONTENT: bytes = bytes(range(256)) * 256
+
+
+async def _chunks(content: bytes, size: int = 4096) -> AsyncIterator[bytes]:
+    for i in range(0, len(content), size):
+        yield content[i:i + size]
+
+
+async def _dropping(content: bytes) -> AsyncIterator[bytes]:
+    """ Sends the given content and drops the connection after. """
+
+    async for chunk in _chunks(content):
+        yield chunk
+    raise ConnectionResetError("the client has disconnected")
+
+
+async def _stalled(content: bytes, lock: str) -> AsyncIterator[bytes]:
+    """ Sends the first chunk of the content, then stalls for so long that the
+    lock expires and is taken by the resuming request, then sends the rest. """
+
+    yield content[:4096]
+    cn: redis.RedisConnection = await redis.get_connection()
+    await cn.set(lock, uuid.uuid4().hex, ex=resumable.LOCK_TIMEOUT)
+    async for chunk in _chunks(content[4096:]):
+        yield chunk
+
+
+async def _conflicts(session: UploadSession, offset: int, chunks: AsyncIterable[bytes]) -> bool:
+    try:
+        await storages.append_upload(session, offset, chunks)
+    except UploadConflict as e:
+        return e.status_code == 409
+    return False
+
+
+def _age(upload_id: str) -> None:
+    """ Makes the partial upload file older than the uploads expiration. """
+
+    past: float = time.time() - config.STORAGE['upload_expire'] - 60
+    os.utime(resumable._part_filename(upload_id), (past, past))
+
+
+async def resumable_upload(*_) -> None:
+    """ The upload is resumed at the offset after the connection drop, chunks at
+    the wrong offset are rejected with 409, the stalled request which has lost
+    its lock neither writes on nor records the offset, the completed upload is
+    finalized into the stored file, and orphaned partial files are purged. """
+
+    entity: str = f'system.test_uploads_{uuid.uuid4().hex[:8]}'
+    storages.register(entity, backend='local')
+    cn: redis.RedisConnection = await redis.get_connection()
+    sessions: List[UploadSession] = []
+    file_id: Optional[str] = None
+    try:
+        session: UploadSession = await storages.create_upload(entity, 'resumed.bin', len(CONTENT))
+        sessions.append(session)
+        try:
+            await storages.append_upload(session, 0, _dropping(CONTENT[:10000]))
+        except ConnectionResetError:
+            pass
+        session = await storages.get_upload(session.upload_id, entity)
+        assert session.offset == 10000, f"the upload offset after the drop is {session.offset}, not 10000"
+
+        assert await _conflicts(session, 0, _chunks(CONTENT)), "the chunk at the wrong offset has been accepted"
+
+        lock: str = f"{resumable._key(session.upload_id)}:lock"
+        assert await _conflicts(session, 10000, _stalled(CONTENT[10000:], lock)), \
+            "the stalled request has written on after its lock has been taken"
+        session = await storages.get_upload(session.upload_id, entity)
+        assert session.offset == 10000, "the stalled request has overwritten the offset"
+        await cn.unlink(lock)
+
+        session = await storages.append_upload(session, 10000, _chunks(CONTENT[10000:]))
+        file_id = session.file_id
+        assert session.completed, "the completely received upload has not been finalized"
+        with open(storages.get_abs_filename(entity, file_id), 'rb') as f:
+            assert f.read() == CONTENT, "the resumed upload content differs from the sent one"
+
+        orphaned: UploadSession = await storages.create_upload(entity, 'orphaned.bin', len(CONTENT))
+        alive: UploadSession = await storages.create_upload(entity, 'alive.bin', len(CONTENT))
+        sessions.extend([orphaned, alive])
+        await cn.unlink(resumable._key(orphaned.upload_id))
+        _age(orphaned.upload_id)
+        _age(alive.upload_id)
+        assert await storages.purge_stale_uploads() >= 1, "the orphaned partial upload has not been purged"
+        assert not os.path.isfile(resumable._part_filename(orphaned.upload_id)), \
+            "the orphaned partial upload file has been left"
+        assert os.path.isfile(resumable._part_filename(alive.upload_id)), \
+            "the partial file of the alive upload has been purged"
+
+    finally:
+        for s in sessions:
+            await storages.abort_upload(s)
+        if file_id:
+            storages.remove_files(entity, [file_id])
+            await asyncio.gather(*list(storages.routines._removals), return_exceptions=True)
+        storages.entities.registered.pop(entity, None)
+
+    passed('resumable_upload')
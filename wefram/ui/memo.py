@@ -0,0 +1,66 @@
+"""
+Provides the memoization of the user interface descriptors (the sidebar, the
+runtime screens' schema, the managed screens' props). These depend only on the
+registries (filled at the project start) and on the current user's locale and
+permission set, so they are built once per such combination and returned as
+is until the registries change.
+"""
+
+from typing import *
+from ..runtime import context
+from ..types.l10n import L10nStr
+
+
+__all__ = [
+    'render_key',
+    'memoized',
+    'localized',
+    'invalidate'
+]
+
+
+# The number of distinct (locale, permission set) combinations is small in
+# practice (the users share roles), so the cache is simply dropped when
+# overflowed.
+RENDER_CACHE_SIZE: int = 1024
+_rendered: Dict[Hashable, Any] = {}
+
+
+def render_key() -> Hashable:
+    """ Returns the key identifying the current user's locale and permission
+    set, the user interface descriptors depend on. """
+
+    permissions: Optional[List[str]] = context.get('permissions', None)
+    return (
+        str(context.get('locale', '')),
+        context.get('permissions_mask', 0),
+        frozenset(permissions) if permissions else None
+    )
+
+
+def memoized(kind: Hashable, build: Callable[[], Any]) -> Any:
+    """ Returns the descriptor of the given kind for the current user's locale
+    and permission set, building it with the given callable on the first call.
+    The returned value is shared between requests and must not be modified. """
+
+    key: Tuple[Hashable, Hashable] = (kind, render_key())
+    if key in _rendered:
+        return _rendered[key]
+    value: Any = build()
+    if len(_rendered) >= RENDER_CACHE_SIZE:
+        _rendered.clear()
+    _rendered[key] = value
+    return value
+
+
+def localized(value: Any) -> Any:
+    """ Returns the value with lazy localized strings translated, so the
+    memoized descriptor does not translate them again on every response. """
+
+    return str(value) if isinstance(value, L10nStr) else value
+
+
+def invalidate() -> None:
+    """ Drops all memoized descriptors. Called on the registries changes. """
+
+    _rendered.clear()
@@ -12,6 +12,7 @@ from ...urls import asset_url
 from ...tools import CSTYLE, get_calling_app, array_from, get_calling_module
 from ...types.ui import BaseScreen
 from ... import config, logger, ds, api, ui
+from .. import memo
 from .types import RouteParams
 
 
@@ -201,12 +202,13 @@ def as_json() -> dict:
 
 def runtime_json() -> dict:
     """ Returns the screens' schema in the context of the client (especially useful
-    for logged-in users).
+    for logged-in users). The result is memoized per the current user's locale and
+    permission set, and must not be modified by the caller.
     """
 
-    return {
+    return memo.memoized('screens', lambda: {
         name: screen.runtime_json() for name, screen in registered.items()
-    }
+    })
 
 
 def get_screen(name: str) -> ClassVar[BaseScreen]:
@@ -340,6 +342,7 @@ def register(
             )
 
         registered[screen_name] = cls
+        memo.invalidate()
         logger.debug(f"registered screen {CSTYLE['green']}{screen_name}{CSTYLE['clear']}")
 
         endpoint: Callable = getattr(cls, 'endpoint')
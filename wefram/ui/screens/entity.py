@@ -7,11 +7,13 @@ directories.
 """
 
 from typing import *
+import copy
 from ...types.l10n import L10nStr
 from ...api.entities import get_entity, EntityAPI
 from ...aaa import permitted
 from ...tools import snakecase_to_lowercamelcase
 from .base import ManagedScreen
+from .. import memo
 from .types import EnumField, EnumsSortingOption
 
 
@@ -177,6 +179,14 @@ class EntityScreen(ManagedScreen):
     """
 
     async def on_render(self) -> Any:
+        # The props depend only on the screen class and the current user's locale
+        # and permission set, so they are built once per such combination. The
+        # deep copy is returned to let inherited screens extend it, including the
+        # nested sorting options and filters, without altering the memoized props.
+        return copy.deepcopy(memo.memoized(('EntityScreen', type(self)), self.render_props))
+
+    def render_props(self) -> dict:
+        """ Builds the managed screen props for the current user. """
 
         def _is_permitted(local_prop: str, entity_prop: str) -> bool:
             _local: Any = getattr(self, local_prop)
@@ -280,7 +290,7 @@ class EntityScreen(ManagedScreen):
             prop_value: Any = getattr(self, prop_name, ...)
             if prop_value is ...:
                 continue
-            props[snakecase_to_lowercamelcase(prop_name)] = prop_value
+            props[snakecase_to_lowercamelcase(prop_name)] = memo.localized(prop_value)
 
         # Handling the 'list' variant
         if self.enum_variant == 'list':
@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from ..aaa import permitted
 from ..types.l10n import L10nStr
 from ..tools import CSTYLE, get_calling_app, array_from
+from . import memo
 from .. import logger
 
 
@@ -77,7 +78,7 @@ class Item:
         children: Optional[List[Item]] = _childrens.get(self.name, None)
         return {
             'name': self.name,
-            'caption': self.caption,
+            'caption': memo.localized(self.caption),
             'url': self.url if children is None else None,
             'urlTarget': self.url_target if children is None else None,
             'endpoint': self.endpoint if children is None else None,
@@ -95,11 +96,14 @@ _childrens: Dict[str, List[Item]] = dict()
 
 
 def as_json() -> List[dict]:
-    """ Returns dict ready to be JSONified as an answer to the web request. """
+    """ Returns dict ready to be JSONified as an answer to the web request. The
+    result is memoized per the current user's locale and permission set, and
+    must not be modified by the caller.
+    """
 
-    return [
+    return memo.memoized('sidebar', lambda: [
         x.as_json() for x in sorted(_items, key=lambda y: y.order) if x.permitted
-    ]
+    ])
 
 
 def _make_requires(scopes: Optional[List[str]] = None) -> List[str]:
@@ -153,6 +157,7 @@ def folder(
     )
     _items.append(item)
     _containers[name] = item
+    memo.invalidate()
     logger.debug(f"appended sidebar folder: {CSTYLE['red']}{name}{CSTYLE['clear']}")
 
 
@@ -192,6 +197,7 @@ def append(
         icon=icon,
         requires=_make_requires(requires)
     ))
+    memo.invalidate()
     logger.debug(f"appended sidebar item: {CSTYLE['red']}{name}{CSTYLE['clear']}")
 
 
@@ -235,5 +241,6 @@ def append_to(
         icon=icon,
         requires=_make_requires(requires)
     ))
+    memo.invalidate()
     logger.debug(f"appended child sidebar item: {CSTYLE['red']}{parent}/{name}{CSTYLE['clear']}")
 
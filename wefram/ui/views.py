@@ -4,6 +4,7 @@ Provides the server-side rendering (SSR) ``views`` functionality.
 
 from typing import *
 import asyncio
+import json
 import os.path
 from starlette.routing import Route
 from ..requests import Request, Response, routing, templates
@@ -43,6 +44,7 @@ class View:
     _requires: List[str]
 
     _assets_uuid: str = None
+    _assets_bundles: Dict[str, str] = None
 
     public_statics: str = defaults.URL_STATICS
     public_assets: str = f'{defaults.URL_STATICS}/assets'
@@ -93,16 +95,38 @@ class View:
         return get_assets_uuid()
 
     @classmethod
-    def get_public_css_path(cls) -> str:
-        """ Returns the fully-qualified URL path to the public site's merged and minified
-        stylesheets (CSS) resource.
+    def get_assets_bundles(cls) -> Dict[str, str]:
+        """ Returns built assets bundles filenames by their kind (``js``, ``css``). The
+        same caching as for :py:meth:`get_assets_uuid` is applied.
         """
 
+        if config.PRODUCTION:
+            return View._assets_bundles or {}
+
+        return get_assets_bundles()
+
+    @classmethod
+    def _get_public_bundle_path(cls, kind: str) -> str:
+        bundles: Dict[str, str] = View.get_assets_bundles()
+        if kind in bundles:
+            return f"{defaults.URL_STATICS}/assets/{bundles[kind]}"
+        if bundles:
+            return ""
+
+        # Assets built before bundles got content-hash names
         assets_uuid: Optional[str] = View.get_assets_uuid()
         if not assets_uuid:
             return ""
 
-        return f"{defaults.URL_STATICS}/assets/{assets_uuid}.css"
+        return f"{defaults.URL_STATICS}/assets/{assets_uuid}.{kind}"
+
+    @classmethod
+    def get_public_css_path(cls) -> str:
+        """ Returns the fully-qualified URL path to the public site's merged and minified
+        stylesheets (CSS) resource.
+        """
+
+        return View._get_public_bundle_path('css')
 
     @classmethod
     def get_public_js_path(cls) -> str:
@@ -110,11 +134,7 @@ class View:
         JavaScripts (JS) resource.
         """
 
-        assets_uuid: Optional[str] = View.get_assets_uuid()
-        if not assets_uuid:
-            return ""
-
-        return f"{defaults.URL_STATICS}/assets/{assets_uuid}.js"
+        return View._get_public_bundle_path('js')
 
     @classmethod
     def append_context_loader(cls, loader: Callable) -> None:
@@ -220,10 +240,25 @@ def get_assets_uuid() -> Optional[str]:
     return assets_uuid
 
 
+def get_assets_bundles() -> Dict[str, str]:
+    """ Returns the current assets bundles filenames (named by their content hashes)
+    by their kind: ``js`` and ``css``. """
+
+    bundles_fn: str = os.path.join(config.STATICS_ROOT, 'assets.json')
+    if not os.path.isfile(bundles_fn):
+        return {}
+    try:
+        with open(bundles_fn, 'r') as f:
+            return json.load(f) or {}
+    except ValueError:
+        return {}
+
+
 def init_view_public_assets() -> None:
     """ Called once on the project process start and prepares the views' mechanics. """
 
     View._assets_uuid = get_assets_uuid()
+    View._assets_bundles = get_assets_bundles()
 
 
 def register(cls: ClassVar[View]) -> ClassVar[View]: